@@ -0,0 +1,300 @@
+"""Search the easy engine's trees for many games at once with NumPy.
+
+A server hosting many games has many easy AI turns pending at the same time,
+and a depth-2 ``minimax_easy`` search spends most of its time in per-node
+Python overhead. ``batch_search`` expands all the trees together, one ply at a
+time: every node of a ply is a row of mask arrays, children come from
+vectorized candidate tests, leaves are scored ``CHUNK_NODES`` rows at a time
+with the easy engine's scoring tables, and minimax values are backed up per
+ply with segment reductions. It returns exactly what ``minimax_easy.minimax`` returns
+for each game, ties broken the same way. Masks are ``uint64``, so variants of
+more than ``MAX_CELLS`` cells are searched by ``minimax_easy`` one game at a
+time.
+"""
+import logging
+
+import numpy as np
+
+from ai import minimax_easy
+from ai.minimax import DRAW_SCORE
+from ai.minimax_easy import score_line, score_square
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_ai.log'
+)
+logger = logging.getLogger('batch')
+
+CHUNK_NODES = 4096  # Nodes scored or win-tested at once; bounds the per-pattern arrays
+CHUNK_CANDIDATES = 1 << 16  # Candidate moves tested at once; bounds the expansion arrays
+CHUNK_BYTES = 16 << 20  # Peak bytes of the chunked temporaries, measured on 6x6 at depth 2
+NODE_BYTES = 160        # Peak bytes per stored node: its level's arrays and their temporaries, measured
+CORNER_SCORE = 15   # minimax_easy.evaluate_position's bonus per own corner
+MAX_CELLS = 64      # Widest board whose masks fit the uint64 arrays
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(values):
+        return np.bitwise_count(values).astype(np.int64)
+else:
+    _BYTE_COUNTS = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+    def _popcount(values):
+        counts = np.zeros(values.shape, dtype=np.int64)
+        for shift in range(0, 64, 8):
+            counts += _BYTE_COUNTS[(values >> np.uint64(shift)) & np.uint64(255)]
+        return counts
+
+class BatchTables:
+    """Per-variant arrays for ``batch_search``: patterns, score tables and move candidates."""
+
+    def __init__(self, variant):
+        if variant.cells > MAX_CELLS:
+            raise ValueError(f"{variant.name} has {variant.cells} cells, more than a uint64 mask holds")
+        self.variant = variant
+        self.full = np.uint64(variant.full)
+        self.corner_mask = np.uint64(variant.corner_mask)
+        self.line_masks = np.array(variant.line_masks, dtype=np.uint64)
+        self.square_masks = np.array(variant.square_masks, dtype=np.uint64)
+        self.win_masks = np.array(variant.win_masks, dtype=np.uint64)
+        self.bits = np.array([1 << index for index in range(variant.cells)], dtype=np.uint64)
+
+        # Scores by (own, opponent, empty) count, from the scalar scoring functions
+        length = variant.line_length
+        square_cells = variant.square_size * variant.square_size
+        self.line_scores = np.array([[[score_line(own, other, empty, length) for empty in range(length + 1)]
+                                      for other in range(length + 1)] for own in range(length + 1)], dtype=np.int64)
+        self.square_scores = np.array([[[score_square(own, other, empty, square_cells)
+                                         for empty in range(square_cells + 1)]
+                                        for other in range(square_cells + 1)] for own in range(square_cells + 1)],
+                                      dtype=np.int64)
+
+        # Placements in the easy engine's order: corners, then the other cells, each row-major
+        corners = [index for index in range(variant.cells) if variant.corner_mask >> index & 1]
+        others = [index for index in range(variant.cells) if not variant.corner_mask >> index & 1]
+        self.place_cells = np.array(corners + others, dtype=np.uint64)
+        # Movements in the order of game.rules.movement_moves: by source, then destination
+        pairs = [(frm, to) for frm in range(variant.cells) for to in range(variant.cells)
+                 if variant.reach_masks[frm] >> to & 1 and frm != to]
+        self.move_from = np.array([frm for frm, _ in pairs], dtype=np.uint64)
+        self.move_to = np.array([to for _, to in pairs], dtype=np.uint64)
+        self.max_children = max(variant.cells, min(len(pairs), variant.pieces * (variant.cells - 2 * variant.pieces)))
+
+    def expand_chunk(self, placing):
+        """Nodes ``expand`` takes at once, so it tests about ``CHUNK_CANDIDATES`` candidates."""
+        return max(1, CHUNK_CANDIDATES // len(self.place_cells if placing else self.move_from))
+
+    def evaluate(self, own, other):
+        """``minimax_easy.evaluate_position`` of every row of ``own`` against ``other``.
+
+        Rows are scored ``CHUNK_NODES`` at a time, so the per-pattern count
+        arrays stay the same size however many rows there are.
+        """
+        scores = np.empty(len(own), dtype=np.int64)
+        for start in range(0, len(own), CHUNK_NODES):
+            rows = slice(start, start + CHUNK_NODES)
+            scores[rows] = self._evaluate(own[rows], other[rows])
+        return scores
+
+    def _evaluate(self, own, other):
+        empty = self.full & ~(own | other)
+        scores = CORNER_SCORE * _popcount(own & self.corner_mask)
+        for masks, table in ((self.line_masks, self.line_scores), (self.square_masks, self.square_scores)):
+            counts = [_popcount(mask[:, None] & masks[None, :]) for mask in (own, other, empty)]
+            scores += table[counts[0], counts[1], counts[2]].sum(axis=1)
+        return scores
+
+    def has_win(self, x_masks, o_masks):
+        """Whether either side completes a winning pattern, ``CHUNK_NODES`` rows at a time."""
+        wins = self.win_masks[None, :]
+        won = np.empty(len(x_masks), dtype=bool)
+        for start in range(0, len(x_masks), CHUNK_NODES):
+            x, o = x_masks[start:start + CHUNK_NODES, None], o_masks[start:start + CHUNK_NODES, None]
+            won[start:start + CHUNK_NODES] = (((x & wins) == wins) | ((o & wins) == wins)).any(axis=1)
+        return won
+
+    def expand(self, own, empty, placing):
+        """Children of every node: ``(node index, new own mask, move code)`` arrays, grouped by node."""
+        if placing:
+            cells = self.place_cells
+            rows, columns = np.nonzero((empty[:, None] >> cells[None, :]) & np.uint64(1))
+            new_own = own[rows] | self.bits[cells[columns].astype(np.int64)]
+            codes = cells[columns].astype(np.int64) + 1
+        else:
+            frm, to = self.move_from, self.move_to
+            valid = ((own[:, None] >> frm[None, :]) & (empty[:, None] >> to[None, :])) & np.uint64(1)
+            rows, columns = np.nonzero(valid)
+            frm, to = frm[columns].astype(np.int64), to[columns].astype(np.int64)
+            new_own = own[rows] ^ (self.bits[frm] | self.bits[to])
+            codes = (frm + 1) << 8 | (to + 1)
+        return rows, new_own, codes
+
+_TABLES = {}
+
+def tables_for(variant):
+    """The ``BatchTables`` of ``variant``, or None if its boards are too wide to batch."""
+    if variant.cells > MAX_CELLS:
+        return None
+    tables = _TABLES.get(variant)
+    if tables is None:
+        tables = _TABLES[variant] = BatchTables(variant)
+    return tables
+
+def game_bytes(variant, depth):
+    """Estimated peak bytes one game of ``variant`` adds to a ``batch_search`` at ``depth``.
+
+    Every ply above the deepest is stored, at most ``max_children`` nodes per
+    node. Games ``minimax_easy`` searches one at a time count 0. A batch also
+    needs ``CHUNK_BYTES`` for its chunked temporaries, whatever its size.
+    """
+    tables = tables_for(variant)
+    if tables is None:
+        return 0
+    stored = max(depth - 1, min(depth, 1))
+    return NODE_BYTES * sum(tables.max_children ** ply for ply in range(stored + 1))
+
+def batch_search(boards, players, phases, depth, stats=None):
+    """``minimax_easy.minimax(board, depth, True, player, phase)`` for every game, searched together.
+
+    Returns one ``(score, move code)`` per game, in order; the move is None
+    at a leaf or stalemate. Games on different variants are searched in
+    separate groups, and games on variants ``tables_for`` cannot batch by
+    ``minimax_easy`` itself. ``stats.nodes`` counts every node, as the easy
+    engine does.
+    """
+    results = [None] * len(boards)
+    groups = {}
+    for index, board in enumerate(boards):
+        groups.setdefault(board.variant, []).append(index)
+    for variant, indices in groups.items():
+        tables = tables_for(variant)
+        if tables is None:
+            logger.debug(f"{variant.name} is too wide to batch; searching {len(indices)} games one by one")
+            for index in indices:
+                results[index] = minimax_easy.minimax(boards[index], depth, True, players[index], phases[index], stats)
+            continue
+        x_masks = np.array([boards[index].masks[1] for index in indices], dtype=np.uint64)
+        o_masks = np.array([boards[index].masks[2] for index in indices], dtype=np.uint64)
+        player = np.array([players[index] for index in indices], dtype=np.int64)
+        placing = np.array([phases[index] == "placement" for index in indices])
+        scores, moves, nodes = _search_group(tables, x_masks, o_masks, player, placing, depth)
+        for position, index in enumerate(indices):
+            results[index] = int(scores[position]), (int(moves[position]) if moves[position] else None)
+        if stats is not None:
+            stats.nodes += nodes
+    logger.debug(f"Batch searched {len(boards)} games at depth {depth}")
+    return results
+
+def _search_group(tables, x_masks, o_masks, player, placing, depth):
+    """Expand every tree ply by ply, then back the values up; returns scores, root moves and nodes.
+
+    The deepest ply below the root moves is never stored whole: its nodes are
+    generated, scored and reduced into their parents one chunk at a time.
+    """
+    pieces = tables.variant.pieces
+    roots = np.arange(len(x_masks))
+    levels = []  # Per ply: (root of each node, parent in the ply above, move code, values, expanded)
+    parent = codes = None
+    nodes = 0
+    for ply in range(depth + 1):
+        nodes += len(roots)
+        mover = player[roots] if ply % 2 == 0 else 3 - player[roots]
+        own = np.where(mover == 1, x_masks, o_masks)
+
+        if ply == depth:
+            leaf = np.ones(len(roots), dtype=bool)
+        else:
+            leaf = tables.has_win(x_masks, o_masks) | (placing[roots] & (_popcount(own) >= pieces))
+        values = np.zeros(len(roots), dtype=np.int64)
+        if leaf.any():
+            root_x = player[roots[leaf]] == 1
+            x_leaf, o_leaf = x_masks[leaf], o_masks[leaf]
+            values[leaf] = tables.evaluate(np.where(root_x, x_leaf, o_leaf), np.where(root_x, o_leaf, x_leaf))
+        levels.append((roots, parent, codes, values, ~leaf))
+        if ply == depth:
+            break
+
+        empty = tables.full & ~(x_masks | o_masks)
+        if ply == depth - 1 and ply > 0:
+            reduce = np.maximum if ply % 2 == 0 else np.minimum
+            nodes += _score_last_ply(tables, x_masks, o_masks, own, empty, mover, player[roots], placing[roots],
+                                     values, ~leaf, reduce)
+            break
+
+        # Children of the expanded nodes, placements and movements kept in node order
+        child_parent, child_own, child_codes = [], [], []
+        for phase_placing in (True, False):
+            selected = np.flatnonzero(~leaf & (placing[roots] == phase_placing))
+            step = tables.expand_chunk(phase_placing)
+            for start in range(0, len(selected), step):
+                chunk = selected[start:start + step]
+                rows, new_own, move_codes = tables.expand(own[chunk], empty[chunk], phase_placing)
+                child_parent.append(chunk[rows])
+                child_own.append(new_own)
+                child_codes.append(move_codes)
+        parent = np.concatenate(child_parent) if child_parent else np.zeros(0, dtype=np.int64)
+        order = np.argsort(parent, kind="stable")
+        parent = parent[order]
+        new_own = np.concatenate(child_own)[order] if child_own else np.zeros(0, dtype=np.uint64)
+        codes = np.concatenate(child_codes)[order] if child_codes else np.zeros(0, dtype=np.int64)
+        moved_x = mover[parent] == 1
+        x_masks = np.where(moved_x, new_own, x_masks[parent])
+        o_masks = np.where(moved_x, o_masks[parent], new_own)
+        roots = roots[parent]
+
+    # Back up from the deepest ply; an expanded node without children is a stalemate
+    child_values = None
+    moves = np.zeros(len(levels[0][0]), dtype=np.int64)
+    for ply in range(len(levels) - 1, -1, -1):
+        roots, _, _, values, expanded = levels[ply]
+        if ply + 1 < len(levels):
+            _, child_parent, child_codes, _, _ = levels[ply + 1]
+            values[expanded] = DRAW_SCORE
+            if len(child_parent):
+                starts = np.flatnonzero(np.r_[True, child_parent[1:] != child_parent[:-1]])
+                parents = child_parent[starts]
+                reduce = np.maximum if ply % 2 == 0 else np.minimum
+                best = reduce.reduceat(child_values, starts)
+                values[parents] = best
+                if ply == 0:
+                    # The first child reaching the best value, as the easy engine's strict comparison picks
+                    counts = np.diff(np.r_[starts, len(child_parent)])
+                    hits = np.flatnonzero(child_values == np.repeat(best, counts))
+                    _, first = np.unique(child_parent[hits], return_index=True)
+                    moves[child_parent[hits[first]]] = child_codes[hits[first]]
+        child_values = values
+    return levels[0][3], moves, nodes
+
+def _score_last_ply(tables, x_masks, o_masks, own, empty, mover, player, placing, values, expanded, reduce):
+    """Score the children of the ``expanded`` nodes and ``reduce`` them into ``values``; returns their count.
+
+    Children are generated ``expand_chunk`` nodes at a time and dropped once
+    scored, so only the parents' values outlive a chunk. An expanded node
+    without children is a stalemate.
+    """
+    best = values.copy()
+    has_children = np.zeros(len(values), dtype=bool)
+    count = 0
+    for phase_placing in (True, False):
+        selected = np.flatnonzero(expanded & (placing == phase_placing))
+        step = tables.expand_chunk(phase_placing)
+        for start in range(0, len(selected), step):
+            chunk = selected[start:start + step]
+            rows, new_own, _ = tables.expand(own[chunk], empty[chunk], phase_placing)
+            if not len(rows):
+                continue
+            parent = chunk[rows]
+            moved_x = mover[parent] == 1
+            x_child = np.where(moved_x, new_own, x_masks[parent])
+            o_child = np.where(moved_x, o_masks[parent], new_own)
+            root_x = player[parent] == 1
+            scores = tables.evaluate(np.where(root_x, x_child, o_child), np.where(root_x, o_child, x_child))
+            # expand groups children by node, and a node's children all come from one chunk
+            starts = np.flatnonzero(np.r_[True, parent[1:] != parent[:-1]])
+            best[parent[starts]] = reduce.reduceat(scores, starts)
+            has_children[parent[starts]] = True
+            count += len(rows)
+    values[expanded] = DRAW_SCORE
+    values[has_children] = best[has_children]
+    return count
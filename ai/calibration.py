@@ -0,0 +1,223 @@
+"""Search budgets per difficulty, calibrated on this machine and cached on disk.
+
+A fixed depth costs very different amounts of time on different machines and
+in different phases of the game, so each difficulty is defined by a target
+move latency instead. ``calibrate`` measures the nodes/sec of each
+difficulty's engine on a fixed set of reference positions and turns the
+targets into budgets:
+
+- medium and hard deepen iteratively until ``nodes`` are spent, with
+  ``seconds`` as a hard stop for the whole move, threat-space and proof
+  searches included (see ``game.player.AIPlayer.think``). Budgeting nodes
+  rather than time keeps the moves reproducible on one machine;
+- easy cannot be stopped mid-search, so its budget is the deepest ``depth``
+  whose mean time per move on the reference set fits its target.
+
+``load_budgets`` returns the budgets cached in ``CALIBRATION_FILE``, and
+calibrates first if the file is missing or was written for another machine,
+Python or engine. With ``AVAI_CALIBRATION=off`` every difficulty keeps its
+fixed depth from ``FIXED_DEPTHS``. Run ``python -m ai.calibration`` to
+calibrate again and print the budgets.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import time
+
+from ai import minimax_easy, minimax_hard
+from ai.minimax import SearchStats, choose_move
+from game.board import Board
+from game.ranking import index_for
+from game.variant import STANDARD
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_ai.log'
+)
+logger = logging.getLogger('calibration')
+
+# Seconds a move should take at each of game.difficulty.DIFFICULTIES
+TARGET_LATENCY = {
+    "easy": 0.05,
+    "medium": 0.3,
+    "hard": 1.0,
+}
+# Depths used without calibration
+FIXED_DEPTHS = {
+    "easy": 2,
+    "medium": 3,
+    "hard": 4,
+}
+MAX_DEPTH = 16          # Depth cap of budgeted searches; the node budget is what really stops them
+MAX_EASY_DEPTH = 4
+TIME_MARGIN = 2.0       # Hard time stop, as a multiple of the target latency
+MEASURE_NODES = 2000    # Node limit of each measuring search
+REFERENCE_POSITIONS = 10
+CALIBRATION_VERSION = 1
+ENGINE_FILES = ("minimax.py", "minimax_easy.py", "minimax_hard.py", "evalcache.py", "threats.py", "weights.py")
+
+CALIBRATION_FILE = os.environ.get("AVAI_CALIBRATION_FILE", os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "avai", "calibration.json"))
+
+class Budget:
+    """How far one difficulty searches: a depth cap, plus node and time limits when calibrated."""
+
+    def __init__(self, depth, nodes=None, seconds=None):
+        self.depth = depth
+        self.nodes = nodes
+        self.seconds = seconds
+
+    def to_dict(self):
+        return {"depth": self.depth, "nodes": self.nodes, "seconds": self.seconds}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["depth"], data.get("nodes"), data.get("seconds"))
+
+    def __repr__(self):
+        return f"Budget(depth={self.depth}, nodes={self.nodes}, seconds={self.seconds})"
+
+FIXED_BUDGETS = {name: Budget(depth) for name, depth in FIXED_DEPTHS.items()}
+
+def fingerprint():
+    """What the calibration depends on: the machine, Python, the targets and the engine sources."""
+    digest = hashlib.sha1()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in ENGINE_FILES:
+        with open(os.path.join(directory, name), "rb") as handle:
+            digest.update(handle.read())
+    return {
+        "version": CALIBRATION_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "targets": TARGET_LATENCY,
+        "engine": digest.hexdigest(),
+    }
+
+def reference_positions(count=REFERENCE_POSITIONS, seed=0):
+    """``(board, player, phase)`` for ``count`` unfinished positions, spread over every piece count."""
+    index = index_for(STANDARD)
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        start, end = index.class_range(*index.classes[len(positions) * len(index.classes) // count])
+        x_mask, o_mask, player = index.unrank(rng.randrange(start, end))
+        board = Board.from_masks(x_mask, o_mask, player)
+        if board.check_winner():
+            continue
+        phase = "placement" if board.pieces_placed[player] < STANDARD.pieces else "movement"
+        positions.append((board, player, phase))
+    return positions
+
+def measure_nodes_per_second(difficulty, positions):
+    """Nodes/sec of a node-limited search by ``difficulty``'s engine over ``positions``."""
+    nodes = 0
+    start = time.perf_counter()
+    for board, player, phase in positions:
+        stats = SearchStats()
+        if difficulty == "hard":
+            stats.node_limit = MEASURE_NODES
+            minimax_hard.iterative_search(board, MAX_DEPTH, player, phase, stats)
+        else:
+            choose_move(board, MAX_DEPTH, player, phase, stats, node_limit=MEASURE_NODES)
+        nodes += stats.nodes
+    return nodes / (time.perf_counter() - start)
+
+def easy_depth(positions, target):
+    """Deepest easy depth whose mean time per move fits ``target``, and the easy engine's nodes/sec."""
+    depth, nodes_per_second = 1, 0.0
+    for candidate in range(1, MAX_EASY_DEPTH + 1):
+        stats = SearchStats()
+        start = time.perf_counter()
+        for board, player, phase in positions:
+            minimax_easy.minimax(board, candidate, True, player, phase, stats)
+        elapsed = time.perf_counter() - start
+        nodes_per_second = stats.nodes / elapsed
+        if elapsed / len(positions) > target:
+            break
+        depth = candidate
+    return depth, nodes_per_second
+
+def calibrate():
+    """Measure this machine and return ``(budgets, nodes/sec)`` by difficulty."""
+    positions = reference_positions()
+    start = time.perf_counter()
+    depth, nodes_per_second = easy_depth(positions, TARGET_LATENCY["easy"])
+    budgets = {"easy": Budget(depth)}
+    speeds = {"easy": nodes_per_second}
+    for difficulty in ("medium", "hard"):
+        speeds[difficulty] = measure_nodes_per_second(difficulty, positions)
+        target = TARGET_LATENCY[difficulty]
+        budgets[difficulty] = Budget(MAX_DEPTH, max(MEASURE_NODES, int(speeds[difficulty] * target)),
+                                     target * TIME_MARGIN)
+    logger.info(f"Calibrated in {time.perf_counter() - start:.1f}s: {budgets} at {speeds} nodes/sec")
+    return budgets, speeds
+
+def save_calibration(budgets, speeds, path=CALIBRATION_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as handle:
+        json.dump({"meta": fingerprint(), "nodes_per_sec": speeds,
+                   "budgets": {name: budget.to_dict() for name, budget in budgets.items()}}, handle, indent=2)
+        handle.write("\n")
+    os.replace(temp_path, path)
+
+def read_calibration(path=CALIBRATION_FILE):
+    """Budgets cached in ``path``, or None if it is missing, unreadable or stale."""
+    try:
+        with open(path) as handle:
+            data = json.load(handle)
+        if data.get("meta") != json.loads(json.dumps(fingerprint())):
+            logger.info(f"Calibration in {path} was made for another machine or engine")
+            return None
+        return {name: Budget.from_dict(budget) for name, budget in data["budgets"].items()}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Could not read calibration from {path}: {str(e)}")
+        return None
+
+_BUDGETS = None
+
+def load_budgets(path=CALIBRATION_FILE):
+    """Budgets by difficulty: cached, freshly calibrated, or the fixed depths when calibration is off."""
+    global _BUDGETS
+    if _BUDGETS is not None:
+        return _BUDGETS
+    if os.environ.get("AVAI_CALIBRATION", "on").lower() in ("off", "0", "no"):
+        _BUDGETS = dict(FIXED_BUDGETS)
+        return _BUDGETS
+    budgets = read_calibration(path)
+    if budgets is None:
+        budgets, speeds = calibrate()
+        try:
+            save_calibration(budgets, speeds, path)
+            logger.info(f"Calibration saved to {path}")
+        except OSError as e:
+            logger.error(f"Could not save calibration to {path}: {str(e)}")
+    _BUDGETS = {name: budgets.get(name, budget) for name, budget in FIXED_BUDGETS.items()}
+    return _BUDGETS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=CALIBRATION_FILE, help="where the calibration is cached")
+    args = parser.parse_args()
+    budgets, speeds = calibrate()
+    save_calibration(budgets, speeds, args.file)
+    print(f"Saved to {args.file}")
+    print(f"{'difficulty':<10} {'target':>7} {'nodes/s':>9} {'depth':>5} {'nodes':>8} {'seconds':>7}")
+    for name, budget in budgets.items():
+        nodes = budget.nodes if budget.nodes is not None else "-"
+        seconds = f"{budget.seconds:.2f}" if budget.seconds is not None else "-"
+        print(f"{name:<10} {TARGET_LATENCY[name]:>7.2f} {speeds[name]:>9.0f} {budget.depth:>5} {nodes:>8} {seconds:>7}")
+
+if __name__ == '__main__':
+    main()
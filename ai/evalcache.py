@@ -0,0 +1,120 @@
+"""Bounded cache of static evaluations keyed by position hash and side.
+
+The same leaves come up again and again across sibling subtrees, iterations
+and successive moves, and scoring one means scanning every pattern. The cache
+holds a fixed number of entries in preallocated arrays, sized from a memory
+budget, and evicts with the CLOCK algorithm: a hit sets the entry's reference
+bit, and the clock hand clears set bits until it finds an entry that was not
+used since its last pass, which is replaced. ``resize`` changes the budget
+of a live cache, keeping the referenced entries first, so a
+``utils.memory.MemoryBudget`` can shrink it.
+"""
+import random
+from array import array
+
+DEFAULT_MEMORY_BUDGET = 8 << 20  # Bytes
+ENTRY_BYTES = 220                # Measured cost of one entry: arrays, index dict and its int objects
+MIN_ENTRIES = 1024
+
+# Keys mixed into the position hash so both sides' evaluations can be cached
+_rng = random.Random("eval-cache")
+PLAYER_KEYS = {1: _rng.getrandbits(64), 2: _rng.getrandbits(64)}
+
+def position_key(board, player):
+    """Cache key of ``board`` evaluated for ``player``; distinct across variants and sides."""
+    return board.hash ^ board.variant.zobrist_variant ^ PLAYER_KEYS[player]
+
+class EvalCache:
+    """CLOCK-evicted map from position keys to scores, holding at most ``capacity`` entries."""
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.capacity = max(MIN_ENTRIES, memory_budget // ENTRY_BYTES)
+        self.keys = array("Q", bytes(8 * self.capacity))
+        self.values = [0] * self.capacity
+        self.referenced = bytearray(self.capacity)
+        self.index = {}  # key -> slot
+        self.used = 0
+        self.hand = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """The cached score for ``key``, or None."""
+        slot = self.index.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.referenced[slot] = 1
+        return self.values[slot]
+
+    def put(self, key, value):
+        if key in self.index:
+            self.values[self.index[key]] = value
+            return
+        if self.used < self.capacity:
+            slot = self.used
+            self.used += 1
+        else:
+            referenced = self.referenced
+            hand = self.hand
+            while referenced[hand]:
+                referenced[hand] = 0
+                hand = (hand + 1) % self.capacity
+            slot = hand
+            self.hand = (hand + 1) % self.capacity
+            del self.index[self.keys[slot]]
+            self.evictions += 1
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.referenced[slot] = 0
+        self.index[key] = slot
+
+    def resize(self, memory_budget):
+        """Rebuild for ``memory_budget`` bytes, keeping referenced entries first if some must go."""
+        capacity = max(MIN_ENTRIES, memory_budget // ENTRY_BYTES)
+        kept = sorted(range(self.used), key=lambda slot: not self.referenced[slot])[:capacity]
+        keys = array("Q", bytes(8 * capacity))
+        values = [0] * capacity
+        referenced = bytearray(capacity)
+        for slot, old in enumerate(kept):
+            keys[slot] = self.keys[old]
+            values[slot] = self.values[old]
+            referenced[slot] = self.referenced[old]
+        self.evictions += self.used - len(kept)
+        self.memory_budget = memory_budget
+        self.capacity = capacity
+        self.keys, self.values, self.referenced = keys, values, referenced
+        self.index = {keys[slot]: slot for slot in range(len(kept))}
+        self.used = len(kept)
+        self.hand = 0
+
+    def shrink(self, memory_budget):
+        if memory_budget < self.memory_capacity():
+            self.resize(memory_budget)
+
+    def memory_bytes(self):
+        return self.used * ENTRY_BYTES
+
+    def memory_capacity(self):
+        return self.capacity * ENTRY_BYTES
+
+    def clear(self):
+        """Drop every entry, e.g. when the evaluation weights change; counters are kept."""
+        self.index.clear()
+        self.referenced[:] = bytes(self.capacity)
+        self.used = 0
+        self.hand = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return self.used
+
+    def __repr__(self):
+        return (f"EvalCache(entries={self.used}/{self.capacity}, hits={self.hits}, "
+                f"misses={self.misses}, evictions={self.evictions})")
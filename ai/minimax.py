@@ -1,5 +1,14 @@
 import logging
+import time
+from ai.evalcache import DEFAULT_MEMORY_BUDGET, ENTRY_BYTES, MIN_ENTRIES, EvalCache, position_key
+from ai.weights import WEIGHT_LISTENERS, WEIGHTS
+from ai.threats import LOSS, WIN, solve_board
+from ai.table import EXACT, LOWER, UPPER, TranspositionTable, table_size
+from game.bitboard import iter_bits, popcount
+from game.moves import NO_MOVE, PLACEMENT_LIMIT, move_code, place_code
 from utils.helpers import evaluate_board
+from utils.memory import MEMORY
+from utils.metrics import REGISTRY, ratio
 
 # Configure logging
 logging.basicConfig(
@@ -9,141 +18,306 @@ logging.basicConfig(
 )
 logger = logging.getLogger('minimax')
 
+INF = float('inf')
+ASPIRATION_WINDOW = 1000  # Half-width of the first aspiration window
+ASPIRATION_ATTEMPTS = 3   # Widenings before falling back to a full window
+WIN_SCORE = 100000        # Score reported for a proven win
+DECISIVE_SCORE = 9000     # Search scores beyond this are worth handing to the proof solver
+DRAW_SCORE = 0            # Score of a position repeated during the search, or of a stalemate
+CHECK_INTERVAL = 256      # Nodes between polls of the clock and stop flag
+MAX_KILLERS = 2           # Killer moves remembered per ply
+SEARCH_TABLE_ENTRIES = 1 << 14  # Transposition table of one choose_move call, 256 KiB
+
+def score_line(player_count, opponent_count, empty_count, length):
+    """Score a line of ``length`` cells from its piece counts."""
+    # Critical positions
+    if player_count == length:
+        return WEIGHTS["line_win"]
+    if opponent_count == length:
+        return WEIGHTS["line_loss"]
+    if opponent_count == length - 1 and empty_count == 1:
+        return WEIGHTS["line_block_three"]
+    if player_count == length - 1 and empty_count == 1:
+        return WEIGHTS["line_three"]
+
+    # Developing threats
+    if opponent_count == length - 2 and empty_count == 2:
+        return WEIGHTS["line_block_two"]
+    if player_count == length - 2 and empty_count == 2:
+        return WEIGHTS["line_two"]
+
+    # Early position control
+    if player_count == 1 and empty_count == length - 1:
+        return WEIGHTS["line_one"]
+    if opponent_count == 1 and empty_count == length - 1:
+        return WEIGHTS["line_block_one"]
+
+    return 0
+
+def score_square(player_count, opponent_count, empty_count, length):
+    """Score a square of ``length`` cells from its piece counts."""
+    # Critical square patterns
+    if player_count == length:
+        return WEIGHTS["square_win"]
+    if opponent_count == length:
+        return WEIGHTS["square_loss"]
+    if opponent_count == length - 1 and empty_count == 1:
+        return WEIGHTS["square_block_three"]
+    if player_count == length - 1 and empty_count == 1:
+        return WEIGHTS["square_three"]
+
+    # Developing patterns
+    if opponent_count == length - 2 and empty_count == 2:
+        return WEIGHTS["square_block_two"]
+    if player_count == length - 2 and empty_count == 2:
+        return WEIGHTS["square_two"]
+
+    return 0
+
 def evaluate_line(line, player):
     """Evaluate a line with enhanced threat detection and pattern recognition."""
     opponent = 3 - player
     player_count = sum(1 for x in line if x == player)
     opponent_count = sum(1 for x in line if x == opponent)
     empty_count = sum(1 for x in line if x == 0)
-    
-    # Critical positions
-    if player_count == 4:
-        return 10000  # Winning line
-    if opponent_count == 4:
-        return -10000  # Lost line
-    if opponent_count == 3 and empty_count == 1:
-        return -5000  # Critical block needed
-    if player_count == 3 and empty_count == 1:
-        return 4000   # Potential win next move
-    
-    # Developing threats
-    if opponent_count == 2 and empty_count == 2:
-        return -2000  # Block developing threat
-    if player_count == 2 and empty_count == 2:
-        return 1500   # Developing opportunity
-    
-    # Early position control
-    if player_count == 1 and empty_count == 3:
-        return 500
-    if opponent_count == 1 and empty_count == 3:
-        return -400
-        
-    return 0
+    return score_line(player_count, opponent_count, empty_count, len(line))
 
 def evaluate_square(square, player):
-    """Evaluate a 2x2 square with enhanced pattern recognition."""
+    """Evaluate a square with enhanced pattern recognition."""
+    cells = [x for row in square for x in row]
     opponent = 3 - player
-    player_count = sum(sum(1 for x in row if x == player) for row in square)
-    opponent_count = sum(sum(1 for x in row if x == opponent) for row in square)
-    empty_count = sum(sum(1 for x in row if x == 0) for row in square)
-    
-    # Critical square patterns
-    if player_count == 4:
-        return 20000  # Winning square
-    if opponent_count == 4:
-        return -20000  # Lost square
-    if opponent_count == 3 and empty_count == 1:
-        return -8000  # Must block square
-    if player_count == 3 and empty_count == 1:
-        return 6000   # Near win square
-    
-    # Developing patterns
-    if opponent_count == 2 and empty_count == 2:
-        return -3000  # Potential threat
-    if player_count == 2 and empty_count == 2:
-        return 2000   # Good development
-        
-    return 0
+    player_count = sum(1 for x in cells if x == player)
+    opponent_count = sum(1 for x in cells if x == opponent)
+    empty_count = sum(1 for x in cells if x == 0)
+    return score_square(player_count, opponent_count, empty_count, len(cells))
+
+def immediate_threat_mask(board, player):
+    """Mask of the empty cells that complete an opponent row, column or square."""
+    variant = board.variant
+    opponent_mask = board.masks[3 - player]
+    empty = variant.full & ~(board.masks[1] | board.masks[2])
+    cells = 0
+    for pattern in variant.threat_masks:
+        missing = pattern & ~opponent_mask
+        # One cell short of the pattern, and that cell is empty
+        if missing & empty == missing and missing and not missing & (missing - 1):
+            cells |= missing
+    return cells
 
 def detect_immediate_threats(board, player):
-    """Detect if there are any immediate threats that need attention."""
-    opponent = 3 - player
-    threat_positions = set()
-    
-    # Check rows and columns
-    for i in range(4):
-        row = board.board[i, :]
-        col = board.board[:, i]
-        
-        # Check row threats
-        if sum(1 for x in row if x == opponent) == 3 and sum(1 for x in row if x == 0) == 1:
-            empty_pos = (i, next(j for j in range(4) if row[j] == 0))
-            threat_positions.add(empty_pos)
-            
-        # Check column threats
-        if sum(1 for x in col if x == opponent) == 3 and sum(1 for x in col if x == 0) == 1:
-            empty_pos = (next(j for j in range(4) if col[j] == 0), i)
-            threat_positions.add(empty_pos)
-    
-    # Check 2x2 squares
-    for i in range(3):
-        for j in range(3):
-            square = board.board[i:i+2, j:j+2]
-            if (sum(sum(1 for x in row if x == opponent) for row in square) == 3 and
-                sum(sum(1 for x in row if x == 0) for row in square) == 1):
-                # Find the empty position in the square
-                for di in range(2):
-                    for dj in range(2):
-                        if square[di][dj] == 0:
-                            threat_positions.add((i+di, j+dj))
-    
-    return threat_positions
+    """Detect if there are any immediate threats that need attention.
+
+    Returns the empty cells that complete an opponent row, column or square.
+    """
+    return {board.variant.cell(index) for index in iter_bits(immediate_threat_mask(board, player))}
 
 def evaluate_position(board, player):
+    """``score_position``, cached in ``EVAL_CACHE`` by position hash and side."""
+    cache = EVAL_CACHE
+    if cache is None:
+        return score_position(board, player)
+    key = position_key(board, player)
+    score = cache.get(key)
+    if score is None:
+        score = score_position(board, player)
+        cache.put(key, score)
+    return score
+
+def score_position(board, player):
     """Enhanced position evaluation with threat detection and strategic scoring."""
+    variant = board.variant
+    own = board.masks[player]
+    opponent = board.masks[3 - player]
+    empty = variant.full & ~(own | opponent)
     score = 0
-    opponent = 3 - player
-    threats = detect_immediate_threats(board, player)
-    
-    # Check rows and columns
-    for i in range(4):
-        row = board.board[i, :]
-        col = board.board[:, i]
-        score += evaluate_line(row, player)
-        score += evaluate_line(col, player)
-    
-    # Check diagonals
-    diag1 = [board.board[i,i] for i in range(4)]
-    diag2 = [board.board[i,3-i] for i in range(4)]
-    score += evaluate_line(diag1, player)
-    score += evaluate_line(diag2, player)
-    
-    # Check 2x2 squares
-    for i in range(3):
-        for j in range(3):
-            square = board.board[i:i+2, j:j+2]
-            score += evaluate_square(square, player)
-    
+
+    # Rows, columns and diagonals
+    for pattern in variant.line_masks:
+        score += score_line(popcount(own & pattern), popcount(opponent & pattern),
+                            popcount(empty & pattern), variant.line_length)
+
+    # Squares
+    square_cells = variant.square_size * variant.square_size
+    for pattern in variant.square_masks:
+        score += score_square(popcount(own & pattern), popcount(opponent & pattern),
+                              popcount(empty & pattern), square_cells)
+
     # Strategic positions
-    corners = [(0,0), (0,3), (3,0), (3,3)]
-    for corner in corners:
-        if board.board[corner] == player:
-            score += 1000
-        elif board.board[corner] == opponent:
-            score -= 1200
-    
+    score += popcount(own & variant.corner_mask) * WEIGHTS["corner"]
+    score += popcount(opponent & variant.corner_mask) * WEIGHTS["corner_opponent"]
+
     # Threat handling
-    if threats:
-        if board.pieces_placed[player] < 4:  # Placement phase
-            score -= 15000  # Critical to block in placement
+    if detect_immediate_threats(board, player):
+        if board.pieces_placed[player] < variant.pieces:  # Placement phase
+            score += WEIGHTS["threat_placement"]
         else:  # Movement phase
-            score -= 10000  # Important but can potentially move other pieces
-    
+            score += WEIGHTS["threat_movement"]
+
     return score
 
-def minimax(board, depth, maximizing_player, player, phase, alpha=float('-inf'), beta=float('inf')):
+# Shared by every search in this process; set to None to evaluate without caching
+EVAL_CACHE = MEMORY.register("eval cache", EvalCache(MEMORY.allot(DEFAULT_MEMORY_BUDGET, MIN_ENTRIES * ENTRY_BYTES)))
+
+def _eval_cache_bytes():
+    cache = EVAL_CACHE
+    return cache.memory_bytes() if cache is not None else 0
+
+def _eval_cache_hits():
+    cache = EVAL_CACHE
+    return cache.hits if cache is not None else 0
+
+def _eval_cache_lookups():
+    cache = EVAL_CACHE
+    return cache.hits + cache.misses if cache is not None else 0
+
+REGISTRY.callback("avai_eval_cache_bytes", "Estimated memory held by the evaluation cache", _eval_cache_bytes)
+REGISTRY.callback("avai_eval_cache_hits_total", "Evaluation cache hits", _eval_cache_hits, kind="counter")
+REGISTRY.callback("avai_eval_cache_lookups_total", "Evaluation cache lookups", _eval_cache_lookups, kind="counter")
+REGISTRY.callback("avai_eval_cache_hit_ratio", "Evaluation cache hits per lookup",
+                  ratio(_eval_cache_hits, _eval_cache_lookups))
+
+def _clear_eval_cache():
+    if EVAL_CACHE is not None:
+        EVAL_CACHE.clear()
+
+WEIGHT_LISTENERS.append(_clear_eval_cache)
+
+class SearchAborted(Exception):
+    """Raised inside ``pvs`` when a limit in ``SearchStats`` is reached."""
+
+class SearchStats:
+    """Counters collected while searching a position, plus optional limits.
+
+    ``deadline`` is a ``time.perf_counter()`` value and ``stop`` anything with
+    an ``is_set()`` method, such as a ``threading.Event``. Both are polled every
+    ``CHECK_INTERVAL`` nodes.
+    """
+
+    def __init__(self, node_limit=None, deadline=None, stop=None):
+        self.node_limit = node_limit
+        self.deadline = deadline
+        self.stop = stop
+        self.nodes = 0
+        self.cutoffs = 0
+        self.researches = 0
+        self.aspiration_fails = 0
+        self.reductions = 0
+        self.pruned = 0
+        self.extensions = 0
+        self.table_probes = 0
+        self.table_hits = 0
+        self.depth = 0
+        self.killers = {}  # Ply (moves played on the board) -> moves that last cut off there
+
+    def check_limits(self):
+        """Raise ``SearchAborted`` once a node, time or stop limit is hit."""
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchAborted()
+        if self.nodes % CHECK_INTERVAL == 0:
+            if self.stop is not None and self.stop.is_set():
+                raise SearchAborted()
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SearchAborted()
+
+    def __repr__(self):
+        return (f"SearchStats(nodes={self.nodes}, cutoffs={self.cutoffs}, "
+                f"researches={self.researches}, aspiration_fails={self.aspiration_fails})")
+
+def staged_moves(board, current_player, phase, threats, hash_move=None, killers=()):
+    """Yield the move codes for ``current_player`` lazily, the likeliest cutoffs first.
+
+    Stages: the hash move, moves onto cells that complete one of the player's
+    own patterns, blocks of the opponent's ``threats``, the ``killers``, then
+    the rest, corners first while placing. Each stage is only built once the
+    moves before it failed to cut off. While moving, only wins and blocks are
+    generated if some piece can block, as in ``generate_moves``. The hash move
+    and killers are checked for legality, so any code may be passed.
+    """
+    variant = board.variant
+    size = variant.size
+    reach = variant.reach_masks
+    own = board.masks[current_player]
+    empty = variant.full & ~(board.masks[1] | board.masks[2])
+    block_mask = 0
+    for row, col in threats:
+        block_mask |= 1 << (row * size + col)
+    placing = phase == "placement"
+    pieces = () if placing else list(iter_bits(own))
+    # While moving with a threat that some piece can block, nothing else is searched
+    restricted = bool(block_mask) and any(reach[frm] & block_mask for frm in pieces)
+    # Cells that complete the player's own patterns; needed up front only to vet a restricted hash move
+    win_mask = immediate_threat_mask(board, 3 - current_player) if restricted else None
+    forcing = block_mask | (win_mask or 0)
+
+    def legal(code):
+        to = (code & 255) - 1
+        if not empty >> to & 1:
+            return False
+        if code < PLACEMENT_LIMIT:
+            return placing
+        frm = (code >> 8) - 1
+        return (not placing and own >> frm & 1 and reach[frm] >> to & 1
+                and (not restricted or forcing >> to & 1))
+
+    if hash_move is not None and legal(hash_move):
+        yield hash_move
+    else:
+        hash_move = None
+
+    if win_mask is None:
+        win_mask = immediate_threat_mask(board, 3 - current_player)
+        forcing = win_mask | block_mask
+    for mask in (win_mask, block_mask & ~win_mask):
+        if placing:
+            codes = [place_code(to) for to in iter_bits(mask)]
+        else:
+            codes = [move_code(frm, to) for frm in pieces for to in iter_bits(reach[frm] & mask)]
+        for code in codes:
+            if code != hash_move:
+                yield code
+
+    tried = [hash_move]
+    for code in killers:
+        if code not in tried and legal(code) and not forcing >> ((code & 255) - 1) & 1:
+            tried.append(code)
+            yield code
+
+    if restricted:
+        return
+    quiet = empty & ~forcing
+    if placing:
+        codes = ([place_code(to) for to in iter_bits(quiet & variant.corner_mask)]
+                 + [place_code(to) for to in iter_bits(quiet & ~variant.corner_mask)])
+    else:
+        codes = [move_code(frm, to) for frm in pieces for to in iter_bits(reach[frm] & quiet)]
+    for code in codes:
+        if code not in tried:
+            yield code
+
+def generate_moves(board, current_player, phase, threats):
+    """All move codes for ``current_player`` in search order, as a list."""
+    return list(staged_moves(board, current_player, phase, threats))
+
+def killers_at(stats, board):
+    """The killer moves recorded for the current ply, or none without ``stats``."""
+    if stats is None:
+        return ()
+    return stats.killers.get(len(board.history), ())
+
+def record_killer(stats, board, move):
+    """Remember ``move`` as having cut off at the current ply."""
+    if stats is None:
+        return
+    ply = len(board.history)
+    killers = stats.killers.get(ply, [])
+    if move not in killers:
+        stats.killers[ply] = [move] + killers[:MAX_KILLERS - 1]
+
+def minimax(board, depth, maximizing_player, player, phase, alpha=float('-inf'), beta=float('inf'), stats=None):
     """Enhanced minimax algorithm with alpha-beta pruning and threat detection."""
     logger.debug(f"Minimax called: depth={depth}, maximizing={maximizing_player}, player={player}, phase={phase}")
+    if stats is not None:
+        stats.nodes += 1
     
     # Base cases
     if depth == 0 or board.check_winner():
@@ -154,77 +328,39 @@ def minimax(board, depth, maximizing_player, player, phase, alpha=float('-inf'),
     current_player = player if maximizing_player else 3 - player
     threats = detect_immediate_threats(board, current_player)
 
-    # Generate and prioritize moves
-    if phase == "placement":
-        if board.pieces_placed[current_player] >= 4:
-            return evaluate_position(board, player), None
-            
-        empty_cells = board.get_empty_cells()
-        corners = [(0,0), (0,3), (3,0), (3,3)]
-        
-        # Prioritize moves: threats > corners > other moves
-        threat_moves = [("place", pos) for pos in empty_cells if pos in threats]
-        corner_moves = [("place", pos) for pos in empty_cells if pos in corners]
-        regular_moves = [("place", pos) for pos in empty_cells if pos not in corners and pos not in threats]
-        valid_moves = threat_moves + corner_moves + regular_moves
-    else:
-        player_pieces = board.get_player_pieces(current_player)
-        empty_cells = board.get_empty_cells()
-        
-        # Prioritize defensive moves if threats exist
-        if threats:
-            valid_moves = [("move", (from_pos, to_pos))
-                         for from_pos in player_pieces
-                         for to_pos in threats]
-            if not valid_moves:  # If can't directly block, consider all moves
-                valid_moves = [("move", (from_pos, to_pos))
-                             for from_pos in player_pieces
-                             for to_pos in empty_cells]
-        else:
-            valid_moves = [("move", (from_pos, to_pos))
-                         for from_pos in player_pieces
-                         for to_pos in empty_cells]
-
-    if not valid_moves:
+    if phase == "placement" and board.pieces_placed[current_player] >= board.variant.pieces:
         return evaluate_position(board, player), None
 
+    valid_moves = staged_moves(board, current_player, phase, threats, killers=killers_at(stats, board))
+
     if maximizing_player:
         max_eval = float('-inf')
         best_move = None
         
-        for move_type, move in valid_moves:
-            # Make move
-            move_made = False
-            if move_type == "place":
-                if board.pieces_placed[player] < 4:
-                    if board.place_piece(move, player):
-                        move_made = True
-            else:
-                from_pos, to_pos = move
-                if board.move_piece(from_pos, to_pos, player):
-                    move_made = True
+        for move in valid_moves:
+            board.push(move, player)
 
-            if not move_made:
-                continue
-
-            eval_val, _ = minimax(board, depth - 1, False, player, phase, alpha, beta)
+            if board.repetitions() > 1:
+                eval_val = DRAW_SCORE  # Repeated position: either side can force a draw
+            else:
+                eval_val, _ = minimax(board, depth - 1, False, player, phase, alpha, beta, stats)
 
             # Undo move
-            if move_type == "place":
-                board.board[move] = 0
-                board.pieces_placed[player] -= 1
-            else:
-                board.board[to_pos] = 0
-                board.board[from_pos] = player
+            board.pop()
 
             if eval_val > max_eval:
                 max_eval = eval_val
-                best_move = (move_type, move)
+                best_move = move
             
             alpha = max(alpha, eval_val)
             if beta <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
+                record_killer(stats, board, move)
                 break
 
+        if best_move is None:
+            return DRAW_SCORE, None  # Stalemate
         return max_eval, best_move
 
     else:
@@ -232,35 +368,272 @@ def minimax(board, depth, maximizing_player, player, phase, alpha=float('-inf'),
         best_move = None
         opponent = 3 - player
         
-        for move_type, move in valid_moves:
-            move_made = False
-            if move_type == "place":
-                if board.pieces_placed[opponent] < 4:
-                    if board.place_piece(move, opponent):
-                        move_made = True
-            else:
-                from_pos, to_pos = move
-                if board.move_piece(from_pos, to_pos, opponent):
-                    move_made = True
-
-            if not move_made:
-                continue
+        for move in valid_moves:
+            board.push(move, opponent)
 
-            eval_val, _ = minimax(board, depth - 1, True, player, phase, alpha, beta)
-
-            if move_type == "place":
-                board.board[move] = 0
-                board.pieces_placed[opponent] -= 1
+            if board.repetitions() > 1:
+                eval_val = DRAW_SCORE  # Repeated position: either side can force a draw
             else:
-                board.board[to_pos] = 0
-                board.board[from_pos] = opponent
+                eval_val, _ = minimax(board, depth - 1, True, player, phase, alpha, beta, stats)
+
+            board.pop()
 
             if eval_val < min_eval:
                 min_eval = eval_val
-                best_move = (move_type, move)
+                best_move = move
             
             beta = min(beta, eval_val)
             if beta <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
+                record_killer(stats, board, move)
                 break
 
+        if best_move is None:
+            return DRAW_SCORE, None  # Stalemate
         return min_eval, best_move
+
+
+def pvs(board, depth, alpha, beta, color, player, phase, stats=None, moves=None, table=None, first=None):
+    """Principal variation search in negamax form.
+
+    ``color`` is 1 when ``player`` is to move and -1 for the opponent. Leaves are
+    scored with ``evaluate_position`` from ``player``'s point of view and negated
+    for the opponent, so ``color * score`` equals the ``minimax`` value. The first
+    move is searched with the full window and every sibling with a null window,
+    re-searching only when the null window fails high. The re-search tries the
+    best reply found by the null-window search first. It is skipped when the
+    child is a leaf, or one ply above the leaves with no table to probe: such a
+    child scores every leaf, so its fail-high already is its exact score. A
+    move that repeats a position from the game or the current line scores as a
+    draw. ``moves`` restricts the moves searched at this node. Moves are
+    ``game.moves`` codes, and so is the returned best move.
+
+    With a ``TranspositionTable`` as ``table``, results are stored by Zobrist
+    hash, a deep enough entry with a usable bound ends the node and the stored
+    best move is searched first. Without a stored move, ``first`` is searched
+    first if legal. Moves come from ``staged_moves``, and a move that cuts off
+    is remembered in ``stats`` as a killer for its ply.
+    """
+    if stats is not None:
+        stats.nodes += 1
+        stats.check_limits()
+
+    if depth == 0 or board.check_winner():
+        return color * evaluate_position(board, player), None
+
+    hash_move = first
+    if table is not None:
+        entry = table.probe(board.hash)
+        if stats is not None:
+            stats.table_probes += 1
+        if entry is not None:
+            entry_depth, bound, entry_score, entry_move = entry
+            hash_move = entry_move or hash_move
+            # A restricted root must search its own moves
+            if moves is None and entry_depth >= depth and (
+                    bound == EXACT or bound == LOWER and entry_score >= beta or bound == UPPER and entry_score <= alpha):
+                if stats is not None:
+                    stats.table_hits += 1
+                return entry_score, hash_move
+
+    current_player = player if color == 1 else 3 - player
+    threats = detect_immediate_threats(board, current_player)
+
+    if phase == "placement" and board.pieces_placed[current_player] >= board.variant.pieces:
+        return color * evaluate_position(board, player), None
+
+    if moves is None:
+        valid_moves = staged_moves(board, current_player, phase, threats, hash_move, killers_at(stats, board))
+    elif hash_move is not None and hash_move in moves:
+        valid_moves = [hash_move] + [move for move in moves if move != hash_move]
+    else:
+        valid_moves = moves
+
+    original_alpha = alpha
+    best_score = -INF
+    best_move = None
+    for index, move in enumerate(valid_moves):
+        board.push(move, current_player)
+        try:
+            if board.repetitions() > 1:
+                score = DRAW_SCORE
+            elif index == 0:
+                score = -pvs(board, depth - 1, -beta, -alpha, -color, player, phase, stats, table=table)[0]
+            else:
+                score, reply = pvs(board, depth - 1, -alpha - 1, -alpha, -color, player, phase, stats, table=table)
+                score = -score
+                # A child one ply from the leaves scores every leaf exactly unless it cut off,
+                # so its fail-high is already the true score; a table hit there may be a bound
+                if alpha < score < beta and (depth > 2 or depth == 2 and table is not None):
+                    if stats is not None:
+                        stats.researches += 1
+                    score = -pvs(board, depth - 1, -beta, -score, -color, player, phase, stats, table=table,
+                                 first=reply)[0]
+        finally:
+            board.pop()
+
+        if score > best_score:
+            best_score = score
+            best_move = move
+        if score > alpha:
+            alpha = score
+        if alpha >= beta:
+            if stats is not None:
+                stats.cutoffs += 1
+            if move != hash_move:
+                record_killer(stats, board, move)
+            break
+
+    if best_move is None:
+        return DRAW_SCORE, None  # Stalemate
+    if table is not None:
+        bound = LOWER if best_score >= beta else UPPER if best_score <= original_alpha else EXACT
+        table.store(board.hash, depth, bound, best_score, best_move or NO_MOVE)
+    return best_score, best_move
+
+def aspiration_search(board, depth, player, phase, guess, stats=None, moves=None, table=None, first=None):
+    """Search the root with a window around ``guess``, widening it after each failure; ``first`` is tried first."""
+    delta = ASPIRATION_WINDOW
+    alpha, beta = guess - delta, guess + delta
+    for _ in range(ASPIRATION_ATTEMPTS):
+        score, move = pvs(board, depth, alpha, beta, 1, player, phase, stats, moves, table, first)
+        if alpha < score < beta:
+            return score, move
+        if stats is not None:
+            stats.aspiration_fails += 1
+        logger.debug(f"Aspiration window ({alpha}, {beta}) failed with score {score}")
+        delta *= 4
+        if score <= alpha:
+            alpha = score - delta
+        else:
+            beta = score + delta
+    return pvs(board, depth, -INF, INF, 1, player, phase, stats, moves, table, first)
+
+def first_best_move(board, depth, player, phase, score, move, natural, stats=None, table=None):
+    """The first of the ``natural`` root moves worth ``score``, as ``minimax`` picks it, else ``move``.
+
+    ``move`` is a root move worth ``score``; the moves before it are tested
+    with a null window just below ``score``.
+    """
+    if move is None:
+        return move
+    for candidate in natural:
+        if candidate == move:
+            break
+        board.push(candidate, player)
+        try:
+            if board.repetitions() > 1:
+                value = DRAW_SCORE
+            else:
+                value = -pvs(board, depth - 1, -score, -score + 1, -1, player, phase, stats, table=table)[0]
+        finally:
+            board.pop()
+        if value >= score:
+            return candidate
+    return move
+
+def search(board, depth, player, phase, stats=None, moves=None, node_limit=None,
+           time_limit=None, stop=None, info=None, table=None):
+    """Iterative deepening PVS with aspiration windows; returns ``(score, move)`` like ``minimax``.
+
+    ``evaluate_position`` always scores from ``player``'s side, so consecutive
+    iterations alternate between optimistic and pessimistic leaves. The window is
+    therefore centred on the last iteration of the same parity. ``moves``
+    restricts the root moves. The search stops once ``node_limit`` nodes or
+    ``time_limit`` seconds are spent, or ``stop`` is set, and returns the
+    deepest completed iteration; the first iteration always completes.
+    ``info(depth, score, move, stats)`` is called after every iteration.
+    ``table`` is an optional ``TranspositionTable`` shared by all iterations.
+    Each iteration searches the best root move of the previous one first, so
+    after the last one ``first_best_move`` picks among equally scored moves
+    the one ``minimax`` would.
+    """
+    if stats is None:
+        stats = SearchStats()
+    if node_limit is not None:
+        stats.node_limit = stats.nodes + node_limit
+    if time_limit is not None:
+        stats.deadline = time.perf_counter() + time_limit
+    if stop is not None:
+        stats.stop = stop
+
+    if moves is not None:
+        natural = list(moves)
+    else:
+        natural = list(staged_moves(board, player, phase, detect_immediate_threats(board, player)))
+    scores = []
+    score, move = None, None
+    for current_depth in range(1, depth + 1):
+        try:
+            if len(scores) >= 2:
+                result = aspiration_search(board, current_depth, player, phase, scores[-2], stats, moves, table, move)
+            elif current_depth == 1:
+                limits = stats.node_limit, stats.deadline, stats.stop
+                stats.node_limit = stats.deadline = stats.stop = None
+                try:
+                    result = pvs(board, current_depth, -INF, INF, 1, player, phase, stats, moves, table)
+                finally:
+                    stats.node_limit, stats.deadline, stats.stop = limits
+            else:
+                result = pvs(board, current_depth, -INF, INF, 1, player, phase, stats, moves, table, move)
+        except SearchAborted:
+            logger.debug(f"Search limit reached during depth {current_depth}")
+            break
+        score, move = result
+        scores.append(score)
+        if current_depth == depth:
+            try:
+                move = first_best_move(board, depth, player, phase, score, move, natural, stats, table)
+            except SearchAborted:
+                logger.debug(f"Search limit reached while breaking ties at depth {depth}")
+        logger.debug(f"Iteration depth={current_depth} score={score} move={move}")
+        if info is not None:
+            info(current_depth, score, move, stats)
+    stats.depth = len(scores)
+    return score, move
+
+def choose_move(board, depth, player, phase, stats=None, node_limit=None,
+                time_limit=None, stop=None, info=None, table=None):
+    """Pick a move for ``player``: threat-space search first, then ``search``.
+
+    A proven win is played without searching and a proven loss is reported as
+    such. Otherwise the root is limited to the moves that refute the
+    opponent's threat sequences, if any were found. The node, time and stop
+    limits are set on ``stats`` before the threat-space search, so they bound
+    both; if the threat-space search hits one, ``search`` still completes its
+    first iteration. ``info`` and ``table`` are passed on to ``search``;
+    without a ``table`` one is made for this call, as iterative deepening only
+    pays for its shallow iterations through the table.
+    """
+    # The limits cover the threat-space search as well as the search proper
+    if stats is None:
+        stats = SearchStats()
+    if node_limit is not None:
+        stats.node_limit = stats.nodes + node_limit
+    if time_limit is not None:
+        stats.deadline = time.perf_counter() + time_limit
+    if stop is not None:
+        stats.stop = stop
+    try:
+        result, moves = solve_board(board, player, stats=stats)
+    except SearchAborted:
+        logger.debug(f"Threat-space search stopped by the search limits after {stats.nodes} nodes")
+        result, moves = None, None
+    if result == WIN:
+        logger.info(f"Threat-space search proved a win for player {player} with {moves[0]}")
+        return WIN_SCORE, moves[0]
+    if result == LOSS:
+        logger.info(f"Threat-space search proved a loss for player {player}")
+        moves = None
+    own_table = table is None
+    if own_table:
+        table = MEMORY.register("search table", TranspositionTable(table_size(SEARCH_TABLE_ENTRIES)))
+    try:
+        score, move = search(board, depth, player, phase, stats, moves, info=info, table=table)
+    finally:
+        if own_table:
+            table.close()
+    if result == LOSS:
+        return -WIN_SCORE, move
+    return score, move
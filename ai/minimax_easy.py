@@ -1,4 +1,8 @@
 import logging
+from ai.minimax import DRAW_SCORE
+from game.bitboard import iter_bits, popcount
+from game.moves import place_code
+from game.rules import movement_moves
 from utils.helpers import evaluate_board
 
 # Configure logging
@@ -9,75 +13,77 @@ logging.basicConfig(
 )
 logger = logging.getLogger('minimax')
 
-def evaluate_line(line, player):
-    """Evaluate a line (row, column, or diagonal) for potential patterns."""
-    opponent = 3 - player
-    player_count = sum(1 for x in line if x == player)
-    opponent_count = sum(1 for x in line if x == opponent)
-    empty_count = sum(1 for x in line if x == 0)
-    
-    if player_count == 4:
+def score_line(player_count, opponent_count, empty_count, length):
+    """Score a line of ``length`` cells from its piece counts."""
+    if player_count == length:
         return 100  # Winning line
-    if opponent_count == 3 and empty_count == 1:
+    if opponent_count == length - 1 and empty_count == 1:
         return 50   # Block opponent win
-    if player_count == 3 and empty_count == 1:
+    if player_count == length - 1 and empty_count == 1:
         return 25   # Near win
-    if player_count == 2 and empty_count == 2:
+    if player_count == length - 2 and empty_count == 2:
         return 10   # Building pattern
     return 0
 
-def evaluate_square(square, player):
-    """Evaluate a 2x2 square for potential winning patterns."""
-    opponent = 3 - player
-    player_count = sum(sum(1 for x in row if x == player) for row in square)
-    opponent_count = sum(sum(1 for x in row if x == opponent) for row in square)
-    empty_count = sum(sum(1 for x in row if x == 0) for row in square)
-    
-    if player_count == 4:
+def score_square(player_count, opponent_count, empty_count, length):
+    """Score a square of ``length`` cells from its piece counts."""
+    if player_count == length:
         return 200  # Winning square
-    if player_count == 3 and empty_count == 1:
+    if player_count == length - 1 and empty_count == 1:
         return 50   # Near win
-    if player_count == 2 and empty_count == 2:
+    if player_count == length - 2 and empty_count == 2:
         return 20   # Building pattern
     return 0
 
+def evaluate_line(line, player):
+    """Evaluate a line (row, column, or diagonal) for potential patterns."""
+    opponent = 3 - player
+    player_count = sum(1 for x in line if x == player)
+    opponent_count = sum(1 for x in line if x == opponent)
+    empty_count = sum(1 for x in line if x == 0)
+    return score_line(player_count, opponent_count, empty_count, len(line))
+
+def evaluate_square(square, player):
+    """Evaluate a square for potential winning patterns."""
+    cells = [x for row in square for x in row]
+    opponent = 3 - player
+    player_count = sum(1 for x in cells if x == player)
+    opponent_count = sum(1 for x in cells if x == opponent)
+    empty_count = sum(1 for x in cells if x == 0)
+    return score_square(player_count, opponent_count, empty_count, len(cells))
+
 def evaluate_position(board, player):
     """Comprehensive evaluation of the board position."""
+    variant = board.variant
+    own = board.masks[player]
+    opponent = board.masks[3 - player]
+    empty = variant.full & ~(own | opponent)
     score = 0
-    
-    # Check rows and columns
-    for i in range(4):
-        row = board.board[i, :]
-        col = board.board[:, i]
-        score += evaluate_line(row, player)
-        score += evaluate_line(col, player)
-    
-    # Check diagonals
-    diag1 = [board.board[i,i] for i in range(4)]
-    diag2 = [board.board[i,3-i] for i in range(4)]
-    score += evaluate_line(diag1, player)
-    score += evaluate_line(diag2, player)
-    
-    # Check 2x2 squares
-    for i in range(3):
-        for j in range(3):
-            square = board.board[i:i+2, j:j+2]
-            score += evaluate_square(square, player)
-    
+
+    # Rows, columns and diagonals
+    for pattern in variant.line_masks:
+        score += score_line(popcount(own & pattern), popcount(opponent & pattern),
+                            popcount(empty & pattern), variant.line_length)
+
+    # Squares
+    square_cells = variant.square_size * variant.square_size
+    for pattern in variant.square_masks:
+        score += score_square(popcount(own & pattern), popcount(opponent & pattern),
+                              popcount(empty & pattern), square_cells)
+
     # Strategic positions
-    corners = [(0,0), (0,3), (3,0), (3,3)]
-    for corner in corners:
-        if board.board[corner] == player:
-            score += 15
-    
+    score += 15 * popcount(own & variant.corner_mask)
+
     return score
 
-def minimax(board, depth, maximizing_player, player, phase):
+def minimax(board, depth, maximizing_player, player, phase, stats=None):
     """
     Minimax algorithm for both placement and movement phases.
     Returns (score, move) tuple.
     """
     logger.debug(f"Minimax called: depth={depth}, maximizing={maximizing_player}, player={player}, phase={phase}")
+    if stats is not None:
+        stats.nodes += 1
     
     # Base cases
     if depth == 0 or board.check_winner():
@@ -89,63 +95,40 @@ def minimax(board, depth, maximizing_player, player, phase):
 
     # Generate valid moves based on phase
     if phase == "placement":
-        if board.pieces_placed[current_player] >= 4:
+        if board.pieces_placed[current_player] >= board.variant.pieces:
             logger.debug(f"Player {current_player} has placed all pieces")
             return evaluate_position(board, player), None
             
         # Prioritize corners during placement
-        empty_cells = board.get_empty_cells()
-        corners = [(0,0), (0,3), (3,0), (3,3)]
-        strategic_moves = [("place", pos) for pos in empty_cells if pos in corners]
-        regular_moves = [("place", pos) for pos in empty_cells if pos not in corners]
-        valid_moves = strategic_moves + regular_moves
+        variant = board.variant
+        empty = variant.full & ~(board.masks[1] | board.masks[2])
+        valid_moves = ([place_code(to) for to in iter_bits(empty & variant.corner_mask)]
+                       + [place_code(to) for to in iter_bits(empty & ~variant.corner_mask)])
     else:
-        # Movement phase - can move to any empty cell
-        player_pieces = board.get_player_pieces(current_player)
-        empty_cells = board.get_empty_cells()
-        valid_moves = [("move", (from_pos, to_pos))
-                      for from_pos in player_pieces
-                      for to_pos in empty_cells]
+        # Movement phase - any empty cell the movement rule allows
+        valid_moves = movement_moves(board, current_player)
 
     if not valid_moves:
         logger.debug("No valid moves available")
-        return evaluate_position(board, player), None
+        return DRAW_SCORE, None  # Stalemate
 
     if maximizing_player:
         max_eval = float('-inf')
         best_move = None
         
-        for move_type, move in valid_moves:
+        for move in valid_moves:
             # Make move
-            move_made = False
-            if move_type == "place":
-                if board.pieces_placed[player] < 4:
-                    if board.place_piece(move, player):
-                        move_made = True
-                        logger.debug(f"Placed piece at {move}")
-            else:
-                from_pos, to_pos = move
-                if board.move_piece(from_pos, to_pos, player):
-                    move_made = True
-                    logger.debug(f"Moved piece from {from_pos} to {to_pos}")
-
-            if not move_made:
-                continue
+            board.push(move, player)
 
             # Recursive evaluation
-            eval_val, _ = minimax(board, depth - 1, False, player, phase)
+            eval_val, _ = minimax(board, depth - 1, False, player, phase, stats)
 
             # Undo move
-            if move_type == "place":
-                board.board[move] = 0
-                board.pieces_placed[player] -= 1
-            else:
-                board.board[to_pos] = 0
-                board.board[from_pos] = player
+            board.pop()
 
             if eval_val > max_eval:
                 max_eval = eval_val
-                best_move = (move_type, move)
+                best_move = move
                 logger.debug(f"New best move found: {best_move} with score {max_eval}")
 
         return max_eval, best_move
@@ -155,37 +138,19 @@ def minimax(board, depth, maximizing_player, player, phase):
         best_move = None
         opponent = 3 - player
         
-        for move_type, move in valid_moves:
+        for move in valid_moves:
             # Make move
-            move_made = False
-            if move_type == "place":
-                if board.pieces_placed[opponent] < 4:
-                    if board.place_piece(move, opponent):
-                        move_made = True
-                        logger.debug(f"Placed piece at {move}")
-            else:
-                from_pos, to_pos = move
-                if board.move_piece(from_pos, to_pos, opponent):
-                    move_made = True
-                    logger.debug(f"Moved piece from {from_pos} to {to_pos}")
-
-            if not move_made:
-                continue
+            board.push(move, opponent)
 
             # Recursive evaluation
-            eval_val, _ = minimax(board, depth - 1, True, player, phase)
+            eval_val, _ = minimax(board, depth - 1, True, player, phase, stats)
 
             # Undo move
-            if move_type == "place":
-                board.board[move] = 0
-                board.pieces_placed[opponent] -= 1
-            else:
-                board.board[to_pos] = 0
-                board.board[from_pos] = opponent
+            board.pop()
 
             if eval_val < min_eval:
                 min_eval = eval_val
-                best_move = (move_type, move)
+                best_move = move
                 logger.debug(f"New best move found: {best_move} with score {min_eval}")
 
         return min_eval, best_move
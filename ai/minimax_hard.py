@@ -1,4 +1,6 @@
 import logging
+from ai.minimax import (DRAW_SCORE, SearchAborted, SearchStats, detect_immediate_threats, evaluate_position,
+                        killers_at, record_killer, staged_moves)
 from utils.helpers import evaluate_board
 
 # Configure logging
@@ -9,141 +11,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger('minimax')
 
-def evaluate_line(line, player):
-    """Evaluate a line with enhanced threat detection and pattern recognition."""
-    opponent = 3 - player
-    player_count = sum(1 for x in line if x == player)
-    opponent_count = sum(1 for x in line if x == opponent)
-    empty_count = sum(1 for x in line if x == 0)
-    
-    # Critical positions
-    if player_count == 4:
-        return 10000  # Winning line
-    if opponent_count == 4:
-        return -10000  # Lost line
-    if opponent_count == 3 and empty_count == 1:
-        return -5000  # Critical block needed
-    if player_count == 3 and empty_count == 1:
-        return 4000   # Potential win next move
-    
-    # Developing threats
-    if opponent_count == 2 and empty_count == 2:
-        return -2000  # Block developing threat
-    if player_count == 2 and empty_count == 2:
-        return 1500   # Developing opportunity
-    
-    # Early position control
-    if player_count == 1 and empty_count == 3:
-        return 500
-    if opponent_count == 1 and empty_count == 3:
-        return -400
-        
-    return 0
+LMR_MIN_DEPTH = 2      # Shallowest node whose late moves are reduced
+LMR_FULL_MOVES = 3     # Moves searched at full depth before reductions start
+LMR_REDUCTION = 1      # Plies taken off a reduced move
+FUTILITY_MARGINS = {1: 8000, 2: 16000}  # Largest gain expected from a quiet move, by remaining depth
+MAX_EXTENSIONS = 2     # Single-reply extensions allowed along one line
 
-def evaluate_square(square, player):
-    """Evaluate a 2x2 square with enhanced pattern recognition."""
-    opponent = 3 - player
-    player_count = sum(sum(1 for x in row if x == player) for row in square)
-    opponent_count = sum(sum(1 for x in row if x == opponent) for row in square)
-    empty_count = sum(sum(1 for x in row if x == 0) for row in square)
-    
-    # Critical square patterns
-    if player_count == 4:
-        return 20000  # Winning square
-    if opponent_count == 4:
-        return -20000  # Lost square
-    if opponent_count == 3 and empty_count == 1:
-        return -8000  # Must block square
-    if player_count == 3 and empty_count == 1:
-        return 6000   # Near win square
-    
-    # Developing patterns
-    if opponent_count == 2 and empty_count == 2:
-        return -3000  # Potential threat
-    if player_count == 2 and empty_count == 2:
-        return 2000   # Good development
-        
-    return 0
+class SearchOptions:
+    """Switches for the selective parts of ``minimax``."""
 
-def detect_immediate_threats(board, player):
-    """Detect if there are any immediate threats that need attention."""
-    opponent = 3 - player
-    threat_positions = set()
-    
-    # Check rows and columns
-    for i in range(4):
-        row = board.board[i, :]
-        col = board.board[:, i]
-        
-        # Check row threats
-        if sum(1 for x in row if x == opponent) == 3 and sum(1 for x in row if x == 0) == 1:
-            empty_pos = (i, next(j for j in range(4) if row[j] == 0))
-            threat_positions.add(empty_pos)
-            
-        # Check column threats
-        if sum(1 for x in col if x == opponent) == 3 and sum(1 for x in col if x == 0) == 1:
-            empty_pos = (next(j for j in range(4) if col[j] == 0), i)
-            threat_positions.add(empty_pos)
-    
-    # Check 2x2 squares
-    for i in range(3):
-        for j in range(3):
-            square = board.board[i:i+2, j:j+2]
-            if (sum(sum(1 for x in row if x == opponent) for row in square) == 3 and
-                sum(sum(1 for x in row if x == 0) for row in square) == 1):
-                # Find the empty position in the square
-                for di in range(2):
-                    for dj in range(2):
-                        if square[di][dj] == 0:
-                            threat_positions.add((i+di, j+dj))
-    
-    return threat_positions
+    def __init__(self, reductions=True, futility=True, extensions=True):
+        self.reductions = reductions  # Late move reductions for quiet moves, re-searched on fail-high
+        self.futility = futility      # Skip quiet moves near the leaves when the static eval is hopeless
+        self.extensions = extensions  # Search one ply deeper when a single threatened cell must be blocked
+
+    def __repr__(self):
+        return (f"SearchOptions(reductions={self.reductions}, futility={self.futility}, "
+                f"extensions={self.extensions})")
+
+DEFAULT_OPTIONS = SearchOptions()
+FULL_WIDTH = SearchOptions(reductions=False, futility=False, extensions=False)
 
-def evaluate_position(board, player):
-    """Enhanced position evaluation with threat detection and strategic scoring."""
-    score = 0
-    opponent = 3 - player
-    threats = detect_immediate_threats(board, player)
-    
-    # Check rows and columns
-    for i in range(4):
-        row = board.board[i, :]
-        col = board.board[:, i]
-        score += evaluate_line(row, player)
-        score += evaluate_line(col, player)
-    
-    # Check diagonals
-    diag1 = [board.board[i,i] for i in range(4)]
-    diag2 = [board.board[i,3-i] for i in range(4)]
-    score += evaluate_line(diag1, player)
-    score += evaluate_line(diag2, player)
-    
-    # Check 2x2 squares
-    for i in range(3):
-        for j in range(3):
-            square = board.board[i:i+2, j:j+2]
-            score += evaluate_square(square, player)
-    
-    # Strategic positions
-    corners = [(0,0), (0,3), (3,0), (3,3)]
-    for corner in corners:
-        if board.board[corner] == player:
-            score += 1000
-        elif board.board[corner] == opponent:
-            score -= 1200
-    
-    # Threat handling
-    if threats:
-        if board.pieces_placed[player] < 4:  # Placement phase
-            score -= 15000  # Critical to block in placement
-        else:  # Movement phase
-            score -= 10000  # Important but can potentially move other pieces
-    
-    return score
 
-def minimax(board, depth, maximizing_player, player, phase, alpha=float('-inf'), beta=float('inf')):
-    """Enhanced minimax algorithm with alpha-beta pruning and threat detection."""
+def _is_quiet(board, target, threats, mover):
+    """True if the move just made to ``target`` neither blocks, wins nor threatens."""
+    if target in threats or board.check_winner():
+        return False
+    return not detect_immediate_threats(board, 3 - mover)
+
+def minimax(board, depth, maximizing_player, player, phase, alpha=float('-inf'), beta=float('inf'), stats=None,
+            options=DEFAULT_OPTIONS, extensions=0):
+    """Enhanced minimax algorithm with alpha-beta pruning, threat detection and selective search.
+
+    ``options`` switches late move reductions, futility pruning and the
+    single-reply extension; ``FULL_WIDTH`` turns all three off.
+    """
     logger.debug(f"Minimax called: depth={depth}, maximizing={maximizing_player}, player={player}, phase={phase}")
+    if stats is not None:
+        stats.nodes += 1
+        stats.check_limits()
     
     # Base cases
     if depth == 0 or board.check_winner():
@@ -154,77 +60,73 @@ def minimax(board, depth, maximizing_player, player, phase, alpha=float('-inf'),
     current_player = player if maximizing_player else 3 - player
     threats = detect_immediate_threats(board, current_player)
 
-    # Generate and prioritize moves
-    if phase == "placement":
-        if board.pieces_placed[current_player] >= 4:
-            return evaluate_position(board, player), None
-            
-        empty_cells = board.get_empty_cells()
-        corners = [(0,0), (0,3), (3,0), (3,3)]
-        
-        # Prioritize moves: threats > corners > other moves
-        threat_moves = [("place", pos) for pos in empty_cells if pos in threats]
-        corner_moves = [("place", pos) for pos in empty_cells if pos in corners]
-        regular_moves = [("place", pos) for pos in empty_cells if pos not in corners and pos not in threats]
-        valid_moves = threat_moves + corner_moves + regular_moves
-    else:
-        player_pieces = board.get_player_pieces(current_player)
-        empty_cells = board.get_empty_cells()
-        
-        # Prioritize defensive moves if threats exist
-        if threats:
-            valid_moves = [("move", (from_pos, to_pos))
-                         for from_pos in player_pieces
-                         for to_pos in threats]
-            if not valid_moves:  # If can't directly block, consider all moves
-                valid_moves = [("move", (from_pos, to_pos))
-                             for from_pos in player_pieces
-                             for to_pos in empty_cells]
-        else:
-            valid_moves = [("move", (from_pos, to_pos))
-                         for from_pos in player_pieces
-                         for to_pos in empty_cells]
-
-    if not valid_moves:
+    if phase == "placement" and board.pieces_placed[current_player] >= board.variant.pieces:
         return evaluate_position(board, player), None
 
+    # Wins, threat blocks and killers first, then corners during placement
+    valid_moves = staged_moves(board, current_player, phase, threats, killers=killers_at(stats, board))
+
+    # Single-reply extension: with one cell to block, every sensible reply goes there
+    if options.extensions and len(threats) == 1 and extensions < MAX_EXTENSIONS:
+        depth += 1
+        extensions += 1
+        if stats is not None:
+            stats.extensions += 1
+
+    # Futility pruning: near the leaves, a quiet move cannot recover a hopeless static eval
+    futile = False
+    if options.futility and depth in FUTILITY_MARGINS and not threats:
+        static_eval = evaluate_position(board, player)
+        if maximizing_player:
+            futile = static_eval + FUTILITY_MARGINS[depth] <= alpha
+        else:
+            futile = static_eval - FUTILITY_MARGINS[depth] >= beta
+
     if maximizing_player:
         max_eval = float('-inf')
         best_move = None
         
-        for move_type, move in valid_moves:
-            # Make move
-            move_made = False
-            if move_type == "place":
-                if board.pieces_placed[player] < 4:
-                    if board.place_piece(move, player):
-                        move_made = True
-            else:
-                from_pos, to_pos = move
-                if board.move_piece(from_pos, to_pos, player):
-                    move_made = True
-
-            if not move_made:
+        for index, move in enumerate(valid_moves):
+            board.push(move, player)
+
+            target = board.last_move
+            quiet = (futile or options.reductions) and _is_quiet(board, target, threats, player)
+            if futile and quiet and best_move is not None:
+                board.pop()
+                if stats is not None:
+                    stats.pruned += 1
                 continue
 
-            eval_val, _ = minimax(board, depth - 1, False, player, phase, alpha, beta)
+            if board.repetitions() > 1:
+                eval_val = DRAW_SCORE  # Repeated position: either side can force a draw
+            elif (options.reductions and quiet and depth >= LMR_MIN_DEPTH and index >= LMR_FULL_MOVES
+                  and alpha > float('-inf')):
+                # Late move reduction: a shallower null-window search, re-searched if it beats alpha
+                if stats is not None:
+                    stats.reductions += 1
+                eval_val, _ = minimax(board, depth - 1 - LMR_REDUCTION, False, player, phase, alpha, alpha + 1,
+                                      stats, options, extensions)
+                if eval_val > alpha:
+                    eval_val, _ = minimax(board, depth - 1, False, player, phase, alpha, beta, stats, options, extensions)
+            else:
+                eval_val, _ = minimax(board, depth - 1, False, player, phase, alpha, beta, stats, options, extensions)
 
             # Undo move
-            if move_type == "place":
-                board.board[move] = 0
-                board.pieces_placed[player] -= 1
-            else:
-                board.board[to_pos] = 0
-                board.board[from_pos] = player
+            board.pop()
 
             if eval_val > max_eval:
                 max_eval = eval_val
-                best_move = (move_type, move)
+                best_move = move
             
             alpha = max(alpha, eval_val)
             if beta <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
+                record_killer(stats, board, move)
                 break
 
+        if best_move is None:
+            return DRAW_SCORE, None  # Stalemate
         return max_eval, best_move
 
     else:
@@ -232,35 +134,70 @@ def minimax(board, depth, maximizing_player, player, phase, alpha=float('-inf'),
         best_move = None
         opponent = 3 - player
         
-        for move_type, move in valid_moves:
-            move_made = False
-            if move_type == "place":
-                if board.pieces_placed[opponent] < 4:
-                    if board.place_piece(move, opponent):
-                        move_made = True
-            else:
-                from_pos, to_pos = move
-                if board.move_piece(from_pos, to_pos, opponent):
-                    move_made = True
-
-            if not move_made:
+        for index, move in enumerate(valid_moves):
+            board.push(move, opponent)
+
+            target = board.last_move
+            quiet = (futile or options.reductions) and _is_quiet(board, target, threats, opponent)
+            if futile and quiet and best_move is not None:
+                board.pop()
+                if stats is not None:
+                    stats.pruned += 1
                 continue
 
-            eval_val, _ = minimax(board, depth - 1, True, player, phase, alpha, beta)
-
-            if move_type == "place":
-                board.board[move] = 0
-                board.pieces_placed[opponent] -= 1
+            if board.repetitions() > 1:
+                eval_val = DRAW_SCORE  # Repeated position: either side can force a draw
+            elif (options.reductions and quiet and depth >= LMR_MIN_DEPTH and index >= LMR_FULL_MOVES
+                  and beta < float('inf')):
+                if stats is not None:
+                    stats.reductions += 1
+                eval_val, _ = minimax(board, depth - 1 - LMR_REDUCTION, True, player, phase, beta - 1, beta,
+                                      stats, options, extensions)
+                if eval_val < beta:
+                    eval_val, _ = minimax(board, depth - 1, True, player, phase, alpha, beta, stats, options, extensions)
             else:
-                board.board[to_pos] = 0
-                board.board[from_pos] = opponent
+                eval_val, _ = minimax(board, depth - 1, True, player, phase, alpha, beta, stats, options, extensions)
+
+            board.pop()
 
             if eval_val < min_eval:
                 min_eval = eval_val
-                best_move = (move_type, move)
+                best_move = move
             
             beta = min(beta, eval_val)
             if beta <= alpha:
+                if stats is not None:
+                    stats.cutoffs += 1
+                record_killer(stats, board, move)
                 break
 
+        if best_move is None:
+            return DRAW_SCORE, None  # Stalemate
         return min_eval, best_move
+
+def iterative_search(board, max_depth, player, phase, stats=None, options=DEFAULT_OPTIONS):
+    """Deepen ``minimax`` until ``max_depth`` or a limit in ``stats`` is hit.
+
+    Returns ``(score, move, depth)`` of the deepest completed iteration; the
+    first iteration always completes. An aborted iteration leaves moves on
+    the board, so they are taken back before returning.
+    """
+    if stats is None:
+        stats = SearchStats()
+    score, move, completed = None, None, 0
+    start = len(board.history)
+    for depth in range(1, max_depth + 1):
+        limits = stats.node_limit, stats.deadline, stats.stop
+        if depth == 1:
+            stats.node_limit = stats.deadline = stats.stop = None
+        try:
+            score, move = minimax(board, depth, True, player, phase, stats=stats, options=options)
+        except SearchAborted:
+            while len(board.history) > start:
+                board.pop()
+            break
+        finally:
+            stats.node_limit, stats.deadline, stats.stop = limits
+        completed = depth
+    stats.depth = completed
+    return score, move, completed
@@ -0,0 +1,237 @@
+import logging
+import time
+from ai.threats import legal_moves, play
+from game.bitboard import canonical_key, is_win, is_win_at, masks_from_board
+from game.moves import pair_code
+from game.variant import STANDARD
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_ai.log'
+)
+logger = logging.getLogger('pns')
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+INF = 10 ** 9
+ENTRY_BYTES = 200                    # Approximate size of one table entry (key, value, dict slot)
+DEFAULT_MEMORY_LIMIT = 64 * 2 ** 20  # Table budget in bytes
+MIN_ENTRIES = 1024
+DEFAULT_NODE_LIMIT = 200000
+MAX_PATH = 400                       # Deeper lines count as a failure for the attacker
+CHECK_INTERVAL = 32                  # Nodes between polls of the clock and stop flag; a node costs ~0.3ms
+
+class NodeLimitReached(Exception):
+    """Raised inside the search when the node budget or time is spent, or it is stopped."""
+
+class ProofNumberSolver:
+    """Depth-first proof-number (df-pn) solver for the side to move.
+
+    A position is settled by two questions: "does the side to move win?" and
+    "does the opponent win?". If both are disproved the position is a draw:
+    neither side can force a win. Repeating a position on the current path
+    counts as a failure for the attacker. Wins and losses are always exact; a
+    disproof reached through a repetition is stored without its path, so as in
+    most df-pn solvers a draw can occasionally be path dependent.
+
+    Entries are keyed by the canonical (symmetry-reduced) hash of the position,
+    live within a memory budget and are kept across calls, so a solver reused
+    for one game answers later moves of a proved line from the table. A solver
+    works on one ``variant``; the standard 4x4 game uses the unrolled
+    ``canonical_key``.
+    """
+
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, variant=STANDARD):
+        self.variant = variant
+        self.canonical_key = canonical_key if variant is STANDARD else variant.canonical_key
+        self.max_entries = max(MIN_ENTRIES, memory_limit // ENTRY_BYTES)
+        self.table = {}  # key -> (proof number, disproof number, work)
+        self.nodes = 0
+        self.node_limit = INF
+        self.deadline = None
+        self.stop = None
+        self.collections = 0
+
+    def solve(self, own, other, node_limit=DEFAULT_NODE_LIMIT, deadline=None, stop=None):
+        """Return ``(result, move)`` for the side owning ``own``, or ``(None, None)`` if unproved.
+
+        Besides ``node_limit``, the search gives up at ``deadline``, a
+        ``time.perf_counter()`` value, or once ``stop`` (anything with an
+        ``is_set()`` method) is set; both are polled every ``CHECK_INTERVAL``
+        nodes. Entries settled before then stay in the table.
+        """
+        self.nodes = 0
+        self.node_limit = node_limit
+        self.deadline = deadline
+        self.stop = stop
+        try:
+            if self._prove(own, other, True):
+                return WIN, self._pick(own, other, True, lambda entry: entry[0] == 0)
+            if self._prove(own, other, False):
+                # Every move loses; keep the one the opponent needs the most work to beat
+                children = self._children(own, other, False)
+                move = max(children, key=lambda child: self.table.get(child[1], (0, 0, 0))[2])[0]
+                return LOSS, move
+            # Both disproved: play a move after which the opponent still cannot win
+            return DRAW, self._pick(own, other, False, lambda entry: entry[0] >= INF)
+        except NodeLimitReached:
+            logger.debug(f"Proof search limit reached after {self.nodes} nodes")
+            return None, None
+
+    def solve_board(self, board, player, node_limit=DEFAULT_NODE_LIMIT, deadline=None, stop=None):
+        """``solve`` for ``player`` to move on a Board, with the move as a ``game.moves`` code."""
+        if board.variant is not self.variant:
+            raise ValueError(f"Solver for {self.variant.name} given a {board.variant.name} board")
+        masks = masks_from_board(board)
+        result, move = self.solve(masks[player - 1], masks[2 - player], node_limit, deadline, stop)
+        if move is not None:
+            move = pair_code(move)
+        logger.info(f"Proof-number result for player {player}: {result} after {self.nodes} nodes, move={move}")
+        return result, move
+
+    def _prove(self, own, other, attacker_to_move):
+        """Run df-pn on the root until it is settled; True if proved, False if disproved.
+
+        ``attacker_to_move`` selects the question: True asks whether the side to
+        move wins, False whether the opponent does.
+        """
+        while True:
+            pn, dn = self._mid(own, other, attacker_to_move, INF, INF, set())
+            if pn == 0:
+                return True
+            if dn == 0:
+                return False
+
+    def _pick(self, own, other, attacker_to_move, accept):
+        """First root move that wins at once or whose child entry satisfies ``accept``.
+
+        A child whose entry was collected after the root was settled is
+        settled again, within the same limits.
+        """
+        for move, key, terminal in self._children(own, other, attacker_to_move):
+            if terminal:
+                return move
+            entry = self.table.get(key)
+            if entry is None:
+                entry = (0, INF) if self._prove(other, play(own, move), not attacker_to_move) else (INF, 0)
+            if accept(entry):
+                return move
+        return None
+
+    def _key(self, own, other, attacker_to_move):
+        return self.canonical_key(own, other) << 1 | attacker_to_move
+
+    def _children(self, own, other, attacker_to_move):
+        """``(move, child key, move wins at once)`` for every legal move."""
+        children = []
+        for move in legal_moves(own, other, self.variant):
+            new_own = play(own, move)
+            children.append((move, self._key(other, new_own, not attacker_to_move),
+                             is_win_at(new_own, move[1], self.variant)))
+        return children
+
+    def _store(self, key, pn, dn, work):
+        if key not in self.table and len(self.table) >= self.max_entries:
+            self._collect()
+        self.table[key] = (pn, dn, work)
+
+    def _collect(self):
+        """Drop the cheaper half of the unsettled entries once the table is full."""
+        self.collections += 1
+        unsettled = sorted((entry[2], key) for key, entry in self.table.items() if entry[0] and entry[1])
+        for _, key in unsettled[:max(1, len(unsettled) // 2)]:
+            del self.table[key]
+        if len(self.table) >= self.max_entries:
+            # Only settled entries left: drop the cheapest half of everything
+            everything = sorted((entry[2], key) for key, entry in self.table.items())
+            for _, key in everything[:len(everything) // 2]:
+                del self.table[key]
+        logger.debug(f"Table collection {self.collections}: {len(self.table)} entries kept")
+
+    def shrink(self, memory_limit):
+        """Lower the table budget to ``memory_limit`` bytes, collecting until the table fits."""
+        self.max_entries = min(self.max_entries, max(MIN_ENTRIES, memory_limit // ENTRY_BYTES))
+        while len(self.table) > self.max_entries:
+            self._collect()
+
+    def memory_bytes(self):
+        return len(self.table) * ENTRY_BYTES
+
+    def memory_capacity(self):
+        return self.max_entries * ENTRY_BYTES
+
+    def _mid(self, own, other, attacker_to_move, pn_threshold, dn_threshold, path):
+        """One df-pn expansion of the side owning ``own`` to move; returns ``(pn, dn)``."""
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise NodeLimitReached()
+        if self.nodes % CHECK_INTERVAL == 0:
+            if self.stop is not None and self.stop.is_set():
+                raise NodeLimitReached()
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise NodeLimitReached()
+        start_nodes = self.nodes
+
+        if is_win(other, self.variant):
+            # The previous move won
+            return (INF, 0) if attacker_to_move else (0, INF)
+        if len(path) >= MAX_PATH:
+            return INF, 0
+
+        key = self._key(own, other, attacker_to_move)
+        children = self._children(own, other, attacker_to_move)
+        if not children:
+            # The side to move is stalemated: a draw, so the attacker has not won
+            self._store(key, INF, 0, 1)
+            return INF, 0
+        if any(terminal for _, _, terminal in children):
+            pn, dn = (0, INF) if attacker_to_move else (INF, 0)
+            self._store(key, pn, dn, 1)
+            return pn, dn
+
+        path.add(key)
+        returned = {}  # Child results that were not stored (path dependent or collected)
+        while True:
+            numbers = []
+            for index, (_, child_key, _) in enumerate(children):
+                entry = self.table.get(child_key)
+                if child_key in path:
+                    numbers.append((INF, 0))  # Repetition: the attacker has not won
+                elif entry is not None:
+                    numbers.append((entry[0], entry[1]))
+                else:
+                    numbers.append(returned.get(index, (1, 1)))
+
+            if attacker_to_move:
+                pn = min(number[0] for number in numbers)
+                dn = min(INF, sum(number[1] for number in numbers))
+            else:
+                pn = min(INF, sum(number[0] for number in numbers))
+                dn = min(number[1] for number in numbers)
+            if pn == 0 or dn == 0 or pn >= pn_threshold or dn >= dn_threshold:
+                break
+
+            # Descend into the most-proving child with thresholds that bring us back
+            # as soon as a sibling becomes the better choice
+            side = 0 if attacker_to_move else 1
+            order = sorted(range(len(numbers)), key=lambda index: numbers[index][side])
+            best = order[0]
+            second = numbers[order[1]][side] if len(order) > 1 else INF
+            if attacker_to_move:
+                child_pn_threshold = min(pn_threshold, second + 1)
+                child_dn_threshold = min(INF, dn_threshold - dn + numbers[best][1])
+            else:
+                child_dn_threshold = min(dn_threshold, second + 1)
+                child_pn_threshold = min(INF, pn_threshold - pn + numbers[best][0])
+
+            move = children[best][0]
+            returned[best] = self._mid(other, play(own, move), not attacker_to_move,
+                                       child_pn_threshold, child_dn_threshold, path)
+        path.discard(key)
+
+        self._store(key, pn, dn, self.nodes - start_nodes + 1)
+        return pn, dn
@@ -0,0 +1,229 @@
+"""Record the tree explored by a search into a compact binary file for offline analysis.
+
+A ``TreeRecorder`` replaces one search function (``pvs`` or ``minimax`` in
+``ai.minimax``, or the hard engine's ``minimax``) with a recording wrapper
+while it is attached. Their recursive calls go through the module global, so
+every node passes through the wrapper, and the search code itself holds no
+recording hooks: with no recorder attached there is no overhead at all.
+
+Every node is one fixed-size record, appended in visiting order::
+
+    parent  int32   index of the parent record, -1 for a root
+    move    uint16  move leading here: (from + 1) << 8 | (to + 1), from + 1 = 0 for a placement
+    depth   int8    remaining depth
+    flags   uint8   FAIL_HIGH, FAIL_LOW, NULL_WINDOW, RESEARCH, ABORTED, TRUNCATED, TABLE_HIT
+    alpha   int32   window on entry, from the side to move
+    beta    int32
+    score   int32   result, from the side to move
+
+Scores and bounds are stored from the point of view of the side to move, so
+``score >= beta`` is a cutoff in every engine. The file holds at most
+``max_nodes`` records; nodes beyond that are counted but not stored.
+"""
+import struct
+
+from ai import minimax as minimax_module
+from ai import minimax_hard
+from ai.minimax import SearchAborted
+from game.moves import decode_move
+
+MAGIC = b"AVTR"
+VERSION = 1
+HEADER = struct.Struct("<4sBBII")    # magic, version, board size, records, dropped nodes
+RECORD = struct.Struct("<iHbBiii")   # parent, move, depth, flags, alpha, beta, score
+DEFAULT_MAX_NODES = 200000           # 20 bytes each, about 4 MB
+SCORE_LIMIT = 2 ** 31 - 1            # Infinite bounds are clamped to the int32 range
+
+# Record flags
+FAIL_HIGH = 1     # score >= beta: the node was cut off
+FAIL_LOW = 2      # score <= alpha: no move raised alpha
+NULL_WINDOW = 4   # Searched with beta == alpha + 1
+RESEARCH = 8      # The previous sibling was the same move: this is its re-search
+ABORTED = 16      # A search limit was hit inside this node; its score is meaningless
+TRUNCATED = 32    # Some children were not stored because the recorder was full
+TABLE_HIT = 64    # Answered by the transposition table (``pvs`` only)
+FLAG_NAMES = {FAIL_HIGH: "cut", FAIL_LOW: "all", NULL_WINDOW: "null", RESEARCH: "re",
+              ABORTED: "aborted", TRUNCATED: "truncated", TABLE_HIT: "table"}
+
+# Functions that can be recorded: module, attribute and whether it is negamax
+TARGETS = {
+    "pvs": (minimax_module, "pvs", True),
+    "minimax": (minimax_module, "minimax", False),
+    "hard": (minimax_hard, "minimax", False),
+}
+
+def clamp(value):
+    return int(max(-SCORE_LIMIT, min(SCORE_LIMIT, value)))
+
+class TreeRecorder:
+    """Records every node of the ``target`` search function while attached.
+
+        recorder = TreeRecorder(target="pvs")
+        with recorder:
+            search(board, 4, player, phase)
+        recorder.save("tree.bin")
+    """
+
+    def __init__(self, max_nodes=DEFAULT_MAX_NODES, target="pvs"):
+        if target not in TARGETS:
+            raise ValueError(f"Unknown target {target!r}, expected one of {', '.join(TARGETS)}")
+        self.max_nodes = max_nodes
+        self.target = target
+        self.data = bytearray()
+        self.count = 0
+        self.dropped = 0
+        self.size = None
+        self.stack = []        # Record index of every open node, None once the recorder is full
+        self.last_child = {}   # Parent index -> move code of its latest child
+        self.original = None
+
+    def attach(self):
+        module, name, negamax = TARGETS[self.target]
+        if self.original is not None:
+            raise RuntimeError("Recorder is already attached")
+        self.original = getattr(module, name)
+        setattr(module, name, self.wrap(self.original, negamax))
+
+    def detach(self):
+        module, name, _ = TARGETS[self.target]
+        setattr(module, name, self.original)
+        self.original = None
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detach()
+
+    def wrap(self, function, negamax):
+        recorder = self
+
+        if negamax:
+            def recorded(board, depth, alpha, beta, *args, **kwargs):
+                # pvs(board, depth, alpha, beta, color, player, phase, stats, ...)
+                stats = args[3] if len(args) > 3 else kwargs.get("stats")
+                hits = stats.table_hits if stats is not None else 0
+                node = recorder.enter(board, depth, alpha, beta)
+                try:
+                    result = function(board, depth, alpha, beta, *args, **kwargs)
+                except SearchAborted:
+                    recorder.leave(node, 0, ABORTED)
+                    raise
+                # A hit at this node returns before any child is searched
+                hit = node is not None and stats is not None and stats.table_hits > hits and recorder.count == node + 1
+                recorder.leave(node, result[0], TABLE_HIT if hit else 0)
+                return result
+        else:
+            def recorded(board, depth, maximizing_player, player, phase,
+                         alpha=float('-inf'), beta=float('inf'), *args, **kwargs):
+                # Store the window and score from the side to move, as for negamax
+                sign = 1 if maximizing_player else -1
+                low, high = (alpha, beta) if maximizing_player else (-beta, -alpha)
+                node = recorder.enter(board, depth, low, high)
+                try:
+                    result = function(board, depth, maximizing_player, player, phase, alpha, beta, *args, **kwargs)
+                except SearchAborted:
+                    recorder.leave(node, 0, ABORTED)
+                    raise
+                recorder.leave(node, sign * result[0])
+                return result
+        return recorded
+
+    def enter(self, board, depth, alpha, beta):
+        if self.size is None:
+            self.size = board.size
+        if self.stack:
+            parent = self.stack[-1]
+            if parent is None:
+                self.stack.append(None)
+                self.dropped += 1
+                return None
+            move = board.history[-1][0]
+        else:
+            parent, move = -1, 0
+
+        if self.count >= self.max_nodes:
+            if parent >= 0:
+                self.set_flags(parent, TRUNCATED)
+            self.stack.append(None)
+            self.dropped += 1
+            return None
+
+        flags = NULL_WINDOW if beta - alpha == 1 else 0
+        if parent >= 0:
+            if self.last_child.get(parent) == move:
+                flags |= RESEARCH
+            self.last_child[parent] = move
+        node = self.count
+        self.data += RECORD.pack(parent, move, depth, flags, clamp(alpha), clamp(beta), 0)
+        self.count += 1
+        self.stack.append(node)
+        return node
+
+    def leave(self, node, score, flags=0):
+        self.stack.pop()
+        if node is None:
+            return
+        parent, move, depth, old_flags, alpha, beta, _ = RECORD.unpack_from(self.data, node * RECORD.size)
+        if not flags & ABORTED:
+            if score >= beta:
+                flags |= FAIL_HIGH
+            elif score <= alpha:
+                flags |= FAIL_LOW
+        RECORD.pack_into(self.data, node * RECORD.size, parent, move, depth, old_flags | flags,
+                         alpha, beta, clamp(score))
+
+    def set_flags(self, node, flags):
+        offset = node * RECORD.size
+        record = list(RECORD.unpack_from(self.data, offset))
+        record[3] |= flags
+        RECORD.pack_into(self.data, offset, *record)
+
+    def save(self, path):
+        with open(path, "wb") as handle:
+            handle.write(HEADER.pack(MAGIC, VERSION, self.size or 0, self.count, self.dropped))
+            handle.write(self.data)
+
+class SearchTree:
+    """A recorded tree loaded back: records, children and subtree sizes."""
+
+    def __init__(self, size, records, dropped):
+        self.size = size
+        self.records = records   # (parent, move, depth, flags, alpha, beta, score) per node
+        self.dropped = dropped
+        self.children = [[] for _ in records]
+        self.roots = []
+        for index, record in enumerate(records):
+            if record[0] < 0:
+                self.roots.append(index)
+            else:
+                self.children[record[0]].append(index)
+        # Records are in visiting order, so a subtree is a contiguous run
+        self.subtree_size = [1] * len(records)
+        for index in range(len(records) - 1, -1, -1):
+            parent = records[index][0]
+            if parent >= 0:
+                self.subtree_size[parent] += self.subtree_size[index]
+
+    def move(self, index):
+        return decode_move(self.records[index][1], self.size)
+
+    def path(self, index):
+        """The moves from the root down to ``index``."""
+        moves = []
+        while self.records[index][0] >= 0:
+            moves.append(self.move(index))
+            index = self.records[index][0]
+        return moves[::-1]
+
+def load_tree(path):
+    with open(path, "rb") as handle:
+        data = handle.read()
+    magic, version, size, count, dropped = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a search tree recording")
+    records = list(RECORD.iter_unpack(data[HEADER.size:HEADER.size + count * RECORD.size]))
+    if len(records) != count:
+        raise ValueError(f"{path} is truncated: {len(records)} of {count} records")
+    return SearchTree(size, records, dropped)
@@ -0,0 +1,140 @@
+"""Lazy SMP: several processes search the same root and share one transposition table.
+
+Every worker runs its own iterative deepening of ``pvs`` over a shared
+``TranspositionTable``. Workers with an odd index start one ply deeper and
+helpers search the root moves in their own shuffled order, so they reach
+different parts of the tree first and fill the table for each other. A worker
+that finishes a depth moves past the deepest depth any worker has completed.
+The main process only collects results and keeps the deepest completed
+iteration.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+from ai.minimax import (INF, SearchAborted, SearchStats, aspiration_search, detect_immediate_threats,
+                        generate_moves, pvs)
+from ai.table import TranspositionTable, table_size
+from utils.memory import MEMORY
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_ai.log'
+)
+logger = logging.getLogger('smp')
+
+DEFAULT_TABLE_ENTRIES = 1 << 18  # 4 MiB of shared table
+POLL_INTERVAL = 0.01             # Seconds between checks of the clock and stop flag
+
+def default_workers():
+    return os.cpu_count() or 1
+
+class SmpResult:
+    """Outcome of ``smp_search``: the deepest completed iteration and the work done."""
+
+    def __init__(self, score, move, depth, nodes, table_hits, workers):
+        self.score = score
+        self.move = move
+        self.depth = depth
+        self.nodes = nodes
+        self.table_hits = table_hits
+        self.workers = workers
+
+    def __repr__(self):
+        return (f"SmpResult(score={self.score}, move={self.move}, depth={self.depth}, "
+                f"nodes={self.nodes}, workers={self.workers})")
+
+def worker(index, board, max_depth, player, phase, table_name, table_entries, time_limit,
+           stop, completed, results):
+    """Search until ``max_depth``, the time limit or ``stop``; report each completed depth.
+
+    Puts ``(index, depth, score, move, nodes, table_hits)`` on ``results`` per
+    iteration and a final one with ``depth`` None.
+    """
+    table = TranspositionTable(table_entries, table_name)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    stats = SearchStats(deadline=deadline, stop=stop)
+    moves = generate_moves(board, player, phase, detect_immediate_threats(board, player))
+    if index:
+        random.Random(index).shuffle(moves)
+    scores = {}
+    depth = 1 + index % 2
+    try:
+        while depth <= max_depth:
+            if depth - 2 in scores:
+                score, move = aspiration_search(board, depth, player, phase, scores[depth - 2], stats, moves, table)
+            else:
+                score, move = pvs(board, depth, -INF, INF, 1, player, phase, stats, moves, table)
+            scores[depth] = score
+            results.put((index, depth, score, move, stats.nodes, stats.table_hits))
+            with completed.get_lock():
+                completed.value = max(completed.value, depth)
+                depth = max(depth, completed.value) + 1
+    except SearchAborted:
+        pass
+    finally:
+        results.put((index, None, None, None, stats.nodes, stats.table_hits))
+        table.close()
+
+def smp_search(board, depth, player, phase, workers=None, time_limit=None, stop=None,
+               table_entries=None):
+    """Search with ``workers`` processes (default: one per core) and return an ``SmpResult``.
+
+    The search ends once some worker completes ``depth``, ``time_limit``
+    seconds pass or ``stop`` is set. If no iteration completed in time, a
+    depth-1 search in this process provides the move. Without
+    ``table_entries`` the table is sized by ``ai.table.table_size``.
+    """
+    workers = workers or default_workers()
+    table_entries = table_entries or table_size(DEFAULT_TABLE_ENTRIES)
+    table = MEMORY.register("transposition table", TranspositionTable(table_entries))
+    context = multiprocessing.get_context()
+    stop_event = context.Event()
+    completed = context.Value("i", 0)
+    results = context.Queue()
+    processes = [context.Process(target=worker, daemon=True,
+                                 args=(index, board, depth, player, phase, table.name, table_entries,
+                                       time_limit, stop_event, completed, results))
+                 for index in range(workers)]
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    best_depth, best_score, best_move = 0, None, None
+    nodes = table_hits = finished = 0
+    try:
+        for process in processes:
+            process.start()
+        while finished < workers:
+            if not stop_event.is_set() and (deadline is not None and time.perf_counter() >= deadline
+                                            or stop is not None and stop.is_set()):
+                stop_event.set()
+            try:
+                index, done_depth, score, move, worker_nodes, worker_hits = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if done_depth is None:
+                finished += 1
+                nodes += worker_nodes
+                table_hits += worker_hits
+                continue
+            logger.debug(f"Worker {index} completed depth {done_depth}: score={score} move={move}")
+            if done_depth > best_depth:
+                best_depth, best_score, best_move = done_depth, score, move
+            if done_depth >= depth:
+                stop_event.set()
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join()
+        table.close()
+
+    if best_move is None:
+        logger.warning("No worker completed an iteration; searching depth 1 in the main process")
+        stats = SearchStats()
+        best_score, best_move = pvs(board, 1, -INF, INF, 1, player, phase, stats)
+        best_depth = 1
+        nodes += stats.nodes
+    return SmpResult(best_score, best_move, best_depth, nodes, table_hits, workers)
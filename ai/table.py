@@ -0,0 +1,87 @@
+"""Transposition table in shared memory, written and read without locks.
+
+The table is a fixed array of two 64-bit words per entry, ``key ^ data`` and
+``data``, in a ``multiprocessing.shared_memory`` block so several search
+processes can share it. A reader accepts an entry only if the two words XOR
+back to the probed key, so an entry torn by a concurrent write from another
+process reads as a miss rather than as a wrong result. ``data`` packs::
+
+    bits  0-31  score + 2**31, from the side to move
+    bits 32-39  remaining depth
+    bits 40-41  bound: EXACT, LOWER or UPPER
+    bits 42-57  best move, a ``game.moves`` code
+    bit  63     set in every stored entry, so zeroed memory never matches
+
+Scores are relative to the root player of the search that stored them (see
+``ai.minimax.pvs``), so a table must only be shared by searches for the same
+player.
+"""
+from multiprocessing import shared_memory
+
+from utils.memory import MEMORY
+
+EXACT, LOWER, UPPER = 0, 1, 2
+DEFAULT_ENTRIES = 1 << 16   # 1 MiB
+MIN_ENTRIES = 1 << 12
+ENTRY_BYTES = 16
+SCORE_OFFSET = 1 << 31
+VALID = 1 << 63
+
+def table_size(wanted=DEFAULT_ENTRIES):
+    """Entries of a new table: up to ``wanted``, as the memory budget allows, rounded down to a power of two."""
+    entries = MEMORY.allot(wanted * ENTRY_BYTES, MIN_ENTRIES * ENTRY_BYTES) // ENTRY_BYTES
+    return 1 << (entries.bit_length() - 1)
+
+class TranspositionTable:
+    """A table of ``entries`` slots, a power of two, indexed by the low bits of the Zobrist hash.
+
+    Without ``name`` a new block is created and owned by this object; with the
+    ``name`` of an existing table, that table is attached to.
+    """
+
+    def __init__(self, entries=DEFAULT_ENTRIES, name=None):
+        if entries <= 0 or entries & (entries - 1):
+            raise ValueError(f"Table size must be a power of two, got {entries}")
+        self.entries = entries
+        self.index_mask = entries - 1
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=entries * ENTRY_BYTES)
+            self.memory.buf[:entries * ENTRY_BYTES] = bytes(entries * ENTRY_BYTES)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        self.words = self.memory.buf[:entries * ENTRY_BYTES].cast("Q")
+
+    def probe(self, key):
+        """Return ``(depth, bound, score, move code)`` stored for ``key``, or None."""
+        slot = (key & self.index_mask) << 1
+        data = self.words[slot + 1]
+        if data and self.words[slot] ^ data == key:
+            return data >> 32 & 0xFF, data >> 40 & 3, (data & 0xFFFFFFFF) - SCORE_OFFSET, data >> 42 & 0xFFFF
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """Store a result, keeping a deeper entry of the same position."""
+        slot = (key & self.index_mask) << 1
+        old = self.words[slot + 1]
+        if old and self.words[slot] ^ old == key and old >> 32 & 0xFF > depth:
+            return
+        data = VALID | move << 42 | bound << 40 | depth << 32 | (round(score) + SCORE_OFFSET)
+        self.words[slot] = key ^ data
+        self.words[slot + 1] = data
+
+    def memory_bytes(self):
+        return self.entries * ENTRY_BYTES
+
+    memory_capacity = memory_bytes
+
+    def clear(self):
+        self.memory.buf[:self.entries * ENTRY_BYTES] = bytes(self.entries * ENTRY_BYTES)
+
+    def close(self):
+        """Detach from the block; the owner also frees it."""
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
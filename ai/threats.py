@@ -0,0 +1,175 @@
+import logging
+from game.bitboard import masks_from_board, popcount
+from game.moves import pair_code
+from game.rules import has_legal_move, legal_moves
+from game.variant import STANDARD
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_ai.log'
+)
+logger = logging.getLogger('threats')
+
+WIN = 1
+LOSS = -1
+MAX_THREAT_DEPTH = 6  # Attacker moves in a threat sequence
+REFUTATION_NODE_LIMIT = 2000  # Nodes the scan for refuting moves may spend before it gives up
+
+# Moves are (from_index, to_index) pairs on bit indices; from_index is -1 for a placement.
+# game.moves.pair_code turns one into the move code the searches use.
+# Every function takes the Variant whose tables to use, the standard 4x4 game by default.
+# Legal moves, and which pieces can reach a cell, follow the variant's movement rule (game.rules).
+
+class NodeLimitReached(Exception):
+    """Raised inside ``attack`` when the node limit of a refutation scan is spent."""
+
+def play(own, move):
+    """Mask of the moving side after ``move``."""
+    frm, to = move
+    if frm >= 0:
+        own &= ~(1 << frm)
+    return own | (1 << to)
+
+def winning_cells(own, other, variant=STANDARD):
+    """Mask of empty cells where the side owning ``own`` completes a pattern on its next turn."""
+    empty = variant.full & ~(own | other)
+    placing = popcount(own) < variant.pieces
+    cells = 0
+    for pattern in variant.win_masks:
+        missing = pattern & ~own
+        if missing and not missing & (missing - 1) and missing & empty:
+            # A moved piece must come from outside the pattern it completes
+            if placing or own & ~pattern & variant.reach_masks[missing.bit_length() - 1]:
+                cells |= missing
+    return cells
+
+def winning_move(own, other, variant=STANDARD):
+    """A move that wins immediately for the side owning ``own``, or None."""
+    empty = variant.full & ~(own | other)
+    placing = popcount(own) < variant.pieces
+    for pattern in variant.win_masks:
+        missing = pattern & ~own
+        if missing and not missing & (missing - 1) and missing & empty:
+            to = missing.bit_length() - 1
+            if placing:
+                return -1, to
+            outside = own & ~pattern & variant.reach_masks[to]
+            if outside:
+                return (outside & -outside).bit_length() - 1, to
+    return None
+
+def threat_targets(own, other, variant=STANDARD):
+    """Mask of empty cells that can turn a pattern free of opponent pieces into a threat."""
+    empty = variant.full & ~(own | other)
+    targets = 0
+    for pattern in variant.win_masks:
+        if not pattern & other and popcount(pattern & own) >= popcount(pattern) - 2:
+            targets |= pattern & empty
+    return targets
+
+def attack(own, other, depth=MAX_THREAT_DEPTH, stats=None, table=None, variant=STANDARD, node_limit=None):
+    """Find a win by continuous threats for the side owning ``own``, who is to move.
+
+    Only threat-creating moves are tried for the attacker and only blocks of the
+    threatened cell for the defender; any other defence loses at once. A double
+    threat wins outright because one move can fill only one cell. Returns the
+    first move of the sequence, or None if no forced win was found. ``table``
+    caches results across calls on the same root. The limits of ``stats``, an
+    ``ai.minimax.SearchStats``, are polled at every node, so ``SearchAborted``
+    may propagate; past ``node_limit`` counted nodes ``NodeLimitReached`` is
+    raised.
+    """
+    if stats is not None:
+        stats.nodes += 1
+        stats.check_limits()
+        if node_limit is not None and stats.nodes > node_limit:
+            raise NodeLimitReached()
+
+    move = winning_move(own, other, variant)
+    if move is not None:
+        return move
+    if depth == 0:
+        return None
+
+    if table is None:
+        table = {}
+    key = (own, other, depth)
+    if key in table:
+        return table[key]
+    table[key] = move = _attack_moves(own, other, depth, stats, table, variant, node_limit)
+    return move
+
+def _attack_moves(own, other, depth, stats, table, variant, node_limit):
+    """Try every threat-creating move for ``attack``."""
+    # The defender already threatens: every attacking move has to block it
+    defender_cells = winning_cells(other, own, variant)
+    if defender_cells & (defender_cells - 1):
+        return None
+
+    targets = defender_cells or threat_targets(own, other, variant)
+    for move in legal_moves(own, other, variant):
+        if not targets >> move[1] & 1:
+            continue
+        if stats is not None:
+            stats.check_limits()
+        new_own = play(own, move)
+        threats = winning_cells(new_own, other, variant)
+        if not threats or winning_cells(other, new_own, variant):
+            continue
+        if not has_legal_move(other, new_own, variant):
+            continue  # Stalemate: a draw, not a win
+        if threats & (threats - 1):
+            return move
+
+        for reply in legal_moves(other, new_own, variant):
+            if 1 << reply[1] != threats:
+                continue
+            if attack(new_own, play(other, reply), depth - 1, stats, table, variant, node_limit) is None:
+                break
+        else:
+            return move
+
+    return None
+
+def solve(own, other, depth=MAX_THREAT_DEPTH, stats=None, variant=STANDARD):
+    """Classify a position for the side owning ``own`` with threat-space search.
+
+    Returns ``(WIN, [move])`` for a proven win, ``(LOSS, [])`` when every move
+    lets the opponent win by threats, and ``(None, moves)`` otherwise, where
+    ``moves`` lists the moves that refute the opponent's threat sequences
+    (None when the opponent has no threat sequence at all). With ``stats``,
+    the scan for refuting moves gives up after ``REFUTATION_NODE_LIMIT``
+    nodes and ``moves`` is None as well; the limits of ``stats`` bound the
+    whole call (see ``attack``).
+    """
+    move = attack(own, other, depth, stats, variant=variant)
+    if move is not None:
+        return WIN, [move]
+
+    # During placement a move only takes cells away from the opponent, so if the
+    # opponent has nothing even with an extra tempo, every move is safe
+    table = {}
+    if popcount(own) < variant.pieces and attack(other, own, depth, stats, table, variant) is None:
+        return None, None
+
+    scan_limit = stats.nodes + REFUTATION_NODE_LIMIT if stats is not None else None
+    try:
+        safe = [move for move in legal_moves(own, other, variant)
+                if attack(other, play(own, move), depth, stats, table, variant, scan_limit) is None]
+    except NodeLimitReached:
+        logger.debug(f"Refutation scan gave up after {REFUTATION_NODE_LIMIT} nodes")
+        return None, None
+    if not safe:
+        return LOSS, []
+    return None, safe
+
+def solve_board(board, player, depth=MAX_THREAT_DEPTH, stats=None):
+    """``solve`` for ``player`` to move on a Board, with moves as ``game.moves`` codes."""
+    masks = masks_from_board(board)
+    result, moves = solve(masks[player - 1], masks[2 - player], depth, stats, board.variant)
+    if moves is not None:
+        moves = [pair_code(move) for move in moves]
+    logger.debug(f"Threat-space result for player {player}: {result}, moves={moves}")
+    return result, moves
@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_ai.log'
+)
+logger = logging.getLogger('weights')
+
+# Evaluation weights, named by pattern and piece counts from the evaluated player's side.
+# These are the hand-picked values; a tuned table in WEIGHTS_FILE overrides them.
+DEFAULT_WEIGHTS = {
+    "line_win": 10000,          # Winning line
+    "line_loss": -10000,        # Lost line
+    "line_block_three": -5000,  # Critical block needed
+    "line_three": 4000,         # Potential win next move
+    "line_block_two": -2000,    # Block developing threat
+    "line_two": 1500,           # Developing opportunity
+    "line_one": 500,            # Early position control
+    "line_block_one": -400,
+    "square_win": 20000,        # Winning square
+    "square_loss": -20000,      # Lost square
+    "square_block_three": -8000,  # Must block square
+    "square_three": 6000,       # Near win square
+    "square_block_two": -3000,  # Potential threat
+    "square_two": 2000,         # Good development
+    "corner": 1000,
+    "corner_opponent": -1200,
+    "threat_placement": -15000,  # Critical to block in placement
+    "threat_movement": -10000,   # Important but can potentially move other pieces
+}
+
+WEIGHTS_FILE = os.environ.get(
+    "AVAI_WEIGHTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weights.json"))
+
+def load_weights(path=WEIGHTS_FILE):
+    """Return the default weights updated with any found in ``path``."""
+    weights = dict(DEFAULT_WEIGHTS)
+    if not os.path.exists(path):
+        return weights
+    try:
+        with open(path) as handle:
+            loaded = json.load(handle)
+        unknown = set(loaded) - set(DEFAULT_WEIGHTS)
+        if unknown:
+            logger.warning(f"Ignoring unknown weights in {path}: {sorted(unknown)}")
+        weights.update({name: int(round(value)) for name, value in loaded.items() if name in DEFAULT_WEIGHTS})
+        logger.info(f"Loaded evaluation weights from {path}")
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load weights from {path}: {str(e)}")
+    return weights
+
+def save_weights(weights, path=WEIGHTS_FILE):
+    """Write a weight table in the format ``load_weights`` reads."""
+    with open(path, "w") as handle:
+        json.dump({name: int(round(weights[name])) for name in DEFAULT_WEIGHTS}, handle, indent=2)
+        handle.write("\n")
+
+def use_weights(weights):
+    """Switch the evaluators to ``weights`` in place, e.g. between players of a match."""
+    WEIGHTS.clear()
+    WEIGHTS.update(weights)
+    for listener in WEIGHT_LISTENERS:
+        listener()
+
+# Loaded once at startup; evaluators read from this table
+WEIGHTS = load_weights()
+# Called after use_weights, e.g. to drop cached evaluations
+WEIGHT_LISTENERS = []
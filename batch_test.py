@@ -0,0 +1,24 @@
+"""Checks that ``ai.batch.batch_search`` still matches ``minimax_easy`` when its plies span several chunks.
+
+Run from the repository root:
+
+    python -m pytest -q batch_test.py
+"""
+from ai import batch, minimax_easy
+from ai.minimax import SearchStats
+from benchmarks.batch_moves import random_games
+from game.variant import VARIANTS
+
+def test_chunked_movement_games_match_minimax_easy(monkeypatch):
+    # A small chunk splits both the expansion and the leaf scoring of a few games
+    monkeypatch.setattr(batch, "CHUNK_NODES", 128)
+    games = [game for game in random_games(VARIANTS["6x6"], 240) if game[2] == "movement"][:6]
+    assert len(games) == 6
+    boards, players, phases = zip(*games)
+
+    batch_stats, single_stats = SearchStats(), SearchStats()
+    batched = batch.batch_search(boards, players, phases, 2, batch_stats)
+    single = [minimax_easy.minimax(board, 2, True, player, phase, single_stats) for board, player, phase in games]
+    assert batched == single
+    assert batch_stats.nodes == single_stats.nodes
+    assert batch_stats.nodes > 10 * batch.CHUNK_NODES
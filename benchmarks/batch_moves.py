@@ -0,0 +1,67 @@
+"""Easy AI moves per second for many concurrent games, one search each versus batched.
+
+Every game is a random unfinished position; all of them are searched at the
+easy depth, first one ``minimax_easy`` call at a time and then in one
+``batch_search`` call. Both must return the same score and move for every
+game. Run from the repository root:
+
+    python -m benchmarks.batch_moves --games 500
+    python -m benchmarks.batch_moves --games 200 --variant 6x6
+"""
+import argparse
+import time
+
+from ai import minimax_easy
+from ai.batch import batch_search
+from ai.calibration import FIXED_DEPTHS
+from ai.minimax import SearchStats
+from benchmarks.positions import build_board, generate_positions
+from game.variant import STANDARD, VARIANTS
+
+POSITIONS_PER_SEED = 12
+
+def random_games(variant, count):
+    """``count`` ``(board, player, phase)`` games spread over the opening, placement and movement."""
+    games = []
+    seed = 0
+    while len(games) < count:
+        for name, rows, player, phase in generate_positions(variant, POSITIONS_PER_SEED, seed):
+            games.append((build_board(rows, player, variant), player, phase))
+        seed += 1
+    return games[:count]
+
+def run(count, depth, variant=STANDARD):
+    games = random_games(variant, count)
+    boards = [board for board, _, _ in games]
+    players = [player for _, player, _ in games]
+    phases = [phase for _, _, phase in games]
+
+    single_stats = SearchStats()
+    start = time.perf_counter()
+    single = [minimax_easy.minimax(board, depth, True, player, phase, single_stats) for board, player, phase in games]
+    single_time = time.perf_counter() - start
+
+    batch_stats = SearchStats()
+    start = time.perf_counter()
+    batched = batch_search(boards, players, phases, depth, batch_stats)
+    batch_time = time.perf_counter() - start
+
+    if batched != single:
+        mismatches = sum(a != b for a, b in zip(batched, single))
+        raise AssertionError(f"Batched search differs from minimax_easy in {mismatches} games")
+    print(f"{count} {variant.name} games at depth {depth}, {single_stats.nodes} nodes")
+    print(f"{'search':<10} {'seconds':>8} {'moves/s':>9} {'nodes/s':>10}")
+    for name, seconds, stats in (("single", single_time, single_stats), ("batched", batch_time, batch_stats)):
+        print(f"{name:<10} {seconds:>8.3f} {count / seconds:>9.0f} {stats.nodes / seconds:>10.0f}")
+    print(f"speedup: {single_time / batch_time:.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--depth", type=int, default=FIXED_DEPTHS["easy"])
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default=STANDARD.name)
+    args = parser.parse_args()
+    run(args.games, args.depth, VARIANTS[args.variant])
+
+if __name__ == '__main__':
+    main()
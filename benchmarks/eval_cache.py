@@ -0,0 +1,63 @@
+"""Search time with and without the evaluation cache.
+
+Every benchmark position is searched by iterative deepening three times: with
+no cache, with an empty cache and again with the cache left warm, as when
+successive moves of a game revisit the same leaves. Results must not depend on
+the cache. Run from the repository root:
+
+    python -m benchmarks.eval_cache --depth 4
+    python -m benchmarks.eval_cache --depth 4 --budget 65536
+"""
+import argparse
+import time
+
+import ai.minimax as minimax_module
+from ai.evalcache import DEFAULT_MEMORY_BUDGET, EvalCache
+from ai.minimax import SearchStats, search
+from benchmarks.positions import load_positions
+from game.variant import STANDARD, VARIANTS
+
+def timed_searches(positions, depth):
+    results = []
+    start = time.perf_counter()
+    for name, board, player, phase in positions:
+        results.append(search(board, depth, player, phase, SearchStats()))
+    return results, time.perf_counter() - start
+
+def run(depth, budget, variant=STANDARD):
+    positions = [position for position in load_positions(variant) if not position[1].check_winner()]
+    previous = minimax_module.EVAL_CACHE
+    try:
+        minimax_module.EVAL_CACHE = None
+        reference, uncached = timed_searches(positions, depth)
+
+        cache = EvalCache(budget)
+        minimax_module.EVAL_CACHE = cache
+        cold, cold_time = timed_searches(positions, depth)
+        cold_stats = (cache.hits, cache.misses, cache.evictions)
+        warm, warm_time = timed_searches(positions, depth)
+    finally:
+        minimax_module.EVAL_CACHE = previous
+
+    if cold != reference or warm != reference:
+        raise AssertionError("Cached searches returned different results")
+    print(f"cache: {cache.capacity} entries from a {budget}-byte budget")
+    print(f"{'run':<10} {'seconds':>8} {'speedup':>8} {'hits':>9} {'misses':>9} {'evictions':>9} {'hit rate':>8}")
+    print(f"{'uncached':<10} {uncached:>8.2f} {1.0:>8.2f}")
+    hits, misses, evictions = cold_stats
+    print(f"{'cold':<10} {cold_time:>8.2f} {uncached / cold_time:>8.2f} {hits:>9} {misses:>9} {evictions:>9} "
+          f"{hits / max(1, hits + misses):>8.1%}")
+    hits, misses, evictions = cache.hits - hits, cache.misses - misses, cache.evictions - evictions
+    print(f"{'warm':<10} {warm_time:>8.2f} {uncached / warm_time:>8.2f} {hits:>9} {misses:>9} {evictions:>9} "
+          f"{hits / max(1, hits + misses):>8.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--budget", type=int, default=DEFAULT_MEMORY_BUDGET, help="cache memory budget in bytes")
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default=STANDARD.name)
+    args = parser.parse_args()
+    run(args.depth, args.budget, VARIANTS[args.variant])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Measure per-move latency of every AI difficulty and compare it against a baseline.
+
+Each difficulty plays the move for every benchmark position ``--repeat``
+times with a fresh AIPlayer, so no table carries over between runs. The
+corpus covers both phases, including the widest positions: the empty board
+(16 placements) and the quiet movement positions (32 moves each). The report
+gives latency percentiles, nodes/sec and the peak memory of one move,
+measured in a separate tracemalloc pass so tracing does not skew the timings.
+Players search with the budgets of ``ai.calibration``, which are saved with
+the results.
+
+Run from the repository root:
+
+    python -m benchmarks.latency
+    python -m benchmarks.latency --output latest.json --threshold 0.2
+    python -m benchmarks.latency --update-baseline
+
+The exit status is 1 when any difficulty regressed beyond the threshold, or
+when a move took longer than its budget's hard stop; the baseline is not
+updated then.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from ai.minimax import SearchStats
+from ai.calibration import load_budgets
+from benchmarks.positions import load_positions
+from game.player import DIFFICULTIES, AIPlayer
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "latency_baseline.json")
+DEFAULT_THRESHOLD = 0.25  # Allowed relative slowdown before a metric counts as a regression
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+def time_moves(difficulty, positions, repeat):
+    """Latencies in seconds and the total node count of every move played."""
+    latencies = []
+    nodes = 0
+    for _ in range(repeat):
+        for name, board, player, phase in positions:
+            ai = AIPlayer(player, difficulty)
+            stats = SearchStats()
+            start = time.perf_counter()
+            ai.think(board, phase, stats)
+            latencies.append(time.perf_counter() - start)
+            nodes += stats.nodes
+    return latencies, nodes
+
+def peak_memory(difficulty, positions):
+    """Largest traced allocation peak, in bytes, of a single move."""
+    peak = 0
+    for name, board, player, phase in positions:
+        ai = AIPlayer(player, difficulty)
+        tracemalloc.start()
+        try:
+            ai.think(board, phase)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return peak
+
+def run(difficulties, repeat):
+    positions = [position for position in load_positions() if not position[1].check_winner()]
+    results = {}
+    for difficulty in difficulties:
+        latencies, nodes = time_moves(difficulty, positions, repeat)
+        total = sum(latencies)
+        results[difficulty] = {
+            "moves": len(latencies),
+            "mean_ms": 1000 * total / len(latencies),
+            "p50_ms": 1000 * percentile(latencies, 0.50),
+            "p95_ms": 1000 * percentile(latencies, 0.95),
+            "p99_ms": 1000 * percentile(latencies, 0.99),
+            "max_ms": 1000 * max(latencies),
+            "nodes_per_sec": nodes / total if total else 0.0,
+            "peak_kib": peak_memory(difficulty, positions) / 1024,
+        }
+        print(format_row(difficulty, results[difficulty]))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "positions": len(positions),
+            "repeat": repeat,
+            "budgets": {name: budget.to_dict() for name, budget in load_budgets().items()},
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def format_row(difficulty, row):
+    return (f"{difficulty:<8} {row['moves']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+            f"{row['p99_ms']:>9.1f} {row['max_ms']:>9.1f} {row['nodes_per_sec']:>10.0f} {row['peak_kib']:>9.0f}")
+
+def over_budget(current):
+    """Messages for every difficulty whose slowest move exceeded its budget's hard stop."""
+    messages = []
+    for difficulty, row in current["results"].items():
+        seconds = current["meta"]["budgets"][difficulty]["seconds"]
+        if seconds is not None and row["max_ms"] > 1000 * seconds:
+            messages.append(f"{difficulty} max_ms: {row['max_ms']:.1f} over the {1000 * seconds:.0f} ms stop")
+    return messages
+
+def compare(current, baseline, threshold):
+    """Return the regressions of ``current`` against ``baseline`` as messages."""
+    regressions = []
+    for difficulty, row in current["results"].items():
+        reference = baseline["results"].get(difficulty)
+        if reference is None:
+            continue
+        for metric in LATENCY_METRICS + ("peak_kib",):
+            if row[metric] > reference[metric] * (1 + threshold):
+                regressions.append(f"{difficulty} {metric}: {row[metric]:.1f} vs baseline {reference[metric]:.1f}")
+        if row["nodes_per_sec"] < reference["nodes_per_sec"] * (1 - threshold):
+            regressions.append(f"{difficulty} nodes_per_sec: {row['nodes_per_sec']:.0f} "
+                               f"vs baseline {reference['nodes_per_sec']:.0f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--difficulty", nargs="+", choices=list(DIFFICULTIES), default=list(DIFFICULTIES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of every position")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change that counts as a regression")
+    parser.add_argument("--update-baseline", action="store_true", help="overwrite the baseline with these results")
+    args = parser.parse_args()
+
+    print(f"{'level':<8} {'moves':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'nodes/s':>10} {'peak KiB':>9}")
+    current = run(args.difficulty, args.repeat)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(current, handle, indent=2)
+            handle.write("\n")
+    overruns = over_budget(current)
+    for message in overruns:
+        print(f"OVER BUDGET {message}")
+    if args.update_baseline:
+        if overruns:
+            print("baseline not written: moves exceeded their budget")
+            sys.exit(1)
+        with open(args.baseline, "w") as handle:
+            json.dump(current, handle, indent=2)
+            handle.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update-baseline to create one")
+        sys.exit(1 if overruns else 0)
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    print(f"baseline from {baseline['meta']['created']} ({baseline['meta']['machine']}):")
+    for difficulty, row in baseline["results"].items():
+        if difficulty in current["results"]:
+            print(format_row(difficulty, row))
+    regressions = compare(current, baseline, args.threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if regressions or overruns:
+        sys.exit(1)
+    print(f"no regressions beyond {100 * args.threshold:.0f}%")
+
+if __name__ == '__main__':
+    main()
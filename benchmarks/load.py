@@ -0,0 +1,255 @@
+"""Load test of the game host: simulated clients playing full games over localhost.
+
+Starts ``host.py`` on a free port (or uses ``--connect``), then ramps the
+number of concurrent clients through ``--clients``. Each client plays random
+legal moves in complete games against the AI, waiting an exponentially
+distributed think time (mean ``--think`` seconds) before each move, with the
+difficulty of each game drawn from ``--mix``. Every stage is measured for
+``--stage-seconds`` after a warm-up and reports:
+
+    games/s, moves/s     completed games and AI replies per second
+    p50/p95/p99          latency of an AI reply as the client sees it, in ms,
+                         overall and p95 per difficulty
+    queue                mean and peak AI turns queued or being searched
+    cpu/game             host CPU seconds per completed game, in ms
+    host/client cpu      CPU use of the host and of this load generator
+
+The ramp stops at the saturation point: the first stage where more clients
+raise games/s by less than 5%, or where the p95 reply latency exceeds
+``--slo`` seconds. Both processes share the machine, so the client CPU column
+shows how much of it the load generator takes. Run from the repository root:
+
+    python -m benchmarks.load
+    python -m benchmarks.load --clients 50,200,1000,2000 --think 0.5 --mix easy=0.8,hard=0.2
+    python -m benchmarks.load --connect 127.0.0.1:8765
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.latency import percentile
+from game.moves import decode_move, encode_move, move_from, move_to, pair_code
+from game.notation import format_move, parse_move
+from game.rules import legal_moves
+from game.variant import STANDARD, VARIANTS
+from host import raise_file_limit
+
+SATURATION_GAIN = 0.05  # Smallest games/s gain from a stage that still counts as scaling
+STATS_INTERVAL = 0.25   # Seconds between queue depth samples
+ERROR_BACKOFF = 0.1     # Seconds a client waits after an error reply, e.g. a host out of memory for new games
+DEFAULT_MIX = "easy=0.6,medium=0.3,hard=0.1"
+
+class Stage:
+    """What the clients and the host sampler record while one stage is measured."""
+
+    def __init__(self, clients):
+        self.clients = clients
+        self.games = 0
+        self.errors = 0
+        self.latencies = {}  # By difficulty, in seconds
+        self.queue = []
+
+    def all_latencies(self):
+        return [latency for values in self.latencies.values() for latency in values]
+
+class LoadTest:
+    def __init__(self, address, port, variant, mix, think, seed):
+        self.address = address
+        self.port = port
+        self.variant = variant
+        self.difficulties, self.weights = zip(*mix.items())
+        self.think = think
+        self.rng = random.Random(seed)
+        self.stage = Stage(0)   # Replaced at the start of each measured stage
+        self.stop = asyncio.Event()
+
+    async def client(self, rng):
+        reader, writer = await asyncio.open_connection(self.address, self.port)
+
+        async def request(line):
+            writer.write((line + "\n").encode())
+            await writer.drain()
+            reply = (await reader.readline()).decode()
+            if not reply:
+                raise ConnectionError("Host closed the connection")
+            return reply.split()
+
+        try:
+            while not self.stop.is_set():
+                await self.play_game(rng, request)
+        finally:
+            writer.close()
+
+    async def play_game(self, rng, request):
+        variant = self.variant
+        difficulty = rng.choices(self.difficulties, self.weights)[0]
+        side = rng.choice((1, 2))
+        masks = {1: 0, 2: 0}
+
+        def apply(player, code):
+            if move_from(code) >= 0:
+                masks[player] &= ~(1 << move_from(code))
+            masks[player] |= 1 << move_to(code)
+
+        start = time.perf_counter()
+        words = await request(f"newgame variant {variant.name} difficulty {difficulty} side {'xo'[side - 1]}")
+        while True:
+            if words[0] == "error":
+                self.stage.errors += 1
+                await asyncio.sleep(ERROR_BACKOFF)
+                return
+            reply = dict(zip(words[::2], words[1::2]))
+            if "aimove" in reply:
+                self.stage.latencies.setdefault(difficulty, []).append(time.perf_counter() - start)
+                apply(3 - side, encode_move(parse_move(reply["aimove"], variant), variant.size))
+            if "end" in reply:
+                self.stage.games += 1
+                return
+            if self.think:
+                await asyncio.sleep(rng.expovariate(1 / self.think))
+            code = pair_code(rng.choice(legal_moves(masks[side], masks[3 - side], variant)))
+            apply(side, code)
+            start = time.perf_counter()
+            words = await request(f"move {format_move(decode_move(code, variant.size))}")
+
+    async def host_stats(self, request):
+        words = await request("stats")
+        return {name: float(value) for name, value in zip(words[::2], words[1::2])}
+
+    async def sample_queue(self, request):
+        while True:
+            stats = await self.host_stats(request)
+            self.stage.queue.append(stats["queue"] + stats["searching"])
+            await asyncio.sleep(STATS_INTERVAL)
+
+    async def run(self, levels, warmup, seconds, slo):
+        reader, writer = await asyncio.open_connection(self.address, self.port)
+
+        async def request(line):
+            writer.write((line + "\n").encode())
+            await writer.drain()
+            return (await reader.readline()).decode().split()
+
+        sampler = asyncio.create_task(self.sample_queue(request))
+        clients = []
+        results = []
+        best = 0.0
+        saturated = None
+        print(f"{'clients':>7} {'games/s':>8} {'moves/s':>8} {'p50':>6} {'p95':>6} {'p99':>6} "
+              + "".join(f"{'p95 ' + name:>11}" for name in self.difficulties)
+              + f" {'queue':>11} {'cpu/game':>8} {'host':>5} {'client':>6} {'errors':>6}")
+        try:
+            for level in levels:
+                while len(clients) < level:
+                    clients.append(asyncio.create_task(self.client(random.Random(self.rng.random()))))
+                await asyncio.sleep(warmup)
+                for task in clients:
+                    if task.done() and task.exception() is not None:
+                        raise task.exception()
+
+                stage = self.stage = Stage(level)
+                before = await self.host_stats(request)
+                client_cpu, wall = time.process_time(), time.perf_counter()
+                await asyncio.sleep(seconds)
+                after = await self.host_stats(request)
+                client_cpu, wall = time.process_time() - client_cpu, time.perf_counter() - wall
+
+                latencies = stage.all_latencies()
+                games_per_second = stage.games / wall
+                host_games = after["finished"] - before["finished"]
+                cpu_per_game = (after["cpu"] - before["cpu"]) / host_games if host_games else float("nan")
+                row = [f"{level:>7}", f"{games_per_second:>8.1f}", f"{len(latencies) / wall:>8.1f}"]
+                for fraction in (0.5, 0.95, 0.99):
+                    row.append(f"{1000 * percentile(latencies, fraction):>6.0f}" if latencies else f"{'-':>6}")
+                for name in self.difficulties:
+                    values = stage.latencies.get(name)
+                    row.append(f"{1000 * percentile(values, 0.95):>11.0f}" if values else f"{'-':>11}")
+                queue = stage.queue or [0]
+                row.append(f"{sum(queue) / len(queue):>5.1f}/{max(queue):>5.0f}")
+                row.append(f"{1000 * cpu_per_game:>8.1f}")
+                row.append(f"{(after['cpu'] - before['cpu']) / wall:>5.0%}")
+                row.append(f"{client_cpu / wall:>6.0%}")
+                row.append(f"{stage.errors:>6}")
+                print(" ".join(row), flush=True)
+                results.append((level, games_per_second))
+
+                p95 = percentile(latencies, 0.95) if latencies else 0.0
+                if p95 > slo:
+                    saturated = f"p95 reply latency over {slo:g}s at {level} clients"
+                    results.pop()
+                    break
+                if len(results) > 1 and games_per_second < best * (1 + SATURATION_GAIN):
+                    saturated = f"{level} clients raised games/s by less than {SATURATION_GAIN:.0%}"
+                    break
+                best = max(best, games_per_second)
+        finally:
+            self.stop.set()
+            for task in clients:
+                task.cancel()
+            sampler.cancel()
+            await asyncio.gather(*clients, sampler, return_exceptions=True)
+            writer.close()
+
+        if saturated is None:
+            print(f"No saturation up to {levels[-1]} clients")
+        elif not results:
+            print(f"Saturated from the first stage: {saturated}")
+        else:
+            level, games_per_second = max(results, key=lambda result: result[1])
+            print(f"Saturation: {level} clients, {games_per_second:.1f} games/s ({saturated})")
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        mix[name] = float(weight or 1)
+    return mix
+
+def start_host():
+    """Run host.py on a free port; returns the process and its port."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, os.path.join(root, "host.py"), "--port", "0"],
+                               stdout=subprocess.PIPE, text=True)
+    words = process.stdout.readline().split()
+    if not words or words[0] != "listening":
+        process.kill()
+        raise RuntimeError("host.py did not start")
+    return process, int(words[2])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", default="10,20,50,100,200,500,1000,2000",
+                        help="comma-separated concurrent clients per stage")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="difficulty weights, e.g. easy=0.8,hard=0.2")
+    parser.add_argument("--think", type=float, default=1.0, help="mean client think time in seconds, 0 for none")
+    parser.add_argument("--stage-seconds", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds after adding clients before measuring")
+    parser.add_argument("--slo", type=float, default=1.0, help="p95 reply latency in seconds that counts as saturated")
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default=STANDARD.name)
+    parser.add_argument("--connect", help="address:port of a running host instead of starting one")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.clients.split(",")]
+    raise_file_limit()
+    process = None
+    if args.connect:
+        address, _, port = args.connect.rpartition(":")
+        port = int(port)
+    else:
+        process, port = start_host()
+        address = "127.0.0.1"
+    try:
+        test = LoadTest(address, port, VARIANTS[args.variant], parse_mix(args.mix), args.think, args.seed)
+        asyncio.run(test.run(levels, args.warmup, args.stage_seconds, args.slo))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+if __name__ == '__main__':
+    main()
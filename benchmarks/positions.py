@@ -0,0 +1,69 @@
+import random
+
+from game.board import Board
+from game.variant import STANDARD
+
+GENERATED_POSITIONS = 12  # Positions drawn for variants without a hand-picked list
+
+# Benchmark positions: (name, rows, player to move, phase).
+# Rows use the same symbols as Board.__str__: '.' empty, 'X' player 1, 'O' player 2.
+POSITIONS = [
+    ("empty", ["....", "....", "....", "...."], 1, "placement"),
+    ("opening-corner", ["X...", "....", "....", "...."], 2, "placement"),
+    ("opening-centre", ["....", ".X..", "..O.", "...."], 1, "placement"),
+    ("square-threat", ["XX..", "X.O.", "..O.", "...."], 2, "placement"),
+    ("line-race", ["XXX.", "....", "OO..", "..O."], 1, "placement"),
+    ("late-placement", ["X..O", ".XO.", ".OX.", "...."], 1, "placement"),
+    ("last-placement", ["X..O", ".XO.", ".OX.", "...O"], 1, "placement"),
+    ("movement-quiet", ["X..O", ".XO.", "O.X.", "X.O."], 1, "movement"),
+    ("movement-spread", ["X.O.", "..X.", "O..O", ".XOX"], 2, "movement"),
+    ("movement-threat", ["XXX.", "O..O", ".O..", "O..X"], 2, "movement"),
+    ("movement-double", ["XX.O", "XO..", "..O.", "O.X."], 1, "movement"),
+    ("movement-blocked", ["XOXO", "....", "....", "OXOX"], 1, "movement"),
+    # Forced wins by continuous threats, a few moves deep
+    ("threat-early", [".X..", "..O.", "...O", ".X.."], 1, "placement"),
+    ("threat-placement", [".OX.", "..X.", "O...", "..OX"], 1, "placement"),
+    ("threat-movement", ["..XX", "...O", "O..O", "X.XO"], 1, "movement"),
+]
+
+def build_board(rows, to_move=1, variant=STANDARD):
+    """Build a Board from row strings without going through the logged move API."""
+    symbols = {'.': 0, 'X': 1, 'O': 2}
+    board = Board(variant=variant)
+    board.load([[symbols[ch] for ch in row] for row in rows], to_move)
+    return board
+
+def generate_positions(variant, count=GENERATED_POSITIONS, seed=0):
+    """``(name, rows, player, phase)`` for ``count`` random unfinished positions of ``variant``.
+
+    Piece counts run from the opening to the movement phase so every stage of
+    the game is covered.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        stage = len(positions) / max(1, count - 1)
+        placed = round(stage * 2 * variant.pieces)
+        x_count, o_count = (placed + 1) // 2, placed // 2
+        player = 1 if x_count == o_count else 2
+        cells = rng.sample(range(variant.cells), x_count + o_count)
+        rows = [['.'] * variant.size for _ in range(variant.size)]
+        for order, index in enumerate(cells):
+            row, col = variant.cell(index)
+            rows[row][col] = 'X' if order < x_count else 'O'
+        rows = ["".join(row) for row in rows]
+        board = build_board(rows, player, variant)
+        if board.check_winner():
+            continue
+        phase = "placement" if board.pieces_placed[player] < variant.pieces else "movement"
+        positions.append((f"{variant.name}-{len(positions):02d}-{placed}", rows, player, phase))
+    return positions
+
+def load_positions(variant=STANDARD):
+    """Yield ``(name, board, player, phase)`` for every benchmark position of ``variant``."""
+    # The hand-picked positions suit any variant on the standard board, whatever its movement rule
+    standard_board = (variant.size, variant.pieces, variant.line_length, variant.square_size) == (
+        STANDARD.size, STANDARD.pieces, STANDARD.line_length, STANDARD.square_size)
+    positions = POSITIONS if standard_board else generate_positions(variant)
+    for name, rows, player, phase in positions:
+        yield name, build_board(rows, player, variant), player, phase
@@ -0,0 +1,84 @@
+"""Compare node counts of full-window alpha-beta against PVS with aspiration windows.
+
+PVS, and iterative deepening without and with a transposition table as
+``choose_move`` gives it, must return the same score and move as alpha-beta.
+The exit status is 1 when PVS, or iterative deepening with its table, needs
+more nodes in total than alpha-beta.
+
+Run from the repository root:
+
+    python -m benchmarks.pvs_nodes --depth 3
+    python -m benchmarks.pvs_nodes --depth 2 --variant 6x6
+"""
+import argparse
+import sys
+import time
+
+from ai.minimax import SEARCH_TABLE_ENTRIES, SearchStats, minimax, pvs, search
+from ai.table import TranspositionTable
+from benchmarks.positions import load_positions
+from game.moves import decode_move
+from game.notation import format_move
+from game.variant import STANDARD, VARIANTS
+
+COLUMNS = ("alphabeta", "pvs", "id+asp", "id+table")
+# Searches that must not need more nodes than alpha-beta
+CHECKED = ("pvs", "id+table")
+
+def run(depth, variant=STANDARD):
+    """Print the node counts per position and return the totals by column."""
+    totals = dict.fromkeys(COLUMNS, 0)
+    print(f"{'position':<20} {'alphabeta':>10} {'pvs':>10} {'id+asp':>10} {'id+table':>10}  move")
+    for name, board, player, phase in load_positions(variant):
+        if board.check_winner():
+            continue
+        reference_stats = SearchStats()
+        reference = minimax(board, depth, True, player, phase, stats=reference_stats)
+
+        pvs_stats = SearchStats()
+        result = pvs(board, depth, float('-inf'), float('inf'), 1, player, phase, pvs_stats)
+        if result != reference:
+            raise AssertionError(f"{name}: alpha-beta {reference}, pvs {result}")
+
+        iterative_stats = SearchStats()
+        iterative = search(board, depth, player, phase, iterative_stats)
+
+        table = TranspositionTable(SEARCH_TABLE_ENTRIES)
+        try:
+            table_stats = SearchStats()
+            tabled = search(board, depth, player, phase, table_stats, table=table)
+        finally:
+            table.close()
+
+        for label, result in (("id+asp", iterative), ("id+table", tabled)):
+            if result != reference:
+                raise AssertionError(f"{name}: alpha-beta {reference}, {label} {result}")
+
+        counts = (reference_stats.nodes, pvs_stats.nodes, iterative_stats.nodes, table_stats.nodes)
+        for key, count in zip(COLUMNS, counts):
+            totals[key] += count
+        move = format_move(decode_move(reference[1], board.size)) if reference[1] else 'none'
+        print(f"{name:<20}" + "".join(f" {count:>10}" for count in counts) + f"  {move}")
+
+    print(f"{'total':<20}" + "".join(f" {totals[key]:>10}" for key in COLUMNS))
+    for key in COLUMNS[1:]:
+        saved = 100.0 * (totals["alphabeta"] - totals[key]) / totals["alphabeta"]
+        print(f"{key}: {saved:.1f}% fewer nodes than full-window alpha-beta")
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default=STANDARD.name)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    totals = run(args.depth, VARIANTS[args.variant])
+    print(f"elapsed: {time.perf_counter() - start:.2f}s")
+    regressions = [key for key in CHECKED if totals[key] > totals["alphabeta"]]
+    for key in regressions:
+        print(f"REGRESSION {key}: {totals[key]} nodes vs alpha-beta {totals['alphabeta']}")
+    if regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
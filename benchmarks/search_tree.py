@@ -0,0 +1,204 @@
+"""Record search trees and turn the recordings into summaries or Graphviz graphs.
+
+Run from the repository root:
+
+    python -m benchmarks.search_tree record movement-quiet --depth 4 --output tree.bin
+    python -m benchmarks.search_tree record empty --depth 4 --target hard --output hard.bin
+    python -m benchmarks.search_tree record empty --depth 5 --table 65536 --output table.bin
+    python -m benchmarks.search_tree summary tree.bin
+    python -m benchmarks.search_tree dot tree.bin --path a4d4 --levels 2 --output tree.dot
+
+``record`` searches one benchmark position: ``pvs`` runs the iterative
+deepening ``search``, with a transposition table if ``--table`` gives its
+size, ``minimax`` the plain alpha-beta reference and ``hard``
+the hard engine. The summary measures move ordering (how often a cutoff comes
+from the first move) and lists the nodes where late cutoffs and re-searches
+cost the most. ``dot`` draws one subtree, chosen by a node index or by the
+moves leading to it from a root.
+"""
+import argparse
+import sys
+
+from ai import minimax as minimax_module
+from ai.minimax import SearchStats, search
+from ai.minimax_hard import iterative_search
+from ai.recorder import (DEFAULT_MAX_NODES, FAIL_HIGH, FAIL_LOW, FLAG_NAMES, RESEARCH, TABLE_HIT,
+                         TARGETS, TRUNCATED, TreeRecorder, load_tree)
+from ai.table import TranspositionTable
+from benchmarks.positions import load_positions
+from game.moves import decode_move
+from game.notation import format_move, parse_move
+from game.variant import STANDARD, VARIANTS
+
+TOP_NODES = 10          # Entries in each "most wasteful" list of the summary
+DOT_NODE_LIMIT = 500    # Nodes drawn before the graph is cut short
+
+def record(args):
+    variant = VARIANTS[args.variant]
+    positions = {name: (board, player, phase) for name, board, player, phase in load_positions(variant)}
+    if args.position not in positions:
+        raise SystemExit(f"Unknown position {args.position!r}, expected one of {', '.join(positions)}")
+    board, player, phase = positions[args.position]
+    stats = SearchStats()
+    table = TranspositionTable(args.table) if args.table else None
+    with TreeRecorder(args.max_nodes, args.target) as recorder:
+        if args.target == "pvs":
+            score, move = search(board, args.depth, player, phase, stats, table=table)
+        elif args.target == "minimax":
+            # Through the module, so the root call is recorded too
+            score, move = minimax_module.minimax(board, args.depth, True, player, phase, stats=stats)
+        else:
+            score, move, _ = iterative_search(board, args.depth, player, phase, stats)
+    if table is not None:
+        table.close()
+    recorder.save(args.output)
+    print(f"{args.position}: score {score} move {format_move(decode_move(move, board.size)) if move else 'none'}, "
+          f"{stats.nodes} nodes, {recorder.count} recorded, {recorder.dropped} dropped -> {args.output}")
+
+def describe(tree, index):
+    moves = tree.path(index)
+    return " ".join(format_move(move) for move in moves) or "(root)"
+
+def summary(args):
+    tree = load_tree(args.tree)
+    records = tree.records
+    print(f"{len(records)} nodes in {len(tree.roots)} root searches, {tree.dropped} not recorded")
+
+    # Per remaining depth: nodes, cut nodes, and cut nodes cut by their first move
+    by_depth = {}
+    late_cutoffs = []
+    researches = []
+    for index, (parent, _, depth, flags, _, _, _) in enumerate(records):
+        row = by_depth.setdefault(depth, [0, 0, 0, 0])
+        row[0] += 1
+        children = tree.children[index]
+        if flags & TRUNCATED:
+            continue  # Its children are incomplete
+        if flags & FAIL_HIGH and children:
+            row[1] += 1
+            if len(children) == 1:
+                row[2] += 1
+            else:
+                # The cutting move is the last one searched; everything before it was wasted
+                wasted = sum(tree.subtree_size[child] for child in children[:-1])
+                late_cutoffs.append((wasted, index, len(children)))
+        if flags & FAIL_LOW and children:
+            row[3] += 1
+        if flags & RESEARCH and parent >= 0:
+            first = tree.children[parent][tree.children[parent].index(index) - 1]
+            researches.append((tree.subtree_size[first], index))
+
+    print(f"{'depth':>5} {'nodes':>9} {'cut':>8} {'first%':>7} {'all':>8}")
+    for depth in sorted(by_depth, reverse=True):
+        nodes, cut, first, all_nodes = by_depth[depth]
+        rate = f"{100.0 * first / cut:.1f}" if cut else "-"
+        print(f"{depth:>5} {nodes:>9} {cut:>8} {rate:>7} {all_nodes:>8}")
+
+    cut_nodes = sum(row[1] for row in by_depth.values())
+    first_cuts = sum(row[2] for row in by_depth.values())
+    if cut_nodes:
+        print(f"cutoffs on the first move: {first_cuts}/{cut_nodes} ({100.0 * first_cuts / cut_nodes:.1f}%)")
+    wasted = sum(entry[0] for entry in late_cutoffs)
+    print(f"nodes searched before a late cutoff: {wasted} ({100.0 * wasted / max(1, len(records)):.1f}%)")
+    research_nodes = sum(entry[0] for entry in researches)
+    print(f"re-searches: {len(researches)}, costing {research_nodes} nodes in failed null-window searches")
+    hits = sum(1 for record in records if record[3] & TABLE_HIT)
+    if hits:
+        print(f"transposition table hits: {hits}")
+
+    if late_cutoffs:
+        print("\nlatest cutoffs (wasted nodes, node, cutting move and its place, path):")
+        for wasted, index, searched in sorted(late_cutoffs, reverse=True)[:args.top]:
+            cutting = format_move(tree.move(tree.children[index][-1]))
+            print(f"  {wasted:>8}  #{index:<7} {cutting:<6} {searched:>3}  {describe(tree, index)}")
+    if researches:
+        print("\ncostliest re-searches (wasted nodes, node, path):")
+        for wasted, index in sorted(researches, reverse=True)[:args.top]:
+            print(f"  {wasted:>8}  #{index:<7} {describe(tree, index)}")
+
+def find_node(tree, args):
+    if args.node is not None:
+        if not 0 <= args.node < len(tree.records):
+            raise SystemExit(f"No node {args.node}; the recording has {len(tree.records)}")
+        return args.node
+    if not tree.roots:
+        raise SystemExit("The recording is empty")
+    index = tree.roots[args.root]
+    variant = next((v for v in VARIANTS.values() if v.size == tree.size), STANDARD)
+    for text in args.path:
+        move = parse_move(text, variant)
+        matches = [child for child in tree.children[index] if tree.move(child) == move]
+        if not matches:
+            raise SystemExit(f"Move {text} was not searched below {describe(tree, index)}")
+        index = matches[-1]  # The re-search, if the move was searched twice
+    return index
+
+def label(tree, index):
+    _, _, depth, flags, alpha, beta, score = tree.records[index]
+    move = tree.move(index)
+    names = ",".join(name for flag, name in FLAG_NAMES.items() if flags & flag)
+    window = f"[{alpha}, {beta}]".replace(str(2 ** 31 - 1), "inf")
+    return (f"#{index} {format_move(move) if move else 'root'}\\nd={depth} {window}\\n"
+            f"score {score} nodes {tree.subtree_size[index]}" + (f"\\n{names}" if names else ""))
+
+def dot(args):
+    tree = load_tree(args.tree)
+    start = find_node(tree, args)
+    lines = ["digraph search {", "  node [shape=box, fontname=monospace, fontsize=10];"]
+    queue = [(start, 0, None, 0)]
+    drawn = 0
+    while queue and drawn < args.limit:
+        index, level, parent, order = queue.pop(0)
+        flags = tree.records[index][3]
+        colour = "firebrick" if flags & FAIL_HIGH else "gray50" if flags & FAIL_LOW else "black"
+        lines.append(f'  n{index} [label="{label(tree, index)}", color={colour}];')
+        if parent is not None:
+            style = "dashed" if flags & RESEARCH else "solid"
+            lines.append(f'  n{parent} -> n{index} [label="{order}", style={style}];')
+        drawn += 1
+        if level < args.levels:
+            queue.extend((child, level + 1, index, order + 1) for order, child in enumerate(tree.children[index]))
+    if queue:
+        lines.append(f'  more [label="{len(queue)} more nodes not drawn", shape=plaintext];')
+    lines.append("}")
+    text = "\n".join(lines) + "\n"
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(text)
+    else:
+        sys.stdout.write(text)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="search a benchmark position and record the tree")
+    record_parser.add_argument("position")
+    record_parser.add_argument("--depth", type=int, default=3)
+    record_parser.add_argument("--target", choices=list(TARGETS), default="pvs")
+    record_parser.add_argument("--variant", choices=sorted(VARIANTS), default=STANDARD.name)
+    record_parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES)
+    record_parser.add_argument("--table", type=int, help="transposition table entries for the pvs target")
+    record_parser.add_argument("--output", default="tree.bin")
+    record_parser.set_defaults(handler=record)
+
+    summary_parser = commands.add_parser("summary", help="ordering and pruning statistics of a recording")
+    summary_parser.add_argument("tree")
+    summary_parser.add_argument("--top", type=int, default=TOP_NODES)
+    summary_parser.set_defaults(handler=summary)
+
+    dot_parser = commands.add_parser("dot", help="Graphviz graph of one subtree")
+    dot_parser.add_argument("tree")
+    dot_parser.add_argument("--node", type=int, help="record index of the subtree root")
+    dot_parser.add_argument("--root", type=int, default=-1, help="root search to start from, default the last")
+    dot_parser.add_argument("--path", nargs="*", default=[], help="moves from that root down to the subtree")
+    dot_parser.add_argument("--levels", type=int, default=2)
+    dot_parser.add_argument("--limit", type=int, default=DOT_NODE_LIMIT)
+    dot_parser.add_argument("--output")
+    dot_parser.set_defaults(handler=dot)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Effective depth of the hard engine with and without selective search, at equal time.
+
+Every configuration gets the same time budget per position and deepens
+``minimax_hard`` until the budget runs out. The deepest completed iteration is
+the effective depth. Run from the repository root:
+
+    python -m benchmarks.selective --budget 1.0
+"""
+import argparse
+import time
+
+from ai.minimax import SearchStats
+from ai.minimax_hard import FULL_WIDTH, SearchOptions, iterative_search
+from benchmarks.positions import load_positions
+
+MAX_DEPTH = 12
+
+CONFIGS = {
+    "full": FULL_WIDTH,
+    "lmr": SearchOptions(reductions=True, futility=False, extensions=False),
+    "futility": SearchOptions(reductions=False, futility=True, extensions=False),
+    "extension": SearchOptions(reductions=False, futility=False, extensions=True),
+    "all": SearchOptions(),
+}
+
+def run(budget, configs):
+    positions = [position for position in load_positions() if not position[1].check_winner()]
+    print(f"{'position':<18}" + "".join(f" {name:>10}" for name in configs))
+    depths = {name: [] for name in configs}
+    nodes = {name: 0 for name in configs}
+    moves = {name: [] for name in configs}
+    for name, board, player, phase in positions:
+        row = f"{name:<18}"
+        for config, options in configs.items():
+            stats = SearchStats(deadline=time.perf_counter() + budget)
+            _, move, depth = iterative_search(board, MAX_DEPTH, player, phase, stats, options)
+            depths[config].append(depth)
+            nodes[config] += stats.nodes
+            moves[config].append(move)
+            row += f" {depth:>10}"
+        print(row)
+
+    reference = next(iter(configs))
+    print(f"{'mean depth':<18}" + "".join(f" {sum(depths[c]) / len(positions):>10.2f}" for c in configs))
+    print(f"{'nodes/s':<18}" + "".join(f" {nodes[c] / (budget * len(positions)):>10.0f}" for c in configs))
+    for config in configs:
+        if config == reference:
+            continue
+        gain = (sum(depths[config]) - sum(depths[reference])) / len(positions)
+        same = sum(a == b for a, b in zip(moves[config], moves[reference]))
+        print(f"{config}: {gain:+.2f} plies over {reference}, same move in {same}/{len(positions)} positions")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per position")
+    parser.add_argument("--config", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    args = parser.parse_args()
+    run(args.budget, {name: CONFIGS[name] for name in args.config})
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Memory per session and snapshot/restore time of the session table, against Board objects.
+
+Fills a ``SessionTable`` with random games in progress, then reports bytes
+per session for the table and for one ``Board`` per game (measured on a
+sample and scaled), the time to snapshot the table, to restore it mapped and
+fully read, and to rebuild a Board for a session. Run from the repository
+root:
+
+    python -m benchmarks.sessions --sessions 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from game.difficulty import DIFFICULTIES
+from game.moves import pair_code
+from game.rules import legal_moves
+from game.sessions import SessionTable
+from game.variant import STANDARD
+
+BOARD_SAMPLE = 2000  # Boards built to measure their memory
+MAX_PLIES = 30       # Random games are cut off after this many moves
+
+def fill(table, count, rng):
+    """Open ``count`` sessions and play a random number of random legal moves in each."""
+    difficulties = list(DIFFICULTIES)
+    for _ in range(count):
+        session = table.create(STANDARD.name, rng.choice(difficulties), human=rng.choice((0, 1, 2)), clock=300.0)
+        masks = {1: 0, 2: 0}
+        side = 1
+        for _ in range(rng.randint(0, MAX_PLIES)):
+            moves = legal_moves(masks[side], masks[3 - side], STANDARD)
+            if not moves:
+                break
+            frm, to = rng.choice(moves)
+            table.play(session, pair_code((frm, to)))
+            if frm >= 0:
+                masks[side] &= ~(1 << frm)
+            masks[side] |= 1 << to
+            side = 3 - side
+
+def board_bytes(table, sessions):
+    """Traced bytes per Board rebuilt from ``sessions``."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    boards = [table.board(session) for session in sessions]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del boards
+    return used / len(sessions)
+
+def run(count, seed):
+    rng = random.Random(seed)
+    table = SessionTable(count)
+    start = time.perf_counter()
+    fill(table, count, rng)
+    print(f"{count} sessions filled in {time.perf_counter() - start:.1f}s")
+
+    sample = rng.sample(range(count), min(BOARD_SAMPLE, count))
+    print(f"table: {table.rows.nbytes / count:.0f} bytes/session ({table.rows.nbytes / 2 ** 20:.1f} MiB)")
+    print(f"Board: {board_bytes(table, sample):.0f} bytes/session")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.npy")
+        start = time.perf_counter()
+        table.snapshot(path)
+        print(f"snapshot: {time.perf_counter() - start:.3f}s")
+
+        start = time.perf_counter()
+        mapped = SessionTable.restore(path)
+        print(f"restore (mapped): {time.perf_counter() - start:.3f}s, {len(mapped)} sessions")
+        start = time.perf_counter()
+        loaded = SessionTable.restore(path, copy=True)
+        print(f"restore (read): {time.perf_counter() - start:.3f}s")
+        if (loaded.rows != table.rows).any():
+            raise AssertionError("Restored sessions differ from the snapshot")
+
+        start = time.perf_counter()
+        for session in sample:
+            board = mapped.board(session)
+        elapsed = time.perf_counter() - start
+        print(f"Board from a restored session: {1e6 * elapsed / len(sample):.0f} us")
+        if mapped.board(sample[0]).hash != table.board(sample[0]).hash:
+            raise AssertionError("Restored session rebuilds a different position")
+        del mapped, board
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sessions, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Depth reached at a fixed time as Lazy SMP workers scale from one to the core count.
+
+Every worker count searches each benchmark position for the same time; the
+deepest completed iteration is the depth reached. One worker is the
+single-process search with a transposition table, so the comparison shows
+what the extra processes add. Run from the repository root:
+
+    python -m benchmarks.smp --budget 1.0
+    python -m benchmarks.smp --budget 2.0 --workers 1 2 4 8
+"""
+import argparse
+
+from ai.smp import default_workers, smp_search
+from benchmarks.positions import load_positions
+from game.variant import STANDARD, VARIANTS
+
+MAX_DEPTH = 32  # Positions that reach it are solved within the budget
+
+def run(budget, worker_counts, variant=STANDARD):
+    positions = [position for position in load_positions(variant) if not position[1].check_winner()]
+    print(f"{'position':<18}" + "".join(f" {workers:>7}w" for workers in worker_counts))
+    depths = {workers: [] for workers in worker_counts}
+    nodes = {workers: 0 for workers in worker_counts}
+    for name, board, player, phase in positions:
+        row = f"{name:<18}"
+        for workers in worker_counts:
+            result = smp_search(board, MAX_DEPTH, player, phase, workers, budget)
+            depths[workers].append(result.depth)
+            nodes[workers] += result.nodes
+            row += f" {result.depth:>8}"
+        print(row)
+
+    print(f"{'mean depth':<18}" + "".join(f" {sum(depths[w]) / len(positions):>8.2f}" for w in worker_counts))
+    print(f"{'nodes/s':<18}" + "".join(f" {nodes[w] / (budget * len(positions)):>8.0f}" for w in worker_counts))
+    reference = worker_counts[0]
+    for workers in worker_counts[1:]:
+        gain = (sum(depths[workers]) - sum(depths[reference])) / len(positions)
+        print(f"{workers} workers: {gain:+.2f} plies over {reference}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per position")
+    parser.add_argument("--workers", type=int, nargs="+", default=list(range(1, default_workers() + 1)))
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default=STANDARD.name)
+    args = parser.parse_args()
+    run(args.budget, args.workers, VARIANTS[args.variant])
+
+if __name__ == '__main__':
+    main()
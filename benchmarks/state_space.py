@@ -0,0 +1,80 @@
+"""Rank/unrank throughput of game.ranking, and the reachable position space.
+
+Random ranks of every class are unranked and ranked back, one at a time and
+as arrays, and must round-trip with both giving the same positions. With
+``--enumerate`` the whole space reachable from the empty board is walked,
+counted by moves played and checked against the benchmark positions, which
+takes under half a minute on the 4x4 variants. Run from the repository root:
+
+    python -m benchmarks.state_space --samples 100000
+    python -m benchmarks.state_space --variant 4x4-adjacent --enumerate
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.positions import load_positions
+from game.bitboard import popcount
+from game.ranking import MAX_BITSET_POSITIONS, bitset_contains, index_for, reachable
+from game.variant import STANDARD, VARIANTS
+
+def run(samples, enumerate_space, variant=STANDARD, seed=0):
+    index = index_for(variant)
+    rng = random.Random(seed)
+    ranks = [rng.randrange(index.size) for _ in range(samples)]
+    ranks += [start for start, _ in (index.class_range(*key) for key in index.classes)] + [index.size - 1]
+    print(f"{variant.name}: {index.size} ranked positions in {len(index.classes)} classes")
+
+    start = time.perf_counter()
+    positions = [index.unrank(rank) for rank in ranks]
+    back = [index.rank(*position) for position in positions]
+    scalar_time = time.perf_counter() - start
+    start = time.perf_counter()
+    x_masks, o_masks, sides = index.unrank_many(np.array(ranks, dtype=np.int64))
+    array_back = index.rank_many(x_masks, o_masks, sides)
+    array_time = time.perf_counter() - start
+
+    if back != ranks or array_back.tolist() != ranks:
+        raise AssertionError("Ranks did not round-trip")
+    if list(zip(x_masks.tolist(), o_masks.tolist(), sides.tolist())) != positions:
+        raise AssertionError("unrank and unrank_many disagree")
+    print(f"{'':<8} {'seconds':>8} {'positions/s':>12}")
+    for name, seconds in (("scalar", scalar_time), ("arrays", array_time)):
+        print(f"{name:<8} {seconds:>8.3f} {len(ranks) / seconds:>12.0f}")
+
+    if not enumerate_space:
+        return
+    if index.size > MAX_BITSET_POSITIONS:
+        print(f"{variant.name} is too large to enumerate")
+        return
+    start = time.perf_counter()
+    bits, layers = reachable(variant)
+    elapsed = time.perf_counter() - start
+    total = sum(layers)
+    print(f"reachable: {total} positions ({total / index.size:.2%} of ranked) in {elapsed:.1f}s, "
+          f"bitset {bits.nbytes} bytes")
+    for moves, count in enumerate(layers):
+        print(f"{moves:>4} moves {count:>10}")
+
+    ranked = []
+    for name, board, player, phase in load_positions(variant):
+        key = (popcount(board.masks[1]), popcount(board.masks[2]), board.to_move)
+        if key in index.class_ids:
+            ranked.append(index.rank_board(board))
+    ranked = np.array(ranked, dtype=np.int64)
+    reached = bitset_contains(bits, ranked)
+    print(f"benchmark positions: {int(reached.sum())} of {len(ranked)} in ranked classes are reachable")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=100000, help="random ranks to round-trip")
+    parser.add_argument("--enumerate", action="store_true", help="walk the whole reachable space")
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default=STANDARD.name)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.samples, args.enumerate, VARIANTS[args.variant], args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Compare threat-space search against full-width PVS on the benchmark positions.
+
+Run from the repository root:
+
+    python -m benchmarks.threat_space --depth 3
+    python -m benchmarks.threat_space --depth 2 --variant 5x5
+"""
+import argparse
+import time
+
+from ai.minimax import SearchStats, pvs
+from ai.threats import LOSS, WIN, solve_board
+from benchmarks.positions import load_positions
+from game.variant import STANDARD, VARIANTS
+
+def run(depth, variant=STANDARD):
+    names = {WIN: "win", LOSS: "loss", None: "-"}
+    print(f"{'position':<20} {'result':>6} {'tss nodes':>10} {'tss ms':>8} {'pvs nodes':>10} {'pvs ms':>8}")
+    for name, board, player, phase in load_positions(variant):
+        if board.check_winner():
+            continue
+        tss_stats = SearchStats()
+        start = time.perf_counter()
+        result, moves = solve_board(board, player, stats=tss_stats)
+        tss_ms = 1000 * (time.perf_counter() - start)
+
+        pvs_stats = SearchStats()
+        start = time.perf_counter()
+        pvs(board, depth, float('-inf'), float('inf'), 1, player, phase, pvs_stats)
+        pvs_ms = 1000 * (time.perf_counter() - start)
+
+        print(f"{name:<20} {names[result]:>6} {tss_stats.nodes:>10} {tss_ms:>8.1f} {pvs_stats.nodes:>10} {pvs_ms:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=3, help="PVS depth to compare against")
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default=STANDARD.name)
+    args = parser.parse_args()
+    run(args.depth, VARIANTS[args.variant])
+
+if __name__ == '__main__':
+    main()
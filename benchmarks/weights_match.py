@@ -0,0 +1,86 @@
+"""Play a tuned weight table against the default weights at a fixed node budget per move.
+
+Each random opening is played twice with colours swapped, so neither table
+profits from the first-move advantage. Run from the repository root:
+
+    python -m benchmarks.weights_match ai/weights.json --games 100 --nodes 2000
+"""
+import argparse
+import random
+import time
+
+from ai.minimax import search
+from ai.threats import legal_moves, play
+from ai.weights import DEFAULT_WEIGHTS, load_weights, use_weights
+from game.bitboard import PIECES, board_from_masks, is_win_at, popcount
+from game.moves import code_pair
+
+MAX_DEPTH = 12       # Depth cap; the node budget is what really stops the search
+MAX_PLIES = 60       # Longer games are scored as draws
+OPENING_PLIES = 2    # Random plies before the engines take over
+
+def play_game(weights_by_player, opening, node_limit):
+    """Return the winning player, or 0 for a draw."""
+    masks = {1: 0, 2: 0}
+    side = 1
+    for ply in range(MAX_PLIES):
+        own, other = masks[side], masks[3 - side]
+        if ply < len(opening):
+            move = opening[ply]
+        else:
+            use_weights(weights_by_player[side])
+            phase = "placement" if popcount(own) < PIECES else "movement"
+            board = board_from_masks(masks[1], masks[2], side)
+            _, board_move = search(board, MAX_DEPTH, side, phase, node_limit=node_limit)
+            move = code_pair(board_move)
+        masks[side] = play(own, move)
+        if is_win_at(masks[side], move[1]):
+            return side
+        side = 3 - side
+    return 0
+
+def random_opening(rng):
+    masks = {1: 0, 2: 0}
+    moves = []
+    for ply in range(OPENING_PLIES):
+        side = 1 + ply % 2
+        move = rng.choice(legal_moves(masks[side], masks[3 - side]))
+        masks[side] = play(masks[side], move)
+        moves.append(move)
+    return moves
+
+def run(path, games, node_limit, seed):
+    tuned = load_weights(path)
+    rng = random.Random(seed)
+    wins = draws = losses = 0
+    start = time.perf_counter()
+    for pair in range(games // 2):
+        opening = random_opening(rng)
+        for tuned_side in (1, 2):
+            weights_by_player = {tuned_side: tuned, 3 - tuned_side: DEFAULT_WEIGHTS}
+            winner = play_game(weights_by_player, opening, node_limit)
+            if winner == 0:
+                draws += 1
+            elif winner == tuned_side:
+                wins += 1
+            else:
+                losses += 1
+        print(f"after {2 * (pair + 1)} games: +{wins} ={draws} -{losses}")
+    use_weights(load_weights())
+
+    played = wins + draws + losses
+    score = (wins + 0.5 * draws) / played if played else 0.0
+    print(f"tuned vs default at {node_limit} nodes/move: +{wins} ={draws} -{losses}, "
+          f"score {100 * score:.1f}% ({time.perf_counter() - start:.0f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("weights", help="weight table to test against the defaults")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--nodes", type=int, default=1000, help="node budget per move")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.weights, args.games, args.nodes, args.seed)
+
+if __name__ == '__main__':
+    main()
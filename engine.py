@@ -0,0 +1,220 @@
+"""Long-lived engine process speaking a line-based, UCI-like protocol on stdin/stdout.
+
+One process serves any number of games, so interpreter start-up is paid once
+and the proof solver's table stays warm between searches. Commands:
+
+    avai                          identify; answered with ``id`` lines and ``avaiok``
+    isready                       answered with ``readyok``
+    newgame                       reset the position and clear the solver table
+    variant <name>                switch to a named variant (4x4, 5x5, 6x6, 4x4-adjacent) and reset
+    position startpos [moves m1 m2 ...]
+    position <rows> <side> [moves m1 m2 ...]
+                                  e.g. ``position X2O/1X2/4/3O o moves c3``
+    position code <n> [moves m1 m2 ...]
+                                  the integer form of ``Board.to_int`` for the
+                                  selected variant
+    go [depth N] [nodes N] [movetime MS] [infinite]
+                                  search in the background; ``info`` lines per
+                                  iteration, then ``bestmove <move>``; a
+                                  decisive score is proved within what the
+                                  limits leave (one second without movetime)
+    stop                          end the current search and report its best move;
+                                  the threat-space and proof searches stop too
+    d                             stop any search, then print the board, its
+                                  position string and code
+    quit
+
+Positions and moves use the notation in ``game.notation``.
+"""
+import logging
+import sys
+import threading
+import time
+
+from ai.minimax import DECISIVE_SCORE, SearchStats, choose_move
+from game.moves import decode_move
+from game.notation import (format_code, format_move, format_position, parse_code, parse_move, parse_position,
+                           start_position)
+from game.player import PROOF_NODE_LIMIT, PROOF_SCORES, PROOF_TIME_LIMIT, new_solver
+from game.variant import STANDARD, VARIANTS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_engine.log'
+)
+logger = logging.getLogger('engine')
+
+ENGINE_NAME = "AVAI Engine"
+DEFAULT_DEPTH = 3    # Depth of a ``go`` without limits, medium's uncalibrated depth
+MAX_DEPTH = 64       # Depth cap when a node or time limit is given
+GO_LIMITS = ("depth", "nodes", "movetime")  # ``go`` arguments followed by a value
+
+class Engine:
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.variant = STANDARD
+        self.board = parse_position(start_position(self.variant), self.variant)
+        self.solver = new_solver(self.variant)
+        self.stop_event = threading.Event()
+        self.worker = None
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line):
+        """Run one command line; returns False once the engine should exit."""
+        words = line.split()
+        if not words:
+            return True
+        command, args = words[0], words[1:]
+        logger.debug(f"Command: {line.strip()}")
+        try:
+            if command == "quit":
+                self.stop()
+                return False
+            elif command == "avai":
+                self.send(f"id name {ENGINE_NAME}")
+                self.send("avaiok")
+            elif command == "isready":
+                self.send("readyok")
+            elif command == "newgame":
+                self.stop()
+                self.reset()
+            elif command == "variant":
+                self.stop()
+                if len(args) != 1 or args[0] not in VARIANTS:
+                    raise ValueError(f"Unknown variant, expected one of {', '.join(VARIANTS)}")
+                self.variant = VARIANTS[args[0]]
+                self.reset()
+            elif command == "position":
+                self.stop()
+                self.set_position(args)
+            elif command == "go":
+                self.stop()
+                self.go(args)
+            elif command == "stop":
+                self.stop()
+            elif command == "d":
+                self.stop()
+                self.send(str(self.board))
+                self.send(f"position {format_position(self.board)}")
+                self.send(f"position code {format_code(self.board)}")
+            else:
+                self.send(f"info string unknown command {command}")
+        except ValueError as e:
+            logger.warning(f"Rejected command {line.strip()!r}: {str(e)}")
+            self.send(f"info string error {str(e)}")
+        return True
+
+    def reset(self):
+        self.board = parse_position(start_position(self.variant), self.variant)
+        self.solver = new_solver(self.variant)
+
+    def set_position(self, args):
+        if "moves" in args:
+            split = args.index("moves")
+            spec, moves = args[:split], args[split + 1:]
+        else:
+            spec, moves = args, []
+        if spec == ["startpos"]:
+            board = parse_position(start_position(self.variant), self.variant)
+        elif len(spec) == 2 and spec[0] == "code":
+            board = parse_code(spec[1], self.variant)
+        else:
+            # Keep the selected variant's rules when the board size matches it
+            text = " ".join(spec)
+            same_size = len(text.split()[0].split('/')) == self.variant.size if spec else False
+            board = parse_position(text, self.variant if same_size else None)
+        for text in moves:
+            move_type, target = parse_move(text, board.variant)
+            player = board.to_move
+            if move_type == "place":
+                played = board.place_piece(target, player)
+            else:
+                played = board.move_piece(target[0], target[1], player)
+            if not played:
+                raise ValueError(f"Illegal move {text}")
+        self.board = board
+
+    def go(self, args):
+        limits = {}
+        infinite = False
+        tokens = iter(args)
+        for name in tokens:
+            if name == "infinite":
+                infinite = True
+            elif name in GO_LIMITS:
+                value = next(tokens, None)
+                if value is None or not value.isdigit():
+                    raise ValueError(f"go {name} needs a non-negative integer, got {value}")
+                limits[name] = int(value)
+        if "depth" in limits:
+            depth = limits["depth"]
+        elif infinite or "nodes" in limits or "movetime" in limits:
+            depth = MAX_DEPTH
+        else:
+            depth = DEFAULT_DEPTH
+        time_limit = limits["movetime"] / 1000 if "movetime" in limits else None
+
+        self.stop_event.clear()
+        self.worker = threading.Thread(
+            target=self.think, args=(depth, limits.get("nodes"), time_limit), daemon=True)
+        self.worker.start()
+
+    def think(self, depth, node_limit, time_limit):
+        board = self.board
+        player = board.to_move
+        if board.check_winner() or board.is_draw():
+            self.send("bestmove none")
+            return
+        phase = "placement" if board.pieces_placed[player] < board.variant.pieces else "movement"
+        if self.solver.variant is not board.variant:
+            self.solver = new_solver(board.variant)
+        start = time.perf_counter()
+
+        def info(current_depth, score, move, stats):
+            elapsed = time.perf_counter() - start
+            nps = int(stats.nodes / elapsed) if elapsed > 0 else 0
+            pv = format_move(decode_move(move, board.size)) if move is not None else "none"
+            self.send(f"info depth {current_depth} score {score} nodes {stats.nodes} "
+                      f"time {int(elapsed * 1000)} nps {nps} pv {pv}")
+
+        stats = SearchStats()
+        score, move = choose_move(board, depth, player, phase, stats, node_limit, time_limit,
+                                  self.stop_event, info)
+        # The proof gets what is left of the go limits: its nodes, and movetime or else PROOF_TIME_LIMIT
+        proof_nodes = PROOF_NODE_LIMIT if node_limit is None else min(PROOF_NODE_LIMIT, node_limit - stats.nodes)
+        if time_limit is not None:
+            deadline = start + time_limit
+        else:
+            deadline = time.perf_counter() + PROOF_TIME_LIMIT
+        if (score is not None and abs(score) >= DECISIVE_SCORE and proof_nodes > 0
+                and time.perf_counter() < deadline and not self.stop_event.is_set()):
+            result, proof_move = self.solver.solve_board(board, player, proof_nodes, deadline, self.stop_event)
+            if result is not None:
+                self.send(f"info string proved score {PROOF_SCORES[result]}")
+                score, move = PROOF_SCORES[result], proof_move
+        logger.info(f"Search finished: score={score} move={move} {stats}")
+        self.send(f"bestmove {format_move(decode_move(move, board.size)) if move is not None else 'none'}")
+
+    def stop(self):
+        """Stop any running search and wait for its ``bestmove``."""
+        if self.worker is not None:
+            self.stop_event.set()
+            self.worker.join()
+            self.worker = None
+
+def main():
+    engine = Engine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.stop()
+
+if __name__ == '__main__':
+    main()
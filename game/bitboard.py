@@ -0,0 +1,77 @@
+"""Bitboard view of the board.
+
+Cell ``(row, col)`` is bit ``row * SIZE + col``. A position is one mask per
+player, which makes pattern tests a single ``&`` instead of NumPy slicing.
+"""
+from game.board import Board
+from game.moves import decode_move, encode_move  # Re-exported; moves are codes from game.moves
+from game.variant import STANDARD
+
+# Tables of the standard 4x4 game; other sizes use the same fields of their Variant
+SIZE = STANDARD.size
+PIECES = STANDARD.pieces
+CELLS = STANDARD.cells
+FULL = STANDARD.full
+
+def bit(row, col):
+    """Mask with only the cell ``(row, col)`` set."""
+    return 1 << (row * SIZE + col)
+
+def cell(index):
+    """Board coordinates of a bit index."""
+    return divmod(index, SIZE)
+
+def popcount(mask):
+    """Number of set bits in ``mask``."""
+    return bin(mask).count("1")
+
+def iter_bits(mask):
+    """Yield the indices of the set bits in ``mask``, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+LINE_MASKS = STANDARD.line_masks
+SQUARE_MASKS = STANDARD.square_masks
+THREAT_MASKS = STANDARD.threat_masks
+WIN_MASKS = STANDARD.win_masks
+CORNER_MASK = STANDARD.corner_mask
+CELL_WIN_MASKS = STANDARD.cell_win_masks
+
+def masks_from_board(board):
+    """Return ``(player 1 mask, player 2 mask)`` for a Board."""
+    return board.masks[1], board.masks[2]
+
+def board_from_masks(x_mask, o_mask, to_move=1, variant=STANDARD):
+    """Build a Board holding player 1 on ``x_mask`` and player 2 on ``o_mask``."""
+    return Board.from_masks(x_mask, o_mask, to_move, variant)
+
+def is_win(mask, variant=STANDARD):
+    """True if ``mask`` contains a complete winning pattern."""
+    return any(mask & pattern == pattern for pattern in variant.win_masks)
+
+def is_win_at(mask, index, variant=STANDARD):
+    """True if ``mask`` completes a winning pattern through cell ``index``."""
+    return any(mask & pattern == pattern for pattern in variant.cell_win_masks[index])
+
+SYMMETRIES = STANDARD.symmetries
+_KEY_TABLES = STANDARD.key_tables
+
+def transform(mask, symmetry):
+    """Apply one of the eight board symmetries to ``mask``."""
+    low, high = _KEY_TABLES[symmetry][:2]
+    return low[mask & 0xFF] | high[mask >> 8 & 0xFF]
+
+def canonical_key(own, other):
+    """Symmetry-independent integer key for the 4x4 position ``(own, other)``.
+
+    Unrolled for the 32-bit word of the standard board; ``Variant.canonical_key``
+    handles any size.
+    """
+    word = own << CELLS | other
+    b0 = word & 0xFF
+    b1 = word >> 8 & 0xFF
+    b2 = word >> 16 & 0xFF
+    b3 = word >> 24
+    return min(t0[b0] | t1[b1] | t2[b2] | t3[b3] for t0, t1, t2, t3 in _KEY_TABLES)
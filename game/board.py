@@ -1,5 +1,8 @@
 import numpy as np
 import logging
+from game.moves import PLACEMENT_LIMIT, move_code, place_code
+from game.rules import can_reach, is_stalemate
+from game.variant import STANDARD
 
 # Configure logging
 logging.basicConfig(
@@ -9,17 +12,196 @@ logging.basicConfig(
 )
 logger = logging.getLogger('board')
 
+MAX_MOVES = 200       # Total moves before the game is drawn
+REPETITION_LIMIT = 3  # Occurrences of one position that draw the game
+END_REASONS = ("pattern", "repetition", "move limit", "stalemate")  # Why a game ended, as in the "end" event
+
 class Board:
-    def __init__(self):
-        """Initialize an empty 4x4 board."""
-        self.board = np.zeros((4, 4), dtype=int)
+    def __init__(self, max_moves=MAX_MOVES, variant=STANDARD):
+        """Initialize an empty board; the standard game is 4x4 with 4 pieces each."""
+        self.variant = variant
+        self.size = variant.size
+        self.board = np.zeros((self.size, self.size), dtype=int)
+        self.masks = {1: 0, 2: 0}  # Bitboard per player, bit row * size + col
         self.pieces_placed = {1: 0, 2: 0}
         self.last_move = None
         self.phase = "placement"  # "placement" or "movement"
-        logger.info("New board initialized")
+        self.to_move = 1
+        self.max_moves = max_moves
+        self.hash = 0
+        self.history = []  # (move code, player, hash before the move, phase, last_move) per move played
+        self.position_counts = {self.hash: 1}
+        self.listeners = []  # Change-event callbacks, see subscribe
+        logger.info(f"New {variant.name} board initialized")
+
+    def load(self, cells, to_move=1):
+        """Set up an arbitrary position from a size x size array of 0/1/2, clearing the history."""
+        cells = np.array(cells, dtype=int)
+        masks = {1: 0, 2: 0}
+        for index, (row, col) in enumerate(self.variant.positions):
+            player = int(cells[row, col])
+            if player:
+                masks[player] |= 1 << index
+        self.set_masks(masks[1], masks[2], to_move)
+
+    def set_masks(self, x_mask, o_mask, to_move=1):
+        """Set up the position with player 1 on ``x_mask`` and player 2 on ``o_mask``, clearing the history."""
+        variant = self.variant
+        self.masks = {1: x_mask, 2: o_mask}
+        self.board = np.array([(x_mask >> index & 1) | (o_mask >> index & 1) << 1 for index in range(variant.cells)],
+                              dtype=int).reshape(self.size, self.size)
+        self.hash = variant.zobrist_to_move if to_move == 2 else 0
+        for player, mask in self.masks.items():
+            keys = variant.zobrist[player]
+            while mask:
+                low = mask & -mask
+                self.hash ^= keys[low.bit_length() - 1]
+                mask ^= low
+        self.pieces_placed = {player: bin(self.masks[player]).count("1") for player in (1, 2)}
+        self.phase = "movement" if all(count >= variant.pieces for count in self.pieces_placed.values()) else "placement"
+        self.last_move = None
+        self.to_move = to_move
+        self.history = []
+        self.position_counts = {self.hash: 1}
+
+    @classmethod
+    def from_masks(cls, x_mask, o_mask, to_move=1, variant=STANDARD, max_moves=MAX_MOVES):
+        """A Board holding player 1 on ``x_mask`` and player 2 on ``o_mask``; raises ValueError if impossible."""
+        if x_mask & o_mask or (x_mask | o_mask) & ~variant.full or to_move not in (1, 2):
+            raise ValueError(f"Invalid masks: {x_mask:#x} {o_mask:#x} to move {to_move}")
+        if max(bin(x_mask).count("1"), bin(o_mask).count("1")) > variant.pieces:
+            raise ValueError(f"Too many pieces: {x_mask:#x} {o_mask:#x}")
+        board = cls(max_moves, variant)
+        board.set_masks(x_mask, o_mask, to_move)
+        return board
+
+    def to_int(self):
+        """The position as one integer: player 1's mask, player 2's mask above it, then the side to move.
+
+        Bits 0 to cells-1 hold player 1, the next ``cells`` bits player 2 and
+        the top bit is set when player 2 is to move: 33 bits on the 4x4
+        board. Piece counts and the phase follow from the masks. The move
+        history, and with it repetition counts, is not part of the position.
+        """
+        cells = self.variant.cells
+        return (self.to_move - 1) << 2 * cells | self.masks[2] << cells | self.masks[1]
+
+    @classmethod
+    def from_int(cls, code, variant=STANDARD, max_moves=MAX_MOVES):
+        """The Board encoded by ``to_int``; raises ValueError if ``code`` is not a position of ``variant``."""
+        cells = variant.cells
+        if code < 0 or code >> 2 * cells + 1:
+            raise ValueError(f"Invalid position code for {variant.name}: {code}")
+        full = variant.full
+        return cls.from_masks(code & full, code >> cells & full, (code >> 2 * cells) + 1, variant, max_moves)
+
+    def __getstate__(self):
+        """Pickle without the listeners, which usually belong to a front end."""
+        state = self.__dict__.copy()
+        state["listeners"] = []
+        return state
+
+    def subscribe(self, listener):
+        """Call ``listener(event, data)`` after every move made with place_piece or move_piece.
+
+        Events are ``("cell", (row, col, value))`` for each cell that changed,
+        ``("phase", phase)`` when the movement phase begins and
+        ``("end", (winner, reason))`` when the move ends the game. ``winner`` is
+        0 for a draw, and ``reason`` one of ``END_REASONS``: "pattern" for a
+        win, "repetition" or "move limit" for a drawn position, "stalemate"
+        when the side to move has no move. ``push``, ``pop`` and ``load``
+        publish nothing.
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def publish(self, event, data):
+        for listener in list(self.listeners):
+            listener(event, data)
+
+    def publish_move(self, player, cells, phase):
+        """Publish the events of a move by ``player`` that changed ``cells``, destination last."""
+        for row, col in cells:
+            self.publish("cell", (row, col, int(self.board[row, col])))
+        if self.phase != phase:
+            self.publish("phase", self.phase)
+        # Only patterns through the destination can have been completed by this move
+        row, col = cells[-1]
+        mask = self.masks[player]
+        if any(mask & pattern == pattern for pattern in self.variant.cell_win_masks[row * self.size + col]):
+            self.publish("end", (player, "pattern"))
+        elif self.repetitions() >= REPETITION_LIMIT:
+            self.publish("end", (0, "repetition"))
+        elif len(self.history) >= self.max_moves:
+            self.publish("end", (0, "move limit"))
+        elif is_stalemate(self, self.to_move):
+            self.publish("end", (0, "stalemate"))
+
+    def push(self, move, player):
+        """Play a move code (``game.moves``) without validation and record it in the history.
+
+        This is the fast path used by the search; ``place_piece`` and
+        ``move_piece`` validate and log, then call it.
+        """
+        variant = self.variant
+        zobrist = variant.zobrist[player]
+        self.history.append((move, player, self.hash, self.phase, self.last_move))
+        to_index = (move & 255) - 1
+        target = variant.positions[to_index]
+        self.board[target] = player
+        if move < PLACEMENT_LIMIT:
+            self.masks[player] |= 1 << to_index
+            self.pieces_placed[player] += 1
+            self.hash ^= zobrist[to_index]
+            if all(count >= variant.pieces for count in self.pieces_placed.values()):
+                self.phase = "movement"
+        else:
+            from_index = (move >> 8) - 1
+            self.board[variant.positions[from_index]] = 0
+            self.masks[player] ^= 1 << from_index | 1 << to_index
+            self.hash ^= zobrist[from_index] ^ zobrist[to_index]
+        self.last_move = target
+        if self.to_move != 3 - player:
+            self.hash ^= variant.zobrist_to_move
+            self.to_move = 3 - player
+        self.position_counts[self.hash] = self.position_counts.get(self.hash, 0) + 1
+
+    def pop(self):
+        """Take back the last move played with ``push``."""
+        move, player, previous_hash, self.phase, self.last_move = self.history.pop()
+        count = self.position_counts[self.hash] - 1
+        if count:
+            self.position_counts[self.hash] = count
+        else:
+            del self.position_counts[self.hash]
+
+        positions = self.variant.positions
+        to_index = (move & 255) - 1
+        self.board[positions[to_index]] = 0
+        if move < PLACEMENT_LIMIT:
+            self.masks[player] &= ~(1 << to_index)
+            self.pieces_placed[player] -= 1
+        else:
+            from_index = (move >> 8) - 1
+            self.board[positions[from_index]] = player
+            self.masks[player] ^= 1 << from_index | 1 << to_index
+        self.hash = previous_hash
+        self.to_move = player
+
+    def repetitions(self):
+        """How many times the current position has occurred, including now."""
+        return self.position_counts.get(self.hash, 0)
+
+    def is_draw(self):
+        """Check the threefold-repetition and move-count draw rules."""
+        if self.repetitions() >= REPETITION_LIMIT:
+            return True
+        return len(self.history) >= self.max_moves
 
     def place_piece(self, position, player):
-        """Place a piece if valid (cell is empty and player has <4 pieces)."""
+        """Place a piece if valid (cell is empty and player has pieces left)."""
         try:
             if not isinstance(position, tuple) or len(position) != 2:
                 logger.error(f"Invalid position format: {position}")
@@ -28,11 +210,11 @@ class Board:
             row, col = position
             logger.debug(f"Attempting to place piece for player {player} at ({row}, {col})")
             
-            if not (0 <= row < 4 and 0 <= col < 4):
+            if not (0 <= row < self.size and 0 <= col < self.size):
                 logger.warning(f"Position out of bounds: ({row}, {col})")
                 return False
                 
-            if self.pieces_placed[player] >= 4:
+            if self.pieces_placed[player] >= self.variant.pieces:
                 logger.warning(f"Player {player} already has maximum pieces")
                 return False
                 
@@ -40,14 +222,12 @@ class Board:
                 logger.warning(f"Cell ({row}, {col}) is already occupied")
                 return False
                 
-            self.board[row, col] = player
-            self.pieces_placed[player] += 1
-            self.last_move = (row, col)
-            
-            # Check if we should transition to movement phase
-            if all(count >= 4 for count in self.pieces_placed.values()):
-                self.phase = "movement"
+            phase = self.phase
+            self.push(place_code(row * self.size + col), player)
+            if self.phase != phase:
                 logger.info("Transitioning to movement phase")
+            if self.listeners:
+                self.publish_move(player, [(row, col)], phase)
                 
             logger.info(f"Player {player} placed piece at ({row}, {col}). Total pieces: {self.pieces_placed[player]}")
             return True
@@ -58,7 +238,7 @@ class Board:
         
 
     def move_piece(self, from_pos, to_pos, player):
-        """Move an existing piece to any empty cell."""
+        """Move an existing piece to an empty cell the variant's movement rule allows."""
         try:
             if not (isinstance(from_pos, tuple) and isinstance(to_pos, tuple) and 
                     len(from_pos) == 2 and len(to_pos) == 2):
@@ -71,8 +251,8 @@ class Board:
             logger.debug(f"Player {player} attempting move from ({from_row}, {from_col}) to ({to_row}, {to_col})")
             
             # Basic validation checks
-            if not (0 <= from_row < 4 and 0 <= from_col < 4 and 
-                0 <= to_row < 4 and 0 <= to_col < 4):
+            if not (0 <= from_row < self.size and 0 <= from_col < self.size and
+                0 <= to_row < self.size and 0 <= to_col < self.size):
                 logger.warning("Position out of bounds")
                 return False
                 
@@ -85,11 +265,15 @@ class Board:
             if self.board[to_row, to_col] != 0:
                 logger.warning(f"Destination position ({to_row}, {to_col}) is not empty")
                 return False
+
+            if not can_reach(self.variant, from_row * self.size + from_col, to_row * self.size + to_col):
+                logger.warning(f"Destination ({to_row}, {to_col}) is not reachable under {self.variant.movement} movement")
+                return False
                 
             # Make the move
-            self.board[from_row, from_col] = 0
-            self.board[to_row, to_col] = player
-            self.last_move = (to_row, to_col)
+            self.push(move_code(from_row * self.size + from_col, to_row * self.size + to_col), player)
+            if self.listeners:
+                self.publish_move(player, [(from_row, from_col), (to_row, to_col)], self.phase)
             logger.info(f"Player {player} successfully moved from ({from_row}, {from_col}) to ({to_row}, {to_col})")
             return True
             
@@ -97,18 +281,29 @@ class Board:
             logger.error(f"Error in move_piece: {str(e)}")
             return False
     
+    def is_valid_placement(self, position, player):
+        """Check if ``player`` can place a piece on ``position``."""
+        try:
+            row, col = position
+            if not (0 <= row < self.size and 0 <= col < self.size):
+                return False
+            return self.pieces_placed[player] < self.variant.pieces and self.board[row, col] == 0
+        except (IndexError, TypeError, ValueError):
+            return False
+
     def is_valid_movement(self, from_pos, to_pos, player):
-        """Check if a piece can be moved to any empty cell."""
+        """Check if a piece can be moved to ``to_pos`` under the variant's movement rule."""
         try:
             from_row, from_col = from_pos
             to_row, to_col = to_pos
             
-            if not (0 <= from_row < 4 and 0 <= from_col < 4 and 
-                   0 <= to_row < 4 and 0 <= to_col < 4):
+            if not (0 <= from_row < self.size and 0 <= from_col < self.size and
+                   0 <= to_row < self.size and 0 <= to_col < self.size):
                 return False
                     
             return (self.board[from_row, from_col] == player and
-                    self.board[to_row, to_col] == 0)
+                    self.board[to_row, to_col] == 0 and
+                    can_reach(self.variant, from_row * self.size + from_col, to_row * self.size + to_col))
         except (IndexError, TypeError):
             return False
 
@@ -126,69 +321,40 @@ class Board:
             return False
         
     def is_game_over(self):
-        """Check if the game is over."""
+        """Check if the game is over: a win, a draw, or the side to move cannot move."""
         try:
-            # Game is over if there's a winner or all pieces are placed and no valid moves remain
             if self.check_winner():
                 logger.info("Game over: Winner found")
                 return True
-                
-            if self.phase == "placement":
-                # In placement phase, game is over if all pieces are placed
-                if all(count >= 4 for count in self.pieces_placed.values()):
-                    logger.info("Game over: All pieces placed")
-                    return True
-            else:
-                # In movement phase, game is over if any player has no valid moves
-                for player in [1, 2]:
-                    pieces = self.get_player_pieces(player)
-                    empty_cells = self.get_empty_cells()
-                    has_valid_move = any(
-                        self.is_adjacent(piece, empty_cell)
-                        for piece in pieces
-                        for empty_cell in empty_cells
-                    )
-                    if not has_valid_move:
-                        logger.info(f"Game over: Player {player} has no valid moves")
-                        return True
-                        
+
+            if self.is_draw():
+                logger.info("Game over: Draw by repetition or move limit")
+                return True
+
+            if is_stalemate(self, self.to_move):
+                logger.info(f"Game over: Player {self.to_move} has no valid moves")
+                return True
+
             return False
-            
+
         except Exception as e:
             logger.error(f"Error in is_game_over: {str(e)}")
             return False
 
 
     def check_winner(self):
-        """Check for a winning condition."""
-        try:
-            # Check rows and columns
-            for i in range(4):
-                if (self.board[i, 0] != 0 and np.all(self.board[i, :] == self.board[i, 0]) or
-                    self.board[0, i] != 0 and np.all(self.board[:, i] == self.board[0, i])):
+        """Check for a winning condition: a complete line or square for either player."""
+        for mask in self.masks.values():
+            for pattern in self.variant.win_masks:
+                if mask & pattern == pattern:
                     return True
-
-            # Check diagonals
-            if (self.board[0, 0] != 0 and np.all(np.diag(self.board) == self.board[0, 0]) or
-                self.board[0, 3] != 0 and np.all(np.diag(np.fliplr(self.board)) == self.board[0, 3])):
-                return True
-
-            # Check 2x2 squares
-            for i in range(3):
-                for j in range(3):
-                    square = self.board[i:i+2, j:j+2]
-                    if square[0, 0] != 0 and np.all(square == square[0, 0]):
-                        return True
-            return False
-            
-        except Exception as e:
-            logger.error(f"Error in check_winner: {str(e)}")
-            return False
+        return False
 
     def get_empty_cells(self):
         """Get all empty cells on the board."""
         try:
-            return list(zip(*np.where(self.board == 0)))
+            empty = self.variant.full & ~(self.masks[1] | self.masks[2])
+            return [position for index, position in enumerate(self.variant.positions) if empty >> index & 1]
         except Exception as e:
             logger.error(f"Error in get_empty_cells: {str(e)}")
             return []
@@ -196,7 +362,8 @@ class Board:
     def get_player_pieces(self, player):
         """Get all positions of a player's pieces."""
         try:
-            return list(zip(*np.where(self.board == player)))
+            mask = self.masks[player]
+            return [position for index, position in enumerate(self.variant.positions) if mask >> index & 1]
         except Exception as e:
             logger.error(f"Error in get_player_pieces: {str(e)}")
             return []
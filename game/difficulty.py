@@ -0,0 +1,12 @@
+"""Names of the AI difficulties.
+
+They live in the game layer so that session tables, the host and front ends
+can name a difficulty without importing the engines. Each difficulty has its
+own engine: easy is ``ai.minimax_easy``, medium ``ai.minimax.choose_move`` and
+hard ``ai.minimax_hard``. Only medium and hard hand decisive positions to the
+proof solver; ``game.player.AIPlayer`` picks the engine, and
+``ai.calibration`` the search budget of each difficulty.
+"""
+
+DIFFICULTIES = ("easy", "medium", "hard")
+DEFAULT_DIFFICULTY = "medium"
@@ -0,0 +1,62 @@
+"""Moves as small integers.
+
+A move code is ``(from + 1) << 8 | (to + 1)`` on bit indices (``row * size +
+col``). A placement has no source, so its high byte is zero and the code is
+just ``to + 1``; 0 means no move. Codes fit in 16 bits on every variant, which
+is what the transposition table and the search recorder store.
+
+Move generation, ``Board.push``, the searches and the solvers all pass codes.
+The ``("place", (row, col))`` / ``("move", ((r1, c1), (r2, c2)))`` tuples are
+only for players, front ends and the text notation; ``encode_move`` and
+``decode_move`` convert at that boundary.
+"""
+from game.variant import STANDARD
+
+NO_MOVE = 0
+PLACEMENT_LIMIT = 256  # Codes below this are placements
+
+def place_code(to_index):
+    return to_index + 1
+
+def move_code(from_index, to_index):
+    return (from_index + 1) << 8 | (to_index + 1)
+
+def is_placement(code):
+    return code < PLACEMENT_LIMIT
+
+def move_from(code):
+    """Source cell of ``code``; -1 for a placement."""
+    return (code >> 8) - 1
+
+def move_to(code):
+    """Destination cell of ``code``."""
+    return (code & 255) - 1
+
+def pair_code(move):
+    """Code of a bitboard ``(from_index, to_index)`` pair as used by ``game.rules.legal_moves``."""
+    return (move[0] + 1) << 8 | (move[1] + 1)
+
+def code_pair(code):
+    """Inverse of ``pair_code``."""
+    return (code >> 8) - 1, (code & 255) - 1
+
+def encode_move(move, size=STANDARD.size):
+    """Code of a ``(move_type, target)`` tuple; None gives ``NO_MOVE``."""
+    if move is None:
+        return NO_MOVE
+    move_type, target = move
+    if move_type == "place":
+        row, col = target
+        return int(row) * size + int(col) + 1
+    (from_row, from_col), (to_row, to_col) = target
+    return (int(from_row) * size + int(from_col) + 1) << 8 | (int(to_row) * size + int(to_col) + 1)
+
+def decode_move(code, size=STANDARD.size):
+    """The ``(move_type, target)`` tuple of ``code``; None for ``NO_MOVE`` or None."""
+    if not code:
+        return None
+    source, destination = divmod(code, 256)
+    to_pos = divmod(destination - 1, size)
+    if source == 0:
+        return "place", to_pos
+    return "move", (divmod(source - 1, size), to_pos)
@@ -0,0 +1,104 @@
+"""Text notation for positions and moves, as used by the engine protocol.
+
+A position is the rows of ``X`` and ``O`` separated by ``/`` from the top row
+down, then the side to move, e.g. ``X2O/1X2/4/3O o``. As in FEN a digit is a
+run of empty cells; ``.`` is read as one empty cell, so the expanded form
+``X..O/.X../..../...O o`` parses too. ``format_position`` always writes the
+short form, which makes the string canonical. ``format_code`` and
+``parse_code`` give the integer form of ``Board.to_int``. A cell is
+a column letter and a row number, ``a1`` being the top-left cell (0, 0). A
+placement is a single cell (``b2``) and a movement two cells (``b2c3``).
+Boards up to 9x9 are supported; the board size picks the variant.
+"""
+from game.board import Board
+from game.variant import STANDARD, VARIANTS
+
+SYMBOLS = {'.': 0, 'X': 1, 'O': 2}
+SIDES = {'x': 1, 'o': 2}
+COLUMNS = "abcdefghi"
+
+def start_position(variant=STANDARD):
+    """The empty board of ``variant`` with x to move, in the short form."""
+    return "/".join([str(variant.size)] * variant.size) + " x"
+
+START_POSITION = start_position()
+
+def format_cell(position):
+    row, col = position
+    return f"{COLUMNS[int(col)]}{int(row) + 1}"
+
+def parse_cell(text, variant=STANDARD):
+    if (len(text) != 2 or text[0] not in COLUMNS[:variant.size]
+            or not text[1].isdigit() or not 1 <= int(text[1]) <= variant.size):
+        raise ValueError(f"Invalid cell: {text!r}")
+    return int(text[1]) - 1, COLUMNS.index(text[0])
+
+def format_move(move):
+    """``("place", (r, c))`` or ``("move", (from, to))`` as text."""
+    move_type, target = move
+    if move_type == "place":
+        return format_cell(target)
+    return format_cell(target[0]) + format_cell(target[1])
+
+def parse_move(text, variant=STANDARD):
+    if len(text) == 2:
+        return "place", parse_cell(text, variant)
+    if len(text) == 4:
+        return "move", (parse_cell(text[:2], variant), parse_cell(text[2:], variant))
+    raise ValueError(f"Invalid move: {text!r}")
+
+def format_position(board):
+    """The canonical position string of ``board``, empty runs written as digits."""
+    rows = []
+    for row in board.board:
+        text, empty = "", 0
+        for value in row:
+            if value:
+                text += (str(empty) if empty else "") + ".XO"[int(value)]
+                empty = 0
+            else:
+                empty += 1
+        rows.append(text + (str(empty) if empty else ""))
+    return f"{'/'.join(rows)} {'xo'[board.to_move - 1]}"
+
+def expand_row(row):
+    """A position row with its digits expanded to ``.`` cells."""
+    return "".join("." * int(ch) if ch.isdigit() else ch for ch in row)
+
+def format_code(board):
+    return str(board.to_int())
+
+def parse_code(text, variant=STANDARD):
+    """Return a new Board from the integer form of ``Board.to_int``; raises ValueError if it is malformed."""
+    if not text.isdigit():
+        raise ValueError(f"Invalid position code: {text!r}")
+    return Board.from_int(int(text), variant)
+
+def variant_for_size(size):
+    """The named variant played on a ``size`` x ``size`` board."""
+    for variant in VARIANTS.values():
+        if variant.size == size:
+            return variant
+    raise ValueError(f"No variant is played on a {size}x{size} board")
+
+def parse_position(text, variant=None):
+    """Return a new Board set up from ``text``; raises ValueError if it is malformed.
+
+    Without ``variant`` the named variant of the board's size is used.
+    """
+    fields = text.split()
+    if len(fields) != 2 or fields[1] not in SIDES:
+        raise ValueError(f"Invalid position: {text!r}")
+    rows = [expand_row(row) for row in fields[0].split('/')]
+    if variant is None:
+        variant = variant_for_size(len(rows))
+    size = variant.size
+    if len(rows) != size or any(len(row) != size or set(row) - set(SYMBOLS) for row in rows):
+        raise ValueError(f"Invalid position: {text!r}")
+    masks = {1: 0, 2: 0}
+    for index, ch in enumerate("".join(rows)):
+        if ch != '.':
+            masks[SYMBOLS[ch]] |= 1 << index
+    if any(bin(mask).count("1") > variant.pieces for mask in masks.values()):
+        raise ValueError(f"Too many pieces in position: {text!r}")
+    return Board.from_masks(masks[1], masks[2], SIDES[fields[1]], variant)
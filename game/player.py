@@ -1,6 +1,16 @@
 from abc import ABC, abstractmethod
-from ai.minimax import minimax
+from ai import minimax_easy, minimax_hard
+from ai.batch import batch_search
+from ai.calibration import load_budgets
+from ai.minimax import DECISIVE_SCORE, WIN_SCORE, SearchStats, choose_move
+from ai.pns import DEFAULT_MEMORY_LIMIT, DRAW, ENTRY_BYTES, LOSS, MIN_ENTRIES, WIN, ProofNumberSolver
+from game.difficulty import DEFAULT_DIFFICULTY, DIFFICULTIES
+from game.moves import decode_move
+from game.rules import ADJACENT
+from utils.memory import MEMORY
+from utils.metrics import REGISTRY, counter_total, ratio
 import logging
+import time
 
 # Configure logging
 logging.basicConfig(
@@ -22,7 +32,7 @@ class Player(ABC):
 class HumanPlayer(Player):
     def get_move(self, board):
         logger.debug(f"Human player {self.symbol} getting move. Pieces placed: {board.pieces_placed[self.symbol]}")
-        if board.pieces_placed[self.symbol] < 4:
+        if board.pieces_placed[self.symbol] < board.variant.pieces:
             logger.info(f"Human player {self.symbol} in placement phase")
             return self.get_placement(board)
         else:
@@ -32,20 +42,21 @@ class HumanPlayer(Player):
     def get_placement(self, board):
         while True:
             try:
-                row = int(input("Enter row (0-3) for placement: "))
-                col = int(input("Enter column (0-3) for placement: "))
+                last = board.size - 1
+                row = int(input(f"Enter row (0-{last}) for placement: "))
+                col = int(input(f"Enter column (0-{last}) for placement: "))
                 logger.debug(f"Human player {self.symbol} attempting placement at ({row}, {col})")
                 
-                if 0 <= row < 4 and 0 <= col < 4:
+                if 0 <= row < board.size and 0 <= col < board.size:
                     if board.is_valid_placement((row, col), self.symbol):
                         logger.info(f"Human player {self.symbol} placed piece at ({row}, {col})")
                         return "place", (row, col)
                     else:
                         logger.warning(f"Invalid placement attempt by human at ({row}, {col})")
-                        print("Invalid placement. Either the cell is taken or you already have 4 pieces on board.")
+                        print(f"Invalid placement. Either the cell is taken or you already have {board.variant.pieces} pieces on board.")
                 else:
                     logger.warning(f"Out of bounds placement attempt by human at ({row}, {col})")
-                    print("Position out of bounds. Please enter numbers between 0 and 3.")
+                    print(f"Position out of bounds. Please enter numbers between 0 and {last}.")
             except ValueError as e:
                 logger.error(f"Invalid input by human player: {str(e)}")
                 print("Invalid input. Please enter integer numbers.")
@@ -53,56 +64,182 @@ class HumanPlayer(Player):
     def get_movement(self, board):
         while True:
             try:
-                from_row = int(input("Enter row (0-3) of piece to move: "))
-                from_col = int(input("Enter column (0-3) of piece to move: "))
-                to_row = int(input("Enter row (0-3) for destination: "))
-                to_col = int(input("Enter column (0-3) for destination: "))
+                last = board.size - 1
+                from_row = int(input(f"Enter row (0-{last}) of piece to move: "))
+                from_col = int(input(f"Enter column (0-{last}) of piece to move: "))
+                to_row = int(input(f"Enter row (0-{last}) for destination: "))
+                to_col = int(input(f"Enter column (0-{last}) for destination: "))
                 
                 logger.debug(f"Human player {self.symbol} attempting move from ({from_row}, {from_col}) to ({to_row}, {to_col})")
                 
-                if (0 <= from_row < 4 and 0 <= from_col < 4 and 
-                    0 <= to_row < 4 and 0 <= to_col < 4):
+                if (0 <= from_row < board.size and 0 <= from_col < board.size and
+                    0 <= to_row < board.size and 0 <= to_col < board.size):
                     if board.is_valid_movement((from_row, from_col), (to_row, to_col), self.symbol):
                         logger.info(f"Human player {self.symbol} moved from ({from_row}, {from_col}) to ({to_row}, {to_col})")
                         return "move", ((from_row, from_col), (to_row, to_col))
                     else:
                         logger.warning(f"Invalid movement attempt by human")
-                        print("Invalid movement. Ensure you select one of your pieces and move it to an adjacent empty cell.")
+                        reach = "an adjacent" if board.variant.movement == ADJACENT else "any"
+                        print(f"Invalid movement. Ensure you select one of your pieces and move it to {reach} empty cell.")
                 else:
                     logger.warning("Out of bounds movement attempt by human")
-                    print("Position out of bounds. Please enter numbers between 0 and 3.")
+                    print(f"Position out of bounds. Please enter numbers between 0 and {last}.")
             except ValueError as e:
                 logger.error(f"Invalid input by human player: {str(e)}")
                 print("Invalid input. Please enter integer numbers.")
 
+PROOF_NODE_LIMIT = 10000
+PROOF_TIME_LIMIT = 1.0  # Seconds a proof may take when the budget sets no time limit
+STOP_MARGIN = 0.03      # Seconds kept back from the budget's hard stop for the solvers' poll intervals
+PROOF_SCORES = {WIN: WIN_SCORE, DRAW: 0, LOSS: -WIN_SCORE}
+MIN_SOLVER_MEMORY = MIN_ENTRIES * ENTRY_BYTES
+
+def new_solver(variant):
+    """A proof solver for ``variant``, sized from and registered with ``utils.memory.MEMORY``.
+
+    Call it from the thread that searches: when the caches are over the limit
+    it shrinks them, and they must not be in use meanwhile.
+    """
+    solver = MEMORY.register("proof solver",
+                             ProofNumberSolver(MEMORY.allot(DEFAULT_MEMORY_LIMIT, MIN_SOLVER_MEMORY), variant))
+    if MEMORY.reserved > MEMORY.limit:
+        MEMORY.enforce()
+    return solver
+
+MOVE_SECONDS = REGISTRY.histogram("avai_move_seconds", "Time taken by the AI per move", ("difficulty",))
+SEARCH_NODES = REGISTRY.counter("avai_search_nodes_total", "Nodes searched for AI moves", ("difficulty",))
+SEARCH_CUTOFFS = REGISTRY.counter("avai_search_cutoffs_total", "Beta cutoffs in AI move searches", ("difficulty",))
+TABLE_PROBES = REGISTRY.counter("avai_table_probes_total", "Transposition table probes in AI move searches",
+                                ("difficulty",))
+TABLE_HITS = REGISTRY.counter("avai_table_hits_total", "Probes that ended the search of their node",
+                              ("difficulty",))
+REGISTRY.callback("avai_table_hit_ratio", "Transposition table hits per probe",
+                  ratio(counter_total(TABLE_HITS), counter_total(TABLE_PROBES)))
+
+def record_move(difficulty, seconds, stats):
+    """Add one AI move's time and search counters to the metrics."""
+    labels = (difficulty,)
+    MOVE_SECONDS.observe(seconds, labels)
+    SEARCH_NODES.inc(stats.nodes, labels)
+    SEARCH_CUTOFFS.inc(stats.cutoffs, labels)
+    TABLE_PROBES.inc(stats.table_probes, labels)
+    TABLE_HITS.inc(stats.table_hits, labels)
+
 class AIPlayer(Player):
+    """Computer player; ``budget`` defaults to the difficulty's calibrated ``ai.calibration.Budget``."""
+
+    def __init__(self, symbol, difficulty=DEFAULT_DIFFICULTY, budget=None):
+        super().__init__(symbol)
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"Unknown difficulty {difficulty!r}, expected one of {', '.join(DIFFICULTIES)}")
+        self.difficulty = difficulty
+        self.budget = budget if budget is not None else load_budgets()[difficulty]
+        self.depth = self.budget.depth
+        self.solver = None  # Created by the first move that needs it; easy never does
+        self.proved = None  # Result proved for this game, if any
+
+    def search(self, board, phase, stats=None, node_limit=None, deadline=None):
+        """Run this difficulty's engine; returns ``(score, move)``.
+
+        ``node_limit`` and ``deadline``, a ``time.perf_counter()`` value,
+        replace the budget's nodes and seconds for medium and hard.
+        """
+        budget = self.budget
+        if self.difficulty == "easy":
+            return minimax_easy.minimax(board, budget.depth, True, self.symbol, phase, stats)
+        if node_limit is None:
+            node_limit = budget.nodes
+        if deadline is None and budget.seconds is not None:
+            deadline = time.perf_counter() + budget.seconds
+        if self.difficulty == "hard":
+            if node_limit is None and deadline is None:
+                return minimax_hard.minimax(board, budget.depth, True, self.symbol, phase, stats=stats)
+            if stats is None:
+                stats = SearchStats()
+            if node_limit is not None:
+                stats.node_limit = stats.nodes + node_limit
+            stats.deadline = deadline
+            score, move, _ = minimax_hard.iterative_search(board, budget.depth, self.symbol, phase, stats)
+            return score, move
+        time_limit = max(0.0, deadline - time.perf_counter()) if deadline is not None else None
+        return choose_move(board, budget.depth, self.symbol, phase, stats, node_limit, time_limit)
+
+    def think(self, board, phase, stats=None):
+        """Return ``(score, move)``, handing near-decisive positions to the proof solver.
+
+        Once a result is proved, later moves come from the solver alone; its
+        table still holds the proof, so they cost almost nothing. Everything
+        the move runs shares one deadline, the budget's ``seconds`` less
+        ``STOP_MARGIN`` from the start of the move (``PROOF_TIME_LIMIT`` for
+        the proofs without one),
+        and the budget's ``nodes``: a failed re-proof is charged to the
+        search, and a proof after the search gets at most that many nodes.
+        """
+        if self.difficulty == "easy":
+            return self.search(board, phase, stats)
+        budget = self.budget
+        seconds = budget.seconds - STOP_MARGIN if budget.seconds is not None else PROOF_TIME_LIMIT
+        deadline = time.perf_counter() + max(seconds, 0.0)
+        search_deadline = deadline if budget.seconds is not None else None
+        search_nodes = budget.nodes
+        proof_nodes = PROOF_NODE_LIMIT if budget.nodes is None else min(PROOF_NODE_LIMIT, budget.nodes)
+        if self.solver is None or self.solver.variant is not board.variant:
+            self.solver = new_solver(board.variant)
+            self.proved = None
+        if self.proved is not None:
+            result, move = self.solver.solve_board(board, self.symbol, proof_nodes, deadline)
+            if result is not None:
+                return PROOF_SCORES[result], move
+            logger.warning(f"Could not re-prove result {self.proved} within the limits; searching again")
+            self.proved = None
+            if search_nodes is not None:
+                search_nodes = max(1, search_nodes - self.solver.nodes)
+
+        score, move = self.search(board, phase, stats, search_nodes, search_deadline)
+        if abs(score) >= DECISIVE_SCORE and time.perf_counter() < deadline:
+            result, proof_move = self.solver.solve_board(board, self.symbol, proof_nodes, deadline)
+            if result is not None:
+                logger.info(f"AI player {self.symbol} proved result {result}")
+                self.proved = result
+                return PROOF_SCORES[result], proof_move
+        return score, move
+
     def get_move(self, board):
         logger.debug(f"AI player {self.symbol} getting move. Pieces placed: {board.pieces_placed[self.symbol]}")
-        if board.pieces_placed[self.symbol] < 4:
-            logger.info(f"AI player {self.symbol} in placement phase")
-            return self.get_placement(board)
-        else:
-            logger.info(f"AI player {self.symbol} in movement phase")
-            return self.get_movement(board)
+        # The search plays its moves on this board; keep them from reaching the front end
+        listeners, board.listeners = board.listeners, []
+        stats = SearchStats()
+        start = time.perf_counter()
+        try:
+            if board.pieces_placed[self.symbol] < board.variant.pieces:
+                logger.info(f"AI player {self.symbol} in placement phase")
+                return self.get_placement(board, stats)
+            else:
+                logger.info(f"AI player {self.symbol} in movement phase")
+                return self.get_movement(board, stats)
+        finally:
+            board.listeners = listeners
+            record_move(self.difficulty, time.perf_counter() - start, stats)
 
-    def get_placement(self, board):
+    def get_placement(self, board, stats=None):
         logger.debug("AI calculating placement move")
-        score, move = minimax(board, 3, True, self.symbol, "placement")
+        score, move = self.think(board, "placement", stats)
         if move is None:
             logger.error("AI failed to generate placement move")
             # Fallback: find first empty cell
-            for i in range(4):
-                for j in range(4):
+            for i in range(board.size):
+                for j in range(board.size):
                     if board.is_valid_placement((i, j), self.symbol):
                         logger.info(f"AI using fallback placement at ({i}, {j})")
                         return "place", (i, j)
         else:
+            move = decode_move(move, board.size)
             logger.info(f"AI placed piece at {move[1]} with score {score}")
             return move
 
-    def get_movement(self, board):
+    def get_movement(self, board, stats=None):
         logger.debug("AI calculating movement move")
-        score, move = minimax(board, 3, True, self.symbol, "movement")
+        score, move = self.think(board, "movement", stats)
         if move is None:
             logger.error("AI failed to generate movement move")
             # Fallback: find first valid move
@@ -114,5 +251,40 @@ class AIPlayer(Player):
                         logger.info(f"AI using fallback movement from {piece} to {cell}")
                         return "move", (piece, cell)
         else:
+            move = decode_move(move, board.size)
             logger.info(f"AI moved piece {move[1]} with score {score}")
             return move
+
+def get_moves(turns):
+    """Moves for many pending AI turns at once; ``turns`` is a list of ``(AIPlayer, board)``.
+
+    Easy players are searched together by ``ai.batch``, which is much
+    faster than one ``get_move`` each when a server hosts many games; other
+    difficulties, and any easy turn the batch finds no move for, go through
+    ``get_move``. Returns one move per turn, in the form ``get_move`` returns.
+    """
+    moves = [None] * len(turns)
+    by_depth = {}
+    for index, (player, _) in enumerate(turns):
+        if player.difficulty == "easy":
+            by_depth.setdefault(player.depth, []).append(index)
+    for depth, easy in by_depth.items():
+        boards = [turns[index][1] for index in easy]
+        symbols = [turns[index][0].symbol for index in easy]
+        phases = ["placement" if board.pieces_placed[symbol] < board.variant.pieces else "movement"
+                  for board, symbol in zip(boards, symbols)]
+        stats = SearchStats()
+        start = time.perf_counter()
+        for index, (score, move) in zip(easy, batch_search(boards, symbols, phases, depth, stats)):
+            if move is not None:
+                moves[index] = decode_move(move, turns[index][1].size)
+        # Every turn of the batch waited for all of it; the nodes are counted once
+        elapsed = time.perf_counter() - start
+        for _ in easy:
+            MOVE_SECONDS.observe(elapsed, ("easy",))
+        SEARCH_NODES.inc(stats.nodes, ("easy",))
+        logger.info(f"Batch searched {len(easy)} easy AI turns at depth {depth}")
+    for index, (player, board) in enumerate(turns):
+        if moves[index] is None:
+            moves[index] = player.get_move(board)
+    return moves
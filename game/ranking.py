@@ -0,0 +1,253 @@
+"""Dense integer ranks of positions, and the reachable position space as a bitset.
+
+Positions are grouped into classes by ``(x count, o count, side to move)``.
+Only the classes play can produce are ranked: while pieces are being placed
+the side to move follows from the counts (X places first), and once both
+sides have every piece either may be to move. Within a class the X cells are
+ranked among all cells and the O cells among the cells X leaves empty, both
+with the combinatorial number system (colex order):
+
+    rank = offset[class] + rank(X cells) * C(cells - x, o) + rank(O cells)
+
+Ranks run from 0 to ``size - 1`` with no gaps, so a table indexed by rank
+(a tablebase, an opening book, a shard of training positions) is a flat array
+rather than a dict of position keys. Won positions are ranked like any other.
+
+``rank_many`` and ``unrank_many`` do the same on NumPy arrays, and
+``reachable`` walks every position reachable from the empty board,
+breadth first, keeping the visited set as a bitset over ranks.
+"""
+import logging
+from math import comb
+
+import numpy as np
+
+from game.bitboard import popcount
+from game.variant import STANDARD
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_board.log'
+)
+logger = logging.getLogger('ranking')
+
+MAX_BITSET_POSITIONS = 1 << 32  # Largest space ``reachable`` will hold a bitset for (512 MiB)
+CHUNK_POSITIONS = 1 << 16       # Frontier positions expanded at once
+
+class PositionIndex:
+    """Ranking of the legal positions of one variant."""
+
+    def __init__(self, variant=STANDARD):
+        self.variant = variant
+        cells, pieces = variant.cells, variant.pieces
+        # Classes by total pieces, then side to move
+        self.classes = []
+        for placed in range(2 * pieces + 1):
+            x_count, o_count = (placed + 1) // 2, placed // 2
+            if x_count == o_count == pieces:
+                self.classes += [(pieces, pieces, 1), (pieces, pieces, 2)]
+            else:
+                self.classes.append((x_count, o_count, 1 if x_count == o_count else 2))
+        self.class_ids = {key: index for index, key in enumerate(self.classes)}
+        self.widths = [comb(cells - x_count, o_count) for x_count, o_count, _ in self.classes]
+        self.offsets = [0]
+        for (x_count, _, _), width in zip(self.classes, self.widths):
+            self.offsets.append(self.offsets[-1] + comb(cells, x_count) * width)
+        self.size = self.offsets.pop()
+
+        # The same tables as arrays for the vectorized functions
+        self.binomials = np.array([[comb(n, k) for k in range(cells + 1)] for n in range(cells + 1)], dtype=np.int64)
+        self.class_table = np.full((pieces + 1, pieces + 1, 3), -1, dtype=np.int64)
+        for index, (x_count, o_count, side) in enumerate(self.classes):
+            self.class_table[x_count, o_count, side] = index
+        self.class_array = np.array(self.classes, dtype=np.int64)
+        self.offset_array = np.array(self.offsets, dtype=np.int64)
+        self.width_array = np.array(self.widths, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def class_range(self, x_count, o_count, side):
+        """First rank of a class and the rank after its last."""
+        index = self.class_ids[(x_count, o_count, side)]
+        end = self.offsets[index + 1] if index + 1 < len(self.offsets) else self.size
+        return self.offsets[index], end
+
+    def rank(self, x_mask, o_mask, side):
+        """Rank of the position; ValueError if play cannot produce its class."""
+        if x_mask & o_mask or (x_mask | o_mask) & ~self.variant.full:
+            raise ValueError(f"Masks {x_mask:#x} and {o_mask:#x} are not a position")
+        key = (popcount(x_mask), popcount(o_mask), side)
+        if key not in self.class_ids:
+            raise ValueError(f"No legal position has {key[0]} X, {key[1]} O and player {side} to move")
+        index = self.class_ids[key]
+        x_rank = o_rank = x_seen = o_seen = empty_seen = 0
+        for cell in range(self.variant.cells):
+            if x_mask >> cell & 1:
+                x_seen += 1
+                x_rank += comb(cell, x_seen)
+                continue
+            if o_mask >> cell & 1:
+                o_seen += 1
+                o_rank += comb(empty_seen, o_seen)
+            empty_seen += 1
+        return self.offsets[index] + x_rank * self.widths[index] + o_rank
+
+    def unrank(self, rank):
+        """``(x_mask, o_mask, side)`` of ``rank``."""
+        if not 0 <= rank < self.size:
+            raise ValueError(f"Rank {rank} is outside 0..{self.size - 1}")
+        index = next(index for index in range(len(self.offsets) - 1, -1, -1) if self.offsets[index] <= rank)
+        x_count, o_count, side = self.classes[index]
+        x_rank, o_rank = divmod(rank - self.offsets[index], self.widths[index])
+        cells = self.variant.cells
+        x_mask = 0
+        for cell in _colex_cells(x_rank, x_count, cells):
+            x_mask |= 1 << cell
+        free = [cell for cell in range(cells) if not x_mask >> cell & 1]
+        o_mask = 0
+        for position in _colex_cells(o_rank, o_count, len(free)):
+            o_mask |= 1 << free[position]
+        return x_mask, o_mask, side
+
+    def rank_board(self, board):
+        return self.rank(board.masks[1], board.masks[2], board.to_move)
+
+    def rank_many(self, x_masks, o_masks, sides):
+        """Ranks of arrays of positions; ValueError if any is not in a ranked class."""
+        x_masks = np.asarray(x_masks, dtype=np.int64)
+        o_masks = np.asarray(o_masks, dtype=np.int64)
+        cells = self.variant.cells
+        binomials = self.binomials.ravel()
+        x_rank = np.zeros(x_masks.shape, dtype=np.int64)
+        o_rank = np.zeros(x_masks.shape, dtype=np.int64)
+        x_seen = np.zeros(x_masks.shape, dtype=np.int64)
+        # Flat index of C(empty cells seen, O cells seen), so each step is one gather
+        o_index = np.zeros(x_masks.shape, dtype=np.int64)
+        for cell in range(cells):
+            x_bit = (x_masks >> cell) & 1
+            o_bit = (o_masks >> cell) & 1
+            x_seen += x_bit
+            x_rank += binomials.take(cell * (cells + 1) + x_seen) * x_bit
+            o_index += o_bit
+            o_rank += binomials.take(o_index) * o_bit
+            o_index += (1 - x_bit) * (cells + 1)
+        o_seen = o_index % (cells + 1)
+        sides = np.asarray(sides, dtype=np.int64)
+        valid = ((x_masks & o_masks) == 0) & (x_seen <= self.variant.pieces) & (o_seen <= self.variant.pieces)
+        valid &= (sides == 1) | (sides == 2)
+        index = np.full(x_masks.shape, -1, dtype=np.int64)
+        index[valid] = self.class_table[x_seen[valid], o_seen[valid], sides[valid]]
+        if (index < 0).any():
+            raise ValueError(f"{int((index < 0).sum())} positions are not in a ranked class")
+        return self.offset_array[index] + x_rank * self.width_array[index] + o_rank
+
+    def unrank_many(self, ranks):
+        """``(x_masks, o_masks, sides)`` arrays of an array of ranks."""
+        ranks = np.asarray(ranks, dtype=np.int64)
+        if len(ranks) and (ranks.min() < 0 or ranks.max() >= self.size):
+            raise ValueError(f"Ranks must be in 0..{self.size - 1}")
+        index = np.searchsorted(self.offset_array, ranks, side="right") - 1
+        x_count, o_count, sides = self.class_array[index].T
+        x_rank, o_rank = np.divmod(ranks - self.offset_array[index], self.width_array[index])
+        cells = self.variant.cells
+        x_masks = _colex_masks(self.binomials, x_rank, x_count, cells)
+        compact = _colex_masks(self.binomials, o_rank, o_count, cells)
+        # Spread the O cells, numbered among the cells X leaves empty, back over the board
+        o_masks = np.zeros(ranks.shape, dtype=np.int64)
+        empty_seen = np.zeros(ranks.shape, dtype=np.int64)
+        for cell in range(cells):
+            free = 1 - ((x_masks >> cell) & 1)
+            o_masks |= (free & (compact >> empty_seen)) << cell
+            empty_seen += free
+        return x_masks, o_masks, sides
+
+def _colex_cells(rank, count, cells):
+    """The ``count`` cells below ``cells`` whose colex rank is ``rank``, largest first."""
+    for cell in range(cells - 1, -1, -1):
+        if count and comb(cell, count) <= rank:
+            rank -= comb(cell, count)
+            count -= 1
+            yield cell
+
+def _colex_masks(binomials, ranks, counts, cells):
+    ranks, counts = ranks.copy(), counts.copy()
+    masks = np.zeros(ranks.shape, dtype=np.int64)
+    for cell in range(cells - 1, -1, -1):
+        take = (counts > 0) & (binomials[cell, counts] <= ranks)
+        masks |= take.astype(np.int64) << cell
+        ranks -= np.where(take, binomials[cell, counts], 0)
+        counts -= take
+    return masks
+
+_INDEXES = {}
+
+def index_for(variant):
+    index = _INDEXES.get(variant)
+    if index is None:
+        index = _INDEXES[variant] = PositionIndex(variant)
+    return index
+
+def bitset_contains(bits, ranks):
+    return ((bits[ranks >> 3] >> (ranks & 7).astype(np.uint8)) & 1).astype(bool)
+
+def bitset_add(bits, ranks):
+    np.bitwise_or.at(bits, ranks >> 3, (1 << (ranks & 7)).astype(np.uint8))
+
+def reachable(variant=STANDARD, chunk=CHUNK_POSITIONS):
+    """Every position reachable from the empty board, as a bitset over ranks.
+
+    Returns ``(bits, layers)``: ``bits`` is a packed ``uint8`` array with bit
+    ``rank`` set for each reachable position (little-endian within a byte,
+    see ``bitset_contains``) and ``layers[n]`` counts the positions first
+    reached after ``n`` moves. Won positions are reached but not expanded.
+    Repetition and move-count draws are not part of a position and are
+    ignored.
+    """
+    index = index_for(variant)
+    if index.size > MAX_BITSET_POSITIONS:
+        raise ValueError(f"{variant.name} has {index.size} positions, over the {MAX_BITSET_POSITIONS} "
+                         f"a bitset is kept for")
+    cells, pieces = variant.cells, variant.pieces
+    bits = np.zeros((index.size + 7) // 8, dtype=np.uint8)
+    win_masks = np.array(variant.win_masks, dtype=np.int64)
+    cell_bits = np.int64(1) << np.arange(cells, dtype=np.int64)
+    pairs = np.array([(frm, to) for frm in range(cells) for to in range(cells)
+                      if frm != to and variant.reach_masks[frm] >> to & 1], dtype=np.int64).reshape(-1, 2)
+
+    frontier = index.rank_many([0], [0], [1])
+    bitset_add(bits, frontier)
+    layers = []
+    while len(frontier):
+        layers.append(len(frontier))
+        children = []
+        for start in range(0, len(frontier), chunk):
+            x_masks, o_masks, sides = index.unrank_many(frontier[start:start + chunk])
+            won = (((x_masks[:, None] & win_masks) == win_masks) | ((o_masks[:, None] & win_masks) == win_masks)).any(1)
+            x_masks, o_masks, sides = x_masks[~won], o_masks[~won], sides[~won]
+            own = np.where(sides == 1, x_masks, o_masks)
+            empty = ~(x_masks | o_masks) & variant.full
+            placing = ((own[:, None] >> np.arange(cells)) & 1).sum(axis=1) < pieces
+
+            # Placements into every empty cell, then movements along every reachable pair
+            rows, columns = np.nonzero(placing[:, None] & ((empty[:, None] >> np.arange(cells)) & 1).astype(bool))
+            new_own = [own[rows] | cell_bits[columns]]
+            parents = [rows]
+            if len(pairs):
+                moving = ~placing[:, None] & (((own[:, None] >> pairs[:, 0]) & (empty[:, None] >> pairs[:, 1]) & 1)
+                                              .astype(bool))
+                rows, columns = np.nonzero(moving)
+                new_own.append(own[rows] ^ (cell_bits[pairs[columns, 0]] | cell_bits[pairs[columns, 1]]))
+                parents.append(rows)
+            new_own, parents = np.concatenate(new_own), np.concatenate(parents)
+            moved_x = sides[parents] == 1
+            child = index.rank_many(np.where(moved_x, new_own, x_masks[parents]),
+                                    np.where(moved_x, o_masks[parents], new_own), 3 - sides[parents])
+            child = child[~bitset_contains(bits, child)]
+            bitset_add(bits, child)
+            children.append(child)
+        frontier = np.unique(np.concatenate(children)) if children else np.zeros(0, dtype=np.int64)
+    logger.info(f"{variant.name}: {sum(layers)} of {index.size} ranked positions reachable in {len(layers)} layers")
+    return bits, layers
@@ -0,0 +1,70 @@
+"""Movement rules on bitboards: which moves are legal and whether a side can move at all.
+
+A variant either lets a piece jump to any empty cell (JUMP, the standard
+game) or only step to one of the up to eight cells around it (ADJACENT). The
+difference is one precomputed mask per cell, ``variant.reach_masks``, so every
+test here is a few ``&`` operations whichever rule is played. Board
+validation, stalemate detection and all move generators go through this
+module.
+"""
+from game.variant import ADJACENT, JUMP, MOVEMENT_RULES, STANDARD  # Rule names re-exported for callers
+
+# Board imports this module, so it cannot use game.bitboard, which imports Board
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def _count(mask):
+    return bin(mask).count("1")
+
+def can_reach(variant, from_index, to_index):
+    """True if a piece on ``from_index`` may move to ``to_index`` when it is empty."""
+    return bool(variant.reach_masks[from_index] >> to_index & 1)
+
+def destinations(variant, from_index, empty):
+    """Mask of the empty cells the piece on ``from_index`` may move to."""
+    return variant.reach_masks[from_index] & empty
+
+def reachers(variant, own, to_index):
+    """Mask of the pieces in ``own`` that may move to ``to_index``."""
+    return own & variant.reach_masks[to_index]
+
+def legal_moves(own, other, variant=STANDARD):
+    """All ``(from_index, to_index)`` moves for the side owning ``own``; from_index is -1 for a placement."""
+    empty = variant.full & ~(own | other)
+    if _count(own) < variant.pieces:
+        return [(-1, to) for to in _bits(empty)]
+    reach = variant.reach_masks
+    return [(frm, to) for frm in _bits(own) for to in _bits(reach[frm] & empty)]
+
+def movement_moves(board, player, targets=None):
+    """Movement moves of ``player`` on a Board as move codes (``game.moves``).
+
+    Destinations are the reachable empty cells in row-major order, or only
+    the reachable cells of ``targets``, in its order.
+    """
+    variant = board.variant
+    reach = variant.reach_masks
+    pieces = list(_bits(board.masks[player]))
+    if targets is None:
+        empty = variant.full & ~(board.masks[1] | board.masks[2])
+        return [(frm + 1) << 8 | (to + 1) for frm in pieces for to in _bits(reach[frm] & empty)]
+    size = variant.size
+    indices = [row * size + col for row, col in targets]
+    return [(frm + 1) << 8 | (to + 1) for frm in pieces for to in indices if reach[frm] >> to & 1]
+
+def has_legal_move(own, other, variant=STANDARD):
+    """True if the side owning ``own`` has any move."""
+    empty = variant.full & ~(own | other)
+    if variant.movement == JUMP or _count(own) < variant.pieces:
+        return bool(empty)
+    reach = variant.reach_masks
+    return any(reach[frm] & empty for frm in _bits(own))
+
+def is_stalemate(board, player):
+    """True if ``player``, having placed every piece, has no move on ``board``."""
+    if board.pieces_placed[player] < board.variant.pieces:
+        return False
+    return not has_legal_move(board.masks[player], board.masks[3 - player], board.variant)
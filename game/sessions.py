@@ -0,0 +1,202 @@
+"""Fixed-width table of live game sessions for a long-running multi-game host.
+
+A ``Board`` per game costs a NumPy array, several dicts and a history list.
+A host with many games keeps them instead as rows of one structured array,
+``SESSION_DTYPE``: the two piece masks, side to move, variant, difficulty,
+clocks and the move history as ``game.moves`` codes. A Board is built only
+for the session whose turn is being played and written back afterwards.
+
+``snapshot`` writes the table to a memory-mapped ``.npy`` file, under a
+temporary name renamed when complete, plus a small JSON file naming the
+variants and difficulties the row indices refer to. ``restore`` maps the file
+copy-on-write: a restart scans the active flags for the free list and builds
+no objects; rows are paged in as sessions are used.
+"""
+import json
+import logging
+import os
+
+import numpy as np
+
+from game.board import MAX_MOVES, Board
+from game.difficulty import DIFFICULTIES
+from game.moves import PLACEMENT_LIMIT
+from game.variant import VARIANTS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_board.log'
+)
+logger = logging.getLogger('sessions')
+
+SESSION_DTYPE = np.dtype([
+    ("active", np.bool_),
+    ("variant", np.uint8),              # Index into VARIANT_NAMES
+    ("difficulty", np.uint8),           # Index into DIFFICULTY_NAMES
+    ("human", np.uint8),                # Side the human plays, 0 if none
+    ("to_move", np.uint8),
+    ("plies", np.uint16),               # Moves in the history
+    ("x_mask", np.uint64),              # Player 1 pieces, bit row * size + col
+    ("o_mask", np.uint64),              # Player 2 pieces
+    ("clock", np.float64, (2,)),        # Seconds left per player, inf without a clock
+    ("turn_started", np.float64),       # time.time() when the side to move started its turn
+    ("history", np.uint16, (MAX_MOVES,)),
+])
+
+VARIANT_NAMES = tuple(VARIANTS)
+DIFFICULTY_NAMES = tuple(DIFFICULTIES)
+DEFAULT_CAPACITY = 1024
+NO_CLOCK = float("inf")
+
+def meta_path(path):
+    return path + ".json"
+
+class SessionTable:
+    """Live sessions as rows of a ``SESSION_DTYPE`` array; a session id is its row."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, rows=None):
+        self.rows = rows if rows is not None else np.zeros(capacity, dtype=SESSION_DTYPE)
+        # Lowest free row last, so new sessions fill the table from the front
+        self.free = np.flatnonzero(~self.rows["active"])[::-1].tolist()
+
+    def __len__(self):
+        return len(self.rows) - len(self.free)
+
+    @property
+    def capacity(self):
+        return len(self.rows)
+
+    def memory_bytes(self):
+        return self.rows.nbytes
+
+    memory_capacity = memory_bytes
+
+    def create(self, variant_name="4x4", difficulty="medium", human=1, clock=NO_CLOCK, now=0.0):
+        """Open a session at the start position and return its id."""
+        if not self.free:
+            self._grow()
+        session = self.free.pop()
+        row = self.rows[session]
+        row["active"] = True
+        row["variant"] = VARIANT_NAMES.index(variant_name)
+        row["difficulty"] = DIFFICULTY_NAMES.index(difficulty)
+        row["human"] = human
+        row["to_move"] = 1
+        row["plies"] = 0
+        row["x_mask"] = row["o_mask"] = 0
+        row["clock"] = clock
+        row["turn_started"] = now
+        return session
+
+    def close(self, session):
+        self._check(session)
+        self.rows[session]["active"] = False
+        self.free.append(session)
+
+    def _grow(self):
+        old = len(self.rows)
+        rows = np.zeros(max(DEFAULT_CAPACITY, 2 * old), dtype=SESSION_DTYPE)
+        rows[:old] = self.rows
+        self.rows = rows
+        self.free.extend(range(len(rows) - 1, old - 1, -1))
+        logger.info(f"Session table grown from {old} to {len(rows)} rows")
+
+    def _check(self, session):
+        if not 0 <= session < len(self.rows) or not self.rows["active"][session]:
+            raise KeyError(f"No active session {session}")
+
+    def variant(self, session):
+        return VARIANTS[VARIANT_NAMES[self.rows["variant"][session]]]
+
+    def difficulty(self, session):
+        return DIFFICULTY_NAMES[self.rows["difficulty"][session]]
+
+    def play(self, session, move, now=None):
+        """Record ``move`` (a code) for the side to move without building a Board.
+
+        The move is not validated, as with ``Board.push``. With ``now``, the
+        time since the turn started is charged to the mover's clock.
+        """
+        self._check(session)
+        row = self.rows[session]
+        plies = int(row["plies"])
+        if plies >= MAX_MOVES:
+            raise ValueError(f"Session {session} already has {MAX_MOVES} moves")
+        player = int(row["to_move"])
+        field = "x_mask" if player == 1 else "o_mask"
+        mask = int(row[field])
+        to_index = (move & 255) - 1
+        if move >= PLACEMENT_LIMIT:
+            mask &= ~(1 << ((move >> 8) - 1))
+        row[field] = mask | 1 << to_index
+        row["history"][plies] = move
+        row["plies"] = plies + 1
+        row["to_move"] = 3 - player
+        if now is not None:
+            row["clock"][player - 1] -= now - row["turn_started"]
+            row["turn_started"] = now
+
+    def board(self, session):
+        """A Board holding the session's position and history, for searching or validating a move."""
+        self._check(session)
+        row = self.rows[session]
+        variant = self.variant(session)
+        plies = int(row["plies"])
+        history = [int(code) for code in row["history"][:plies]]
+        # Take the history back from the current position to find where it started
+        masks = {1: int(row["x_mask"]), 2: int(row["o_mask"])}
+        player = int(row["to_move"])
+        for move in reversed(history):
+            player = 3 - player
+            to_bit = 1 << ((move & 255) - 1)
+            masks[player] &= ~to_bit
+            if move >= PLACEMENT_LIMIT:
+                masks[player] |= 1 << ((move >> 8) - 1)
+        board = Board.from_masks(masks[1], masks[2], player, variant)
+        for move in history:
+            board.push(move, player)
+            player = 3 - player
+        return board
+
+    def store(self, session, board):
+        """Write ``board``'s position and history back to the session."""
+        self._check(session)
+        history = [move for move, _, _, _, _ in board.history]
+        if len(history) > MAX_MOVES:
+            raise ValueError(f"History of {len(history)} moves does not fit in {MAX_MOVES}")
+        row = self.rows[session]
+        row["variant"] = VARIANT_NAMES.index(board.variant.name)
+        row["x_mask"] = board.masks[1]
+        row["o_mask"] = board.masks[2]
+        row["to_move"] = board.to_move
+        row["plies"] = len(history)
+        row["history"][:len(history)] = history
+
+    def snapshot(self, path):
+        """Write every row to ``path`` as a memory-mapped ``.npy`` file, atomically."""
+        temp_path = path + ".tmp"
+        rows = np.lib.format.open_memmap(temp_path, mode="w+", dtype=SESSION_DTYPE, shape=self.rows.shape)
+        rows[:] = self.rows
+        rows.flush()
+        del rows
+        with open(meta_path(path) + ".tmp", "w") as handle:
+            json.dump({"variants": VARIANT_NAMES, "difficulties": DIFFICULTY_NAMES,
+                       "dtype": SESSION_DTYPE.descr}, handle, indent=2)
+        os.replace(meta_path(path) + ".tmp", meta_path(path))
+        os.replace(temp_path, path)
+        logger.info(f"Snapshot of {len(self)} sessions written to {path}")
+
+    @classmethod
+    def restore(cls, path, copy=False):
+        """The table saved by ``snapshot``, mapped copy-on-write unless ``copy`` reads it all now."""
+        with open(meta_path(path)) as handle:
+            meta = json.load(handle)
+        expected = json.loads(json.dumps({"variants": VARIANT_NAMES, "difficulties": DIFFICULTY_NAMES,
+                                          "dtype": SESSION_DTYPE.descr}))
+        if meta != expected:
+            raise ValueError(f"{path} was written with a different session layout: {meta}")
+        rows = np.load(path, mmap_mode=None if copy else "c")
+        logger.info(f"Restored {int(rows['active'].sum())} sessions from {path}")
+        return cls(rows=rows)
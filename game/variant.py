@@ -0,0 +1,197 @@
+"""Game variants: board size, pieces per player and the size of the winning patterns.
+
+Every table the engine needs is derived from those numbers once per variant.
+Positions are arbitrary-width integer bitboards: cell ``(row, col)`` is bit
+``row * size + col``, so a 6x6 board is a 36-bit mask per player and pattern
+tests stay a single ``&`` whatever the size.
+"""
+import random
+
+# Movement rules: a piece may jump to any empty cell, or step to an adjacent one
+JUMP = "jump"
+ADJACENT = "adjacent"
+MOVEMENT_RULES = (JUMP, ADJACENT)
+
+class Variant:
+    """Rules of one board size, with its winning masks, symmetries and Zobrist keys.
+
+    A line is ``line_length`` cells in a row, column or diagonal (the full width
+    by default) and a square is ``square_size`` x ``square_size`` cells.
+    ``movement`` is JUMP or ADJACENT; ``game.rules`` applies it.
+    """
+
+    def __init__(self, size=4, pieces=4, line_length=None, square_size=2, name=None, movement=JUMP):
+        self.size = size
+        self.pieces = pieces
+        self.line_length = line_length or size
+        self.square_size = square_size
+        self.movement = movement
+        self.name = name or f"{size}x{size}" + ("" if movement == JUMP else f"-{movement}")
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+        if movement not in MOVEMENT_RULES:
+            raise ValueError(f"Unknown movement rule {movement!r}, expected one of {', '.join(MOVEMENT_RULES)}")
+        if not 2 <= self.line_length <= size or not 2 <= square_size <= size:
+            raise ValueError(f"Patterns do not fit a {size}x{size} board")
+        if not 0 < pieces or 2 * pieces >= self.cells:
+            raise ValueError(f"{pieces} pieces each leave no empty cell on a {size}x{size} board")
+
+        self.positions = [divmod(index, size) for index in range(self.cells)]
+        self.orthogonal_masks, self.diagonal_masks = self._build_line_masks()
+        self.line_masks = self.orthogonal_masks + self.diagonal_masks
+        self.square_masks = self._build_square_masks()
+        self.win_masks = self.line_masks + self.square_masks
+        # Patterns the evaluation checks for immediate threats: no diagonals
+        self.threat_masks = self.orthogonal_masks + self.square_masks
+        # Winning patterns through each cell, so a move only has to test its own patterns
+        self.cell_win_masks = [[mask for mask in self.win_masks if mask >> index & 1]
+                               for index in range(self.cells)]
+
+        last = size - 1
+        self.corners = [(0, 0), (0, last), (last, 0), (last, last)]
+        self.corner_mask = 0
+        for row, col in self.corners:
+            self.corner_mask |= self.bit(row, col)
+
+        # The up to eight cells around each cell, and the cells a piece may move to from it
+        self.neighbor_masks = self._build_neighbor_masks()
+        self.reach_masks = self.neighbor_masks if movement == ADJACENT else [self.full] * self.cells
+
+        self.symmetries = self._build_symmetries()
+        self.key_tables = self._build_key_tables()
+
+        # Zobrist keys: one random 64-bit number per (player, cell), plus one for player 2 to move
+        rng = random.Random(f"zobrist-{self.name}-{pieces}-{self.line_length}-{square_size}")
+        self.zobrist = {player: [rng.getrandbits(64) for _ in range(self.cells)] for player in (1, 2)}
+        self.zobrist_to_move = rng.getrandbits(64)
+        # Mixed into hashes kept in caches shared by several variants
+        self.zobrist_variant = rng.getrandbits(64)
+
+    def __reduce__(self):
+        """Named variants unpickle to the shared instance, keeping ``is STANDARD`` checks valid."""
+        if VARIANTS.get(self.name) is self:
+            return named_variant, (self.name,)
+        return Variant, (self.size, self.pieces, self.line_length, self.square_size, self.name, self.movement)
+
+    def __repr__(self):
+        return (f"Variant(size={self.size}, pieces={self.pieces}, "
+                f"line_length={self.line_length}, square_size={self.square_size})")
+
+    def bit(self, row, col):
+        """Mask with only the cell ``(row, col)`` set."""
+        return 1 << (row * self.size + col)
+
+    def cell(self, index):
+        """Board coordinates of a bit index."""
+        return self.positions[index]
+
+    def _segment(self, row, col, row_step, col_step, length):
+        return sum(self.bit(row + i * row_step, col + i * col_step) for i in range(length))
+
+    def _build_line_masks(self):
+        size, length = self.size, self.line_length
+        # Rows and columns interleaved, then the diagonals, as in the original 4x4 table
+        orthogonal = []
+        for i in range(size):
+            orthogonal.extend(self._segment(i, j, 0, 1, length) for j in range(size - length + 1))
+            orthogonal.extend(self._segment(j, i, 1, 0, length) for j in range(size - length + 1))
+        starts = [(i, j) for i in range(size - length + 1) for j in range(size - length + 1)]
+        diagonal = [self._segment(i, j, 1, 1, length) for i, j in starts]
+        diagonal += [self._segment(i, j + length - 1, 1, -1, length) for i, j in starts]
+        return orthogonal, diagonal
+
+    def _build_neighbor_masks(self):
+        masks = []
+        for row, col in self.positions:
+            mask = 0
+            for row_step in (-1, 0, 1):
+                for col_step in (-1, 0, 1):
+                    r, c = row + row_step, col + col_step
+                    if (row_step or col_step) and 0 <= r < self.size and 0 <= c < self.size:
+                        mask |= self.bit(r, c)
+            masks.append(mask)
+        return masks
+
+    def _build_square_masks(self):
+        size, side = self.size, self.square_size
+        return [sum(self.bit(i + di, j + dj) for di in range(side) for dj in range(side))
+                for i in range(size - side + 1) for j in range(size - side + 1)]
+
+    def _build_symmetries(self):
+        """Cell permutations for the eight rotations and reflections of the board."""
+        last = self.size - 1
+        maps = [
+            lambda r, c: (r, c),
+            lambda r, c: (c, last - r),
+            lambda r, c: (last - r, last - c),
+            lambda r, c: (last - c, r),
+            lambda r, c: (r, last - c),
+            lambda r, c: (last - r, c),
+            lambda r, c: (c, r),
+            lambda r, c: (last - c, last - r),
+        ]
+        permutations = []
+        for mapping in maps:
+            permutation = []
+            for index in range(self.cells):
+                row, col = mapping(*self.cell(index))
+                permutation.append(row * self.size + col)
+            permutations.append(permutation)
+        return permutations
+
+    def _build_key_tables(self):
+        # For each symmetry, one 256-entry table per byte of the word own << cells | other
+        cells = self.cells
+        tables = []
+        for permutation in self.symmetries:
+            byte_tables = []
+            for shift in range(0, 2 * cells, 8):
+                table = []
+                for value in range(256):
+                    mapped = 0
+                    for offset in range(8):
+                        index = shift + offset
+                        if value >> offset & 1 and index < 2 * cells:
+                            base = cells if index >= cells else 0
+                            mapped |= 1 << (base + permutation[index - base])
+                    table.append(mapped)
+                byte_tables.append(table)
+            tables.append(tuple(byte_tables))
+        return tables
+
+    def transform(self, mask, symmetry):
+        """Apply one of the eight board symmetries to ``mask``."""
+        mapped = 0
+        for table in self.key_tables[symmetry]:
+            if not mask:
+                break
+            mapped |= table[mask & 0xFF]
+            mask >>= 8
+        return mapped
+
+    def canonical_key(self, own, other):
+        """Symmetry-independent integer key for the position ``(own, other)``."""
+        word = own << self.cells | other
+        best = None
+        for tables in self.key_tables:
+            key = 0
+            rest = word
+            for table in tables:
+                key |= table[rest & 0xFF]
+                rest >>= 8
+            if best is None or key < best:
+                best = key
+        return best
+
+STANDARD = Variant(4, 4, name="4x4")
+
+# Named variants; the larger boards keep four-in-a-row lines and 2x2 squares
+VARIANTS = {
+    "4x4": STANDARD,
+    "5x5": Variant(5, 5, line_length=4, name="5x5"),
+    "6x6": Variant(6, 6, line_length=4, name="6x6"),
+    "4x4-adjacent": Variant(4, 4, movement=ADJACENT),
+}
+
+def named_variant(name):
+    return VARIANTS[name]
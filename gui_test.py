@@ -4,16 +4,21 @@ from game.player import HumanPlayer, AIPlayer
 
 def create_board_layout():
     """Create the 4x4 grid of buttons"""
-    return [[sg.Button('', size=(4, 2), key=(i, j), button_color=('black', 'white')) 
+    return [[sg.Button('.', size=(4, 2), key=(i, j), button_color=('black', 'white')) 
              for j in range(4)] for i in range(4)]
 
-def update_board(window, board):
-    """Update the visual state of the board"""
-    for i in range(4):
-        for j in range(4):
-            piece = board.board[i, j]
-            text = '.' if piece == 0 else 'X' if piece == 1 else 'O'
-            window[(i, j)].update(text=text)
+def watch_board(window, board, state):
+    """Redraw only the cells a move changed and track the phase and result from board events"""
+    def on_event(event, data):
+        if event == "cell":
+            row, col, value = data
+            window[(row, col)].update(text='.XO'[value])
+        elif event == "phase":
+            state["phase"] = data
+            window['phase'].update('Game Phase: Movement')
+        elif event == "end":
+            state["winner"] = data[0]
+    board.subscribe(on_event)
 
 def reset_colors(window):
     """Reset all button colors to default"""
@@ -28,7 +33,7 @@ def main():
     ai = AIPlayer(2)
     current_player = human
     selected_piece = None
-    game_phase = "placement"
+    state = {"phase": "placement", "winner": None}  # Kept current by the board's events
     player_pieces = {1: 0, 2: 0}  # Explicit piece counter
 
     # Create the window layout
@@ -41,7 +46,8 @@ def main():
         [sg.Button('Exit')]
     ]
 
-    window = sg.Window('4x4 Super Tic-Tac-Toe', layout)
+    window = sg.Window('4x4 Super Tic-Tac-Toe', layout, finalize=True)
+    watch_board(window, board, state)
 
     while True:
         event, _ = window.read()
@@ -54,7 +60,7 @@ def main():
 
             if current_player == human:
                 # PLACEMENT PHASE
-                if game_phase == "placement":
+                if state["phase"] == "placement":
                     # Strict piece limit check
                     if player_pieces[1] >= 4:
                         window['message'].update("You've already placed all 4 pieces!")
@@ -62,15 +68,12 @@ def main():
                         
                     if board.place_piece((row, col), 1):
                         player_pieces[1] += 1
-                        update_board(window, board)
                         window['message'].update('')
                         window['pieces'].update(f'Pieces - Player: {player_pieces[1]}/4, AI: {player_pieces[2]}/4')
                         window['status'].update(f"Player 1: Placed piece ({player_pieces[1]}/4)")
                         
-                        # Phase transition check
-                        if player_pieces[1] == 4 and player_pieces[2] == 4:
-                            game_phase = "movement"
-                            window['phase'].update('Game Phase: Movement')
+                        # The phase event has already switched the phase
+                        if state["phase"] == "movement":
                             window['status'].update("Player 1: Select a piece to move")
                         else:
                             current_player = ai
@@ -90,7 +93,6 @@ def main():
                     else:
                         if board.move_piece(selected_piece, (row, col), 1):
                             reset_colors(window)
-                            update_board(window, board)
                             window['message'].update('')
                             window['status'].update("Piece moved successfully")
                             selected_piece = None
@@ -100,8 +102,8 @@ def main():
                             reset_colors(window)
                             selected_piece = None
 
-                if board.check_winner():
-                    sg.popup("Player 1 Wins!")
+                if state["winner"] is not None:
+                    sg.popup("Player 1 Wins!" if state["winner"] == 1 else "Draw!")
                     break
 
             # AI TURN
@@ -109,27 +111,21 @@ def main():
                 window['status'].update("AI is thinking...")
                 window.refresh()
 
-                if game_phase == "placement" and player_pieces[2] < 4:
+                if state["phase"] == "placement" and player_pieces[2] < 4:
                     _, move = ai.get_move(board)
                     if board.place_piece(move, 2):
                         player_pieces[2] += 1
-                        update_board(window, board)
                         window['pieces'].update(f'Pieces - Player: {player_pieces[1]}/4, AI: {player_pieces[2]}/4')
                         window['status'].update(f"AI placed piece ({player_pieces[2]}/4)")
-                        
-                        if player_pieces[1] == 4 and player_pieces[2] == 4:
-                            game_phase = "movement"
-                            window['phase'].update('Game Phase: Movement')
                 else:
                     # AI movement phase
                     _, move = ai.get_move(board)
                     from_pos, to_pos = move
                     if board.move_piece(from_pos, to_pos, 2):
-                        update_board(window, board)
                         window['status'].update("AI moved a piece")
 
-                if board.check_winner():
-                    sg.popup("AI Wins!")
+                if state["winner"] is not None:
+                    sg.popup("AI Wins!" if state["winner"] == 2 else "Draw!")
                     break
 
                 current_player = human
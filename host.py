@@ -0,0 +1,313 @@
+"""Game host: many games against the AI over a line-based TCP protocol on localhost.
+
+Games live in a ``game.sessions.SessionTable``. AI turns from every
+connection are queued and searched oldest first on one search thread while
+the event loop keeps serving clients; when the oldest is an easy turn, the
+queued easy turns are searched with it in one ``game.player.get_moves`` batch,
+as many as the memory limit leaves room for.
+Each connection plays one game at a time; every command gets exactly one
+reply line:
+
+    newgame [variant <name>] [difficulty <level>] [side x|o]
+                                  start a game with the human on ``side``
+                                  (x by default); ``game <id>``, with
+                                  ``aimove <move>`` added when the AI moves first
+    move <move>                   play a move; ``aimove <move>``, with
+                                  ``end <x|o|draw>`` added once the game is over
+    stats                         ``active``, ``finished``, ``queue``,
+                                  ``searching``, ``moves``, process ``cpu``
+                                  seconds and cache ``memory`` bytes, as
+                                  name/value pairs
+    quit
+
+Moves use the notation in ``game.notation``; errors are ``error <reason>``.
+Run ``python host.py --port 8765``; with ``--port 0`` the port is chosen by
+the system and printed on the ``listening`` line. ``--metrics-port`` serves
+the ``utils.metrics`` registry in Prometheus format and ``--metrics-json``
+dumps it to a file periodically.
+
+The session table, every game's proof solver and the arrays of the easy batch
+being searched count against ``utils.memory.MEMORY``; ``--memory-limit`` sets
+its ceiling. The search
+thread shrinks the caches when they reach it, and ``newgame`` is refused
+while even their minimum sizes leave no room for another game.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Not on Windows
+    resource = None
+
+from ai.batch import CHUNK_BYTES, game_bytes
+from ai.calibration import load_budgets
+from game.notation import format_move, parse_move
+from game.player import DEFAULT_DIFFICULTY, DIFFICULTIES, MIN_SOLVER_MEMORY, AIPlayer, get_moves
+from game.sessions import SESSION_DTYPE, SessionTable
+from game.variant import STANDARD, VARIANTS
+from utils.memory import MEMORY, Reservation
+from utils.metrics import REGISTRY, JsonDumper, start_http_server
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_host.log'
+)
+logger = logging.getLogger('host')
+
+DEFAULT_PORT = 8765
+MAX_BATCH = 256  # Most easy AI turns handed to one get_moves call, memory permitting
+ENFORCE_INTERVAL = 1.0  # Seconds between checks of the memory limit on the search thread
+RESULTS = {0: "draw", 1: "x", 2: "o"}
+
+class Game:
+    """A game in progress: its session, the AI playing it and the result once over."""
+
+    def __init__(self, session, ai):
+        self.session = session
+        self.ai = ai
+        self.result = None
+
+    def on_event(self, event, data):
+        if event == "end":
+            self.result = data[0]
+
+class GameHost:
+    def __init__(self, capacity=1024):
+        self.table = MEMORY.register("sessions", SessionTable(capacity))
+        self.pending = []    # (game, board, future) AI turns waiting for the search thread
+        self.searching = 0   # AI turns in the batch being searched
+        self.finished = 0
+        self.moves = 0
+        self.wakeup = asyncio.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        self.enforced = time.perf_counter()
+        REGISTRY.callback("avai_host_active_games", "Games in progress", lambda: len(self.table))
+        REGISTRY.callback("avai_host_finished_games_total", "Games finished or abandoned", lambda: self.finished,
+                          kind="counter")
+        REGISTRY.callback("avai_host_moves_total", "Moves played by clients and the AI", lambda: self.moves,
+                          kind="counter")
+        REGISTRY.callback("avai_host_queue_depth", "AI turns waiting for the search thread", lambda: len(self.pending))
+        REGISTRY.callback("avai_host_searching", "AI turns in the batch being searched", lambda: self.searching)
+        REGISTRY.callback("avai_host_session_bytes", "Memory of the session table", lambda: self.table.rows.nbytes)
+
+    def board(self, game):
+        board = self.table.board(game.session)
+        board.subscribe(game.on_event)
+        return board
+
+    def new_game(self, variant, difficulty, human):
+        ai = AIPlayer(3 - human, difficulty)
+        search = game_bytes(variant, ai.depth) if difficulty == "easy" else MIN_SOLVER_MEMORY
+        if not MEMORY.fits(SESSION_DTYPE.itemsize + search):
+            raise ValueError("Host is out of memory for new games")
+        session = self.table.create(variant.name, difficulty, human=human)
+        return Game(session, ai)
+
+    def end_game(self, game):
+        self.table.close(game.session)
+        self.finished += 1
+
+    def play(self, game, board, text):
+        """Play ``text`` for the side to move on ``board``; ValueError if it is illegal."""
+        move_type, target = parse_move(text, board.variant)
+        player = board.to_move
+        if move_type == "place":
+            played = board.place_piece(target, player)
+        else:
+            played = board.move_piece(target[0], target[1], player)
+        if not played:
+            raise ValueError(f"Illegal move {text}")
+        self.table.store(game.session, board)
+        self.moves += 1
+
+    async def ai_turn(self, game, board):
+        """Queue the AI's turn on ``board``; returns its move as text once played."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((game, board, future))
+        self.wakeup.set()
+        return await future
+
+    def easy_batch(self):
+        """The queued easy turns to search together, oldest first, and the bytes their batch needs.
+
+        The batch takes turns while ``MEMORY`` has room for their arrays, up to
+        ``MAX_BATCH``; the oldest easy turn is always taken.
+        """
+        room = MEMORY.available()
+        batch, size = [], CHUNK_BYTES
+        for turn in self.pending:
+            game, board, _ = turn
+            if game.ai.difficulty != "easy":
+                continue
+            needed = game_bytes(board.variant, game.ai.depth)
+            if batch and (len(batch) == MAX_BATCH or size + needed > room):
+                break
+            batch.append(turn)
+            size += needed
+        return batch, size
+
+    async def search_loop(self):
+        """Hand queued AI turns to the search thread in batches and play the moves it returns."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.pending:
+                # Oldest turn first; an easy one takes the queued easy turns along in one batch
+                reservation = None
+                if self.pending[0][0].ai.difficulty == "easy":
+                    batch, size = self.easy_batch()
+                    reservation = MEMORY.register("easy batch", Reservation(size))
+                else:
+                    batch = self.pending[:1]
+                chosen = {id(turn) for turn in batch}
+                self.pending = [turn for turn in self.pending if id(turn) not in chosen]
+                self.searching = len(batch)
+                turns = [(game.ai, board) for game, board, _ in batch]
+                try:
+                    moves = await loop.run_in_executor(self.executor, get_moves, turns)
+                except Exception as e:
+                    logger.error(f"Search of {len(batch)} AI turns failed: {str(e)}")
+                    for _, _, future in batch:
+                        future.set_exception(e)
+                    continue
+                finally:
+                    self.searching = 0
+                    reservation = None  # Its weak reference drops it from MEMORY
+                for (game, board, future), move in zip(batch, moves):
+                    text = format_move(move)
+                    try:
+                        self.play(game, board, text)
+                    except ValueError as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(text)
+                if time.perf_counter() - self.enforced >= ENFORCE_INTERVAL:
+                    # On the search thread, which is the one using the caches
+                    await loop.run_in_executor(self.executor, MEMORY.enforce)
+                    self.enforced = time.perf_counter()
+
+    def stats(self):
+        return (f"active {len(self.table)} finished {self.finished} queue {len(self.pending)} "
+                f"searching {self.searching} moves {self.moves} cpu {time.process_time():.3f} "
+                f"memory {MEMORY.reserved}")
+
+    async def handle_client(self, reader, writer):
+        game = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode().split()
+                if not words:
+                    continue
+                command, args = words[0], words[1:]
+                if command == "quit":
+                    break
+                try:
+                    if command == "stats":
+                        reply = self.stats()
+                    elif command == "newgame":
+                        if game is not None:
+                            self.end_game(game)
+                            game = None
+                        game, reply = await self.start(args)
+                    elif command == "move":
+                        if game is None or len(args) != 1:
+                            raise ValueError("No game in progress" if game is None else "Expected one move")
+                        reply = await self.turn(game, args[0])
+                        if game.result is not None:
+                            self.end_game(game)
+                            game = None
+                    else:
+                        raise ValueError(f"Unknown command {command}")
+                except ValueError as e:
+                    reply = f"error {str(e)}"
+                writer.write((reply + "\n").encode())
+                await writer.drain()
+        except ConnectionError as e:
+            logger.warning(f"Connection lost: {str(e)}")
+        finally:
+            if game is not None:
+                self.end_game(game)
+            writer.close()
+
+    async def start(self, args):
+        options = dict(zip(args[::2], args[1::2]))
+        variant = VARIANTS.get(options.get("variant", STANDARD.name))
+        difficulty = options.get("difficulty", DEFAULT_DIFFICULTY)
+        human = {"x": 1, "o": 2}.get(options.get("side", "x"))
+        if variant is None or difficulty not in DIFFICULTIES or human is None:
+            raise ValueError(f"Bad newgame options {' '.join(args)}")
+        game = self.new_game(variant, difficulty, human)
+        reply = f"game {game.session}"
+        if human == 2:
+            reply += f" aimove {await self.ai_turn(game, self.board(game))}"
+        return game, reply
+
+    async def turn(self, game, text):
+        board = self.board(game)
+        self.play(game, board, text)
+        if game.result is not None:
+            return f"end {RESULTS[game.result]}"
+        reply = f"aimove {await self.ai_turn(game, board)}"
+        if game.result is not None:
+            reply += f" end {RESULTS[game.result]}"
+        return reply
+
+def raise_file_limit():
+    """Raise the open file limit to the hard limit, so thousands of clients can connect."""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+async def serve(address, port, capacity):
+    load_budgets()  # Calibrate now if needed, rather than in the first game's move
+    host = GameHost(capacity)
+    MEMORY.enforce()  # Before any search runs, in case the limit was lowered
+    server = await asyncio.start_server(host.handle_client, address, port, backlog=4096)
+    search = asyncio.create_task(host.search_loop())
+    port = server.sockets[0].getsockname()[1]
+    logger.info(f"Listening on {address}:{port}")
+    print(f"listening {address} {port}", flush=True)
+    async with server:
+        try:
+            await server.serve_forever()
+        finally:
+            search.cancel()
+            host.executor.shutdown(wait=False, cancel_futures=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    parser.add_argument("--capacity", type=int, default=1024, help="initial session table rows")
+    parser.add_argument("--memory-limit", type=int, default=MEMORY.limit, help="bytes the engine caches may use")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics at /metrics on this port")
+    parser.add_argument("--metrics-json", help="write the metrics to this JSON file periodically")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between JSON dumps")
+    args = parser.parse_args()
+    raise_file_limit()
+    MEMORY.limit = args.memory_limit
+    if args.metrics_port is not None:
+        start_http_server(args.metrics_port, args.address)
+    dumper = JsonDumper(args.metrics_json, args.metrics_interval).start() if args.metrics_json else None
+    try:
+        asyncio.run(serve(args.address, args.port, args.capacity))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if dumper is not None:
+            dumper.stop()
+
+if __name__ == '__main__':
+    main()
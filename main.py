@@ -1,24 +1,63 @@
 from game.board import Board
 from game.player import HumanPlayer, AIPlayer
 
+SYMBOLS = {0: '.', 1: 'X', 2: 'O'}
+DRAW_MESSAGES = {
+    "repetition": "draw by repetition.",
+    "move limit": "draw by move limit.",
+    "stalemate": "draw, the player to move has no valid move.",
+}
+
+class BoardView:
+    """Text rendering of a board kept up to date from its change events.
+
+    Only the rows holding changed cells are rebuilt, and the board is printed
+    again only after it changed.
+    """
+
+    def __init__(self, board):
+        self.cells = [[SYMBOLS[int(value)] for value in row] for row in board.board]
+        self.rows = [" ".join(row) for row in self.cells]
+        self.dirty = True
+        self.winner = None  # Set by the "end" event: the winning player, or 0 for a draw
+        self.reason = None  # Why the game ended, one of game.board.END_REASONS
+        board.subscribe(self.on_event)
+
+    def on_event(self, event, data):
+        if event == "cell":
+            row, col, value = data
+            self.cells[row][col] = SYMBOLS[value]
+            self.rows[row] = " ".join(self.cells[row])
+            self.dirty = True
+        elif event == "phase":
+            print("All pieces are placed; the movement phase begins.")
+        elif event == "end":
+            self.winner, self.reason = data
+
+    def show(self):
+        if self.dirty:
+            print("\n".join(self.rows))
+            self.dirty = False
+
 def main():
     board = Board()
+    view = BoardView(board)
     human = HumanPlayer(1)
     ai = AIPlayer(2)
     current_player = human
     selected_piece = None  # Used during movement phase to track the piece being moved
 
-    while not board.is_game_over():
-        print(board)
+    while view.winner is None:
+        view.show()
         print(f"Player {current_player.symbol}'s turn")
 
-        if board.pieces_placed[current_player.symbol] < 4:  # Placement phase
+        if board.pieces_placed[current_player.symbol] < board.variant.pieces:  # Placement phase
             move_type, pos = current_player.get_move(board)
             if move_type == "place":
                 if board.place_piece(pos, current_player.symbol):
                     print(f"Player {current_player.symbol} placed a piece at {pos}.")
                 else:
-                    print("Invalid placement: The cell is occupied or you already have 4 pieces.")
+                    print(f"Invalid placement: The cell is occupied or you already have {board.variant.pieces} pieces.")
                     continue
             else:
                 print("Invalid action: You must place a piece during the placement phase.")
@@ -42,17 +81,17 @@ def main():
                     print("Invalid move. Please try again.")
                     continue
 
-        # Check for a winner after each move.
-        if board.check_winner():
-            print(board)
-            print(f"Player {current_player.symbol} wins!")
+        # The move's "end" event reports a win.
+        if view.winner:
+            view.show()
+            print(f"Player {view.winner} wins!")
             return
 
         # Switch player.
         current_player = ai if current_player == human else human
 
-    print(board)
-    print("Game over.")
+    view.show()
+    print(f"Game over: {DRAW_MESSAGES[view.reason]}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
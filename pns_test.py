@@ -0,0 +1,21 @@
+"""Checks of ``ai.pns.ProofNumberSolver`` with a table small enough to be collected mid-proof.
+
+Run from the repository root:
+
+    python -m pytest -q pns_test.py
+"""
+from ai.pns import DRAW, ProofNumberSolver
+from game.board import Board
+from game.variant import Variant
+
+def test_draw_keeps_a_move_after_collection():
+    # A line is two cells but each side has one piece, so the game is a draw
+    variant = Variant(size=2, pieces=1, line_length=2)
+    board = Board(variant=variant)
+    board.place_piece((0, 0), 1)
+    solver = ProofNumberSolver(variant=variant)
+    solver.max_entries = 2  # Below MIN_ENTRIES: the root's children are collected before the pick
+    result, move = solver.solve_board(board, 2)
+    assert solver.collections > 0
+    assert result == DRAW
+    assert move is not None
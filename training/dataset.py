@@ -0,0 +1,213 @@
+"""Export labelled positions to memory-mapped ``.npy`` shards.
+
+Each record is a fixed-width row of ``RECORD_DTYPE``: the two 16-bit piece
+masks, side to move, phase, piece counts, the engine's search score and best
+move, and the final result from the side to move's point of view. Workers
+fill one shard each straight into a memmap, so memory stays constant however
+many samples are requested. A shard is written under a temporary name and
+renamed when full, so an interrupted run resumes with the missing shards.
+
+Run from the repository root:
+
+    python -m training.dataset out/selfplay --samples 1000000 --workers 8
+    python -m training.dataset out/random --mode enumerate --samples 200000
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from ai.minimax import search
+from ai.pns import DRAW, LOSS, WIN, ProofNumberSolver
+from ai.threats import legal_moves, play
+from game.bitboard import CELLS, PIECES, board_from_masks, is_win, is_win_at, popcount
+from game.moves import code_pair
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_training.log'
+)
+logger = logging.getLogger('dataset')
+
+RECORD_DTYPE = np.dtype([
+    ("x_mask", np.uint16),    # Player 1 pieces, bit r * 4 + c
+    ("o_mask", np.uint16),    # Player 2 pieces
+    ("side", np.uint8),       # Player to move (1 or 2)
+    ("phase", np.uint8),      # 0 placement, 1 movement
+    ("x_count", np.uint8),
+    ("o_count", np.uint8),
+    ("score", np.int32),      # Search score for the side to move
+    ("move_from", np.int8),   # Best move source cell, -1 for a placement
+    ("move_to", np.int8),     # Best move destination cell
+    ("result", np.int8),      # Final result for the side to move, or RESULT_UNKNOWN
+    ("depth", np.uint8),      # Search depth of the label
+])
+
+RESULT_UNKNOWN = -128
+PHASES = {"placement": 0, "movement": 1}
+MAX_GAME_PLIES = 80       # Self-play games this long are scored as draws
+RANDOM_OPENING_PLIES = 4  # Self-play plies played at random for variety
+META_FILE = "meta.json"
+
+def shard_path(directory, index):
+    return os.path.join(directory, f"shard_{index:05d}.npy")
+
+def phase_of(own):
+    """Phase for the side to move, which owns ``own``."""
+    return "placement" if popcount(own) < PIECES else "movement"
+
+def label(x_mask, o_mask, side, depth):
+    """Search the position and return ``(score, move)`` with the move as bit indices."""
+    own = x_mask if side == 1 else o_mask
+    phase = phase_of(own)
+    score, move = search(board_from_masks(x_mask, o_mask, side), depth, side, phase)
+    if move is None:
+        return int(score), (-1, -1)
+    return int(score), code_pair(move)
+
+def fill_record(record, x_mask, o_mask, side, score, move, result, depth):
+    record["x_mask"] = x_mask
+    record["o_mask"] = o_mask
+    record["side"] = side
+    record["phase"] = PHASES[phase_of(x_mask if side == 1 else o_mask)]
+    record["x_count"] = popcount(x_mask)
+    record["o_count"] = popcount(o_mask)
+    record["score"] = max(-2 ** 31, min(2 ** 31 - 1, score))
+    record["move_from"], record["move_to"] = move
+    record["result"] = result
+    record["depth"] = depth
+
+def self_play_samples(rng, depth):
+    """Yield record fields for every position of an endless stream of self-play games."""
+    while True:
+        masks = {1: 0, 2: 0}
+        side = 1
+        positions = []
+        winner = None
+        for ply in range(MAX_GAME_PLIES):
+            own, other = masks[side], masks[3 - side]
+            score, move = label(masks[1], masks[2], side, depth)
+            positions.append((masks[1], masks[2], side, score, move))
+            if ply < RANDOM_OPENING_PLIES or move[1] < 0:
+                move = rng.choice(legal_moves(own, other))
+            masks[side] = play(own, move)
+            if is_win_at(masks[side], move[1]):
+                winner = side
+                break
+            side = 3 - side
+
+        for x_mask, o_mask, to_move, score, move in positions:
+            result = 0 if winner is None else (1 if winner == to_move else -1)
+            yield x_mask, o_mask, to_move, score, move, result
+
+def random_position(rng):
+    """A random legal position that nobody has won yet, with the side to move."""
+    while True:
+        placed = rng.randint(0, 2 * PIECES)
+        x_count = (placed + 1) // 2
+        o_count = placed // 2
+        side = 1 if x_count == o_count else 2
+        if placed == 2 * PIECES:
+            side = rng.choice((1, 2))
+        cells = rng.sample(range(CELLS), x_count + o_count)
+        x_mask = sum(1 << index for index in cells[:x_count])
+        o_mask = sum(1 << index for index in cells[x_count:])
+        if not is_win(x_mask) and not is_win(o_mask):
+            return x_mask, o_mask, side
+
+def enumerated_samples(rng, depth, solve_nodes):
+    """Yield record fields for random legal positions, optionally solved for their result."""
+    solver = ProofNumberSolver() if solve_nodes else None
+    results = {WIN: 1, DRAW: 0, LOSS: -1}
+    while True:
+        x_mask, o_mask, side = random_position(rng)
+        score, move = label(x_mask, o_mask, side, depth)
+        result = RESULT_UNKNOWN
+        if solver is not None:
+            own, other = (x_mask, o_mask) if side == 1 else (o_mask, x_mask)
+            proved, _ = solver.solve(own, other, solve_nodes)
+            if proved is not None:
+                result = results[proved]
+        yield x_mask, o_mask, side, score, move, result
+
+def write_shard(task):
+    """Fill one shard; runs in a worker process."""
+    directory, index, shard_size, mode, depth, seed, solve_nodes = task
+    final_path = shard_path(directory, index)
+    temp_path = final_path + ".tmp"
+    rng = random.Random(seed * 1000003 + index)
+    if mode == "selfplay":
+        samples = self_play_samples(rng, depth)
+    else:
+        samples = enumerated_samples(rng, depth, solve_nodes)
+
+    start = time.perf_counter()
+    shard = np.lib.format.open_memmap(temp_path, mode="w+", dtype=RECORD_DTYPE, shape=(shard_size,))
+    for row, (x_mask, o_mask, side, score, move, result) in zip(range(shard_size), samples):
+        fill_record(shard[row], x_mask, o_mask, side, score, move, result, depth)
+    shard.flush()
+    del shard
+    os.replace(temp_path, final_path)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Shard {index} written: {shard_size} records in {elapsed:.1f}s")
+    return index, elapsed
+
+def export(directory, samples, shard_size, mode, depth, workers, seed, solve_nodes=0):
+    """Write ``samples`` records to ``directory``, skipping shards already completed."""
+    os.makedirs(directory, exist_ok=True)
+    meta = {"mode": mode, "depth": depth, "seed": seed, "shard_size": shard_size,
+            "solve_nodes": solve_nodes, "dtype": RECORD_DTYPE.descr}
+    meta_path = os.path.join(directory, META_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path) as handle:
+            existing = json.load(handle)
+        if existing != json.loads(json.dumps(meta)):
+            raise ValueError(f"{directory} holds a dataset with different settings: {existing}")
+    else:
+        with open(meta_path, "w") as handle:
+            json.dump(meta, handle, indent=2)
+
+    shards = -(-samples // shard_size)
+    pending = [index for index in range(shards) if not os.path.exists(shard_path(directory, index))]
+    print(f"{shards - len(pending)} of {shards} shards already complete")
+    tasks = [(directory, index, shard_size, mode, depth, seed, solve_nodes) for index in pending]
+    with Pool(workers) as pool:
+        for done, (index, elapsed) in enumerate(pool.imap_unordered(write_shard, tasks), 1):
+            print(f"shard {index} done in {elapsed:.1f}s ({done}/{len(tasks)})")
+
+def shard_paths(directory):
+    """Paths of every complete shard in ``directory``, in order."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith("shard_") and name.endswith(".npy"))
+
+def load(directory, mmap_mode="r"):
+    """Every complete shard in ``directory`` concatenated into one record array."""
+    shards = [np.load(path, mmap_mode=mmap_mode) for path in shard_paths(directory)]
+    if not shards:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.concatenate(shards)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--shard-size", type=int, default=4096)
+    parser.add_argument("--mode", choices=("selfplay", "enumerate"), default="selfplay")
+    parser.add_argument("--depth", type=int, default=2, help="search depth used for labels")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--solve-nodes", type=int, default=0,
+                        help="proof-number node limit for results of enumerated positions (0 = off)")
+    args = parser.parse_args()
+    export(args.directory, args.samples, args.shard_size, args.mode, args.depth,
+           args.workers, args.seed, args.solve_nodes)
+
+if __name__ == '__main__':
+    main()
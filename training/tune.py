@@ -0,0 +1,167 @@
+"""Texel-style tuning of the evaluation weights from labelled positions.
+
+The evaluation in ``ai.minimax`` is linear in pattern counts, so every record
+becomes one feature row and the whole fit is vectorized NumPy gradient
+descent on the mean squared error between ``sigmoid(K * eval)`` and the
+target: the game result, or ``sigmoid(K * score)`` of a deeper search label.
+
+Run from the repository root:
+
+    python -m training.tune out/selfplay --output ai/weights.json
+"""
+import argparse
+import logging
+
+import numpy as np
+
+from ai.weights import DEFAULT_WEIGHTS, WEIGHTS_FILE, save_weights
+from game.bitboard import CORNER_MASK, LINE_MASKS, PIECES, SQUARE_MASKS, THREAT_MASKS
+from training.dataset import RESULT_UNKNOWN, load
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_training.log'
+)
+logger = logging.getLogger('tune')
+
+NAMES = list(DEFAULT_WEIGHTS)
+# Completed patterns only appear in terminal positions, which the search never evaluates for tuning
+FROZEN = {"line_win", "line_loss", "square_win", "square_loss"}
+
+_POPCOUNT = np.array([bin(value).count("1") for value in range(1 << 16)], dtype=np.int8)
+
+def features(records):
+    """Feature matrix with one column per weight in ``DEFAULT_WEIGHTS`` order.
+
+    Scores are from the side to move, as ``evaluate_position(board, side)``.
+    """
+    side = records["side"]
+    x_mask = records["x_mask"].astype(np.int64)
+    o_mask = records["o_mask"].astype(np.int64)
+    own = np.where(side == 1, x_mask, o_mask)
+    opp = np.where(side == 1, o_mask, x_mask)
+    columns = {name: np.zeros(len(records)) for name in NAMES}
+
+    def counts(mask):
+        player = _POPCOUNT[own & mask]
+        opponent = _POPCOUNT[opp & mask]
+        return player, opponent, _POPCOUNT[mask] - player - opponent
+
+    for mask in LINE_MASKS:
+        player, opponent, empty = counts(mask)
+        columns["line_win"] += player == 4
+        columns["line_loss"] += opponent == 4
+        columns["line_block_three"] += (opponent == 3) & (empty == 1)
+        columns["line_three"] += (player == 3) & (empty == 1)
+        columns["line_block_two"] += (opponent == 2) & (empty == 2)
+        columns["line_two"] += (player == 2) & (empty == 2)
+        columns["line_one"] += (player == 1) & (empty == 3)
+        columns["line_block_one"] += (opponent == 1) & (empty == 3)
+
+    for mask in SQUARE_MASKS:
+        player, opponent, empty = counts(mask)
+        columns["square_win"] += player == 4
+        columns["square_loss"] += opponent == 4
+        columns["square_block_three"] += (opponent == 3) & (empty == 1)
+        columns["square_three"] += (player == 3) & (empty == 1)
+        columns["square_block_two"] += (opponent == 2) & (empty == 2)
+        columns["square_two"] += (player == 2) & (empty == 2)
+
+    columns["corner"] = _POPCOUNT[own & CORNER_MASK].astype(float)
+    columns["corner_opponent"] = _POPCOUNT[opp & CORNER_MASK].astype(float)
+
+    threatened = np.zeros(len(records), dtype=bool)
+    for mask in THREAT_MASKS:
+        player, opponent, empty = counts(mask)
+        threatened |= (opponent == 3) & (empty == 1)
+    placing = _POPCOUNT[own] < PIECES
+    columns["threat_placement"] = (threatened & placing).astype(float)
+    columns["threat_movement"] = (threatened & ~placing).astype(float)
+
+    return np.stack([columns[name] for name in NAMES], axis=1)
+
+def weight_vector(weights):
+    return np.array([weights[name] for name in NAMES], dtype=float)
+
+def targets(records, target, scale):
+    """Training targets in [0, 1] and the mask of usable records."""
+    if target == "result":
+        usable = records["result"] != RESULT_UNKNOWN
+        return (records["result"][usable].astype(float) + 1) / 2, usable
+    usable = np.ones(len(records), dtype=bool)
+    return sigmoid(scale * records["score"].astype(float)), usable
+
+def sigmoid(values):
+    return 1.0 / (1.0 + np.exp(-np.clip(values, -500, 500)))
+
+def loss(matrix, weights, expected, scale):
+    return float(np.mean((sigmoid(scale * (matrix @ weights)) - expected) ** 2))
+
+def fit_scale(matrix, weights, expected):
+    """Sigmoid scale that best fits the current weights, by a coarse log-spaced scan."""
+    candidates = np.logspace(-6, -2, 81)
+    errors = [loss(matrix, weights, expected, scale) for scale in candidates]
+    return float(candidates[int(np.argmin(errors))])
+
+def tune(matrix, expected, initial, scale, epochs=2000, learning_rate=0.05, l2=1e-4):
+    """Adam on the free weights; returns the tuned weight vector.
+
+    Columns are normalised so one learning rate suits every weight, and an L2
+    pull towards ``initial`` keeps rarely seen patterns near their old values.
+    """
+    free = np.array([name not in FROZEN for name in NAMES])
+    column_scale = np.maximum(np.abs(matrix).max(axis=0), 1.0)
+    normalised = matrix / column_scale
+    weights = initial * column_scale * scale  # In normalised, pre-sigmoid units
+    start = weights.copy()
+    first = np.zeros_like(weights)
+    second = np.zeros_like(weights)
+    for step in range(1, epochs + 1):
+        predicted = sigmoid(normalised @ weights)
+        error = predicted - expected
+        gradient = 2 * normalised.T @ (error * predicted * (1 - predicted)) / len(expected)
+        gradient += 2 * l2 * (weights - start)
+        gradient[~free] = 0
+        first = 0.9 * first + 0.1 * gradient
+        second = 0.999 * second + 0.001 * gradient ** 2
+        weights -= learning_rate * (first / (1 - 0.9 ** step)) / (np.sqrt(second / (1 - 0.999 ** step)) + 1e-12)
+        if step % 500 == 0:
+            logger.debug(f"Step {step}: loss {float(np.mean(error ** 2)):.6f}")
+    return weights / column_scale / scale
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="dataset written by training.dataset")
+    parser.add_argument("--target", choices=("result", "score"), default="result")
+    parser.add_argument("--epochs", type=int, default=2000)
+    parser.add_argument("--learning-rate", type=float, default=0.05)
+    parser.add_argument("--output", default=WEIGHTS_FILE)
+    args = parser.parse_args()
+
+    records = load(args.directory)
+    initial = weight_vector(DEFAULT_WEIGHTS)
+    if args.target == "score":
+        # Scores and evaluations share a scale; one standard deviation maps to sigmoid(1)
+        scale = 1.0 / max(1.0, float(np.std(records["score"])))
+    else:
+        scale = None
+    expected, usable = targets(records, args.target, scale)
+    matrix = features(records[usable])
+    if scale is None:
+        scale = fit_scale(matrix, initial, expected)
+    print(f"{len(expected)} positions, sigmoid scale {scale:.2e}")
+
+    before = loss(matrix, initial, expected, scale)
+    tuned = tune(matrix, expected, initial, scale, args.epochs, args.learning_rate)
+    after = loss(matrix, tuned, expected, scale)
+    print(f"loss {before:.6f} -> {after:.6f}")
+    for name, old, new in zip(NAMES, initial, tuned):
+        print(f"{name:<20} {int(old):>8} -> {int(round(new)):>8}")
+
+    save_weights(dict(zip(NAMES, tuned)), args.output)
+    print(f"weights written to {args.output}")
+
+if __name__ == '__main__':
+    main()
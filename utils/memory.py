@@ -0,0 +1,168 @@
+"""One memory ceiling for every engine cache in the process.
+
+The evaluation cache, the proof solvers' tables, the session table and the
+shared transposition tables each size themselves from a budget. A host with
+many games holds one solver per game, so separate budgets alone add up
+without bound. Caches register with ``MEMORY``, a ``MemoryBudget``, and are
+sized from what it has left by ``allot``. The budget then sums what they can
+grow to, not what they hold now, so staying under the ceiling does not depend
+on how full the caches happen to be.
+
+A registered cache provides:
+
+    memory_bytes()        estimated bytes it holds now
+    memory_capacity()     bytes it may grow to
+    shrink(bytes)         optional: lower its capacity, evicting what no
+                          longer fits; without it the cache is fixed-size
+    hit_rate()            optional, for ``report``
+
+Caches are held by weak reference, so a finished game's solver drops out
+with the game. Short-lived working memory, such as a batch search's arrays,
+is counted by registering a ``Reservation`` for as long as it is in use. ``enforce`` shrinks the shrinkable caches proportionally once
+their capacities exceed the limit; it runs in the calling thread, which must
+be the one using the caches. The limit defaults to ``AVAI_MEMORY_LIMIT``
+bytes, or 1 GiB.
+"""
+import logging
+import os
+import threading
+import weakref
+
+from utils.metrics import REGISTRY
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_memory.log'
+)
+logger = logging.getLogger('memory')
+
+DEFAULT_LIMIT = int(os.environ.get("AVAI_MEMORY_LIMIT", 1 << 30))
+ALLOT_SHARE = 0.5     # Most of the free memory one new cache is given
+SHRINK_TARGET = 0.9   # Fraction of the limit enforce shrinks to, so it is not needed again at once
+
+class MemoryBudget:
+    def __init__(self, limit=DEFAULT_LIMIT):
+        self.limit = limit
+        self.caches = {}    # key -> [name, weak reference, capacity when last counted]
+        self.reserved = 0   # Sum of the counted capacities
+        self.next_key = 0
+        self.lock = threading.RLock()  # Reentrant: a weak reference callback may run inside a locked section
+
+    def register(self, name, cache):
+        """Count ``cache`` against the limit until it is garbage collected; returns it."""
+        with self.lock:
+            key = self.next_key
+            self.next_key += 1
+            capacity = cache.memory_capacity()
+            self.caches[key] = [name, weakref.ref(cache, lambda _: self._forget(key)), capacity]
+            self.reserved += capacity
+        return cache
+
+    def _forget(self, key):
+        with self.lock:
+            entry = self.caches.pop(key, None)
+            if entry is not None:
+                self.reserved -= entry[2]
+
+    def _live(self):
+        """``(name, cache)`` of every registered cache still alive, with their capacities recounted."""
+        with self.lock:
+            live = []
+            reserved = 0
+            for entry in list(self.caches.values()):
+                cache = entry[1]()
+                if cache is None:
+                    continue
+                entry[2] = cache.memory_capacity()
+                reserved += entry[2]
+                live.append((entry[0], cache))
+            self.reserved = reserved
+            return live
+
+    def available(self):
+        return max(0, self.limit - self.reserved)
+
+    def allot(self, wanted, minimum=0):
+        """Bytes a new cache may use: ``wanted``, or less when memory is short, but at least ``minimum``."""
+        return max(minimum, min(wanted, int(self.available() * ALLOT_SHARE)))
+
+    def fits(self, size):
+        """Whether ``size`` more bytes can be reserved, after shrinking the caches if needed."""
+        if self.reserved + size <= self.limit:
+            return True
+        self.enforce()
+        return self.reserved + size <= self.limit
+
+    def enforce(self):
+        """Shrink the caches to ``SHRINK_TARGET`` of the limit if their capacities exceed it; returns bytes freed."""
+        live = self._live()
+        before = self.reserved
+        if before <= self.limit:
+            return 0
+        shrinkable = [cache for _, cache in live if hasattr(cache, "shrink")]
+        while shrinkable and self.reserved > self.limit:
+            # Scale every cache by the same factor; the ones stopped by their minimum size sit out the next pass
+            flexible = sum(cache.memory_capacity() for cache in shrinkable)
+            room = max(0, self.limit * SHRINK_TARGET - (self.reserved - flexible))
+            scale = room / flexible
+            still = []
+            for cache in shrinkable:
+                wanted = int(cache.memory_capacity() * scale)
+                cache.shrink(wanted)
+                if cache.memory_capacity() <= wanted:
+                    still.append(cache)
+            shrinkable = still
+            self._live()
+        freed = before - self.reserved
+        if self.reserved > self.limit:
+            logger.warning(f"Caches still reserve {self.reserved} bytes at their minimum sizes, "
+                           f"over the {self.limit} byte limit")
+        logger.info(f"Shrank the caches by {freed} bytes to {self.reserved}")
+        return freed
+
+    def report(self):
+        """``{name: {"caches", "bytes", "capacity", "hit_rate"}}``; hit_rate is the mean of those reporting one."""
+        summary = {}
+        for name, cache in self._live():
+            entry = summary.setdefault(name, {"caches": 0, "bytes": 0, "capacity": 0, "hit_rate": None, "rates": []})
+            entry["caches"] += 1
+            entry["bytes"] += cache.memory_bytes()
+            entry["capacity"] += cache.memory_capacity()
+            if hasattr(cache, "hit_rate"):
+                entry["rates"].append(cache.hit_rate())
+        for entry in summary.values():
+            rates = entry.pop("rates")
+            if rates:
+                entry["hit_rate"] = sum(rates) / len(rates)
+        return summary
+
+    def __repr__(self):
+        return f"MemoryBudget(reserved={self.reserved}, limit={self.limit}, caches={len(self.caches)})"
+
+class Reservation:
+    """A fixed number of bytes counted against a budget while the reservation is alive."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+    memory_capacity = memory_bytes
+
+# The budget every cache in this process registers with
+MEMORY = MemoryBudget()
+
+def _by_name(field):
+    def read():
+        return {(name,): entry[field] for name, entry in MEMORY.report().items() if entry[field] is not None}
+    return read
+
+REGISTRY.callback("avai_memory_bytes", "Estimated bytes held by the engine caches", _by_name("bytes"), ("cache",))
+REGISTRY.callback("avai_memory_capacity_bytes", "Bytes the engine caches may grow to", _by_name("capacity"),
+                  ("cache",))
+REGISTRY.callback("avai_memory_caches", "Registered engine caches", _by_name("caches"), ("cache",))
+REGISTRY.callback("avai_memory_hit_ratio", "Mean hit rate of the engine caches", _by_name("hit_rate"), ("cache",))
+REGISTRY.callback("avai_memory_limit_bytes", "Memory limit of the engine caches", lambda: MEMORY.limit)
@@ -0,0 +1,284 @@
+"""Process-wide metrics, exported as Prometheus text over HTTP or as periodic JSON dumps.
+
+Recording must not slow the search down, so nothing is recorded per node:
+the engines keep counting in their ``SearchStats`` and a finished move adds
+the totals once. Counters and histograms keep one cell per thread, so
+recording is a dict update on the calling thread's own cell, without a lock;
+the cells are summed only when the metrics are read, by the HTTP server's or
+the JSON dumper's thread. A ``Callback`` is a function called at read time,
+for values that already exist elsewhere, such as the number of active games
+or a cache's hit count.
+"""
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configure logging
+logging.basicConfig(
+    level=logging.DEBUG,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    filename='game_metrics.log'
+)
+logger = logging.getLogger('metrics')
+
+# Move latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class _PerThread:
+    """Cells of one metric, one dict per recording thread, keyed by label values."""
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.cells = []
+        self.lock = threading.Lock()  # Only taken when a thread records for the first time
+        self.local = threading.local()
+
+    def _cell(self):
+        try:
+            return self.local.cell
+        except AttributeError:
+            cell = self.local.cell = {}
+            with self.lock:
+                self.cells.append(cell)
+            return cell
+
+    def _snapshots(self):
+        with self.lock:
+            cells = list(self.cells)
+        return [dict(cell) for cell in cells]
+
+class Counter(_PerThread):
+    kind = "counter"
+
+    def inc(self, amount=1, labels=()):
+        cell = self._cell()
+        cell[labels] = cell.get(labels, 0) + amount
+
+    def collect(self):
+        """Totals by label values."""
+        totals = {}
+        for cell in self._snapshots():
+            for labels, value in cell.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+class Histogram(_PerThread):
+    """Counts of observations per bucket upper bound, plus their sum, by label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        cell = self._cell()
+        counts = cell.get(labels)
+        if counts is None:
+            counts = cell[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def collect(self):
+        """``{labels: (cumulative counts per bucket and +Inf, sum)}``."""
+        totals = {}
+        for cell in self._snapshots():
+            for labels, counts in cell.items():
+                counts = list(counts)
+                total = totals.setdefault(labels, [0] * len(counts))
+                for index, value in enumerate(counts):
+                    total[index] += value
+        result = {}
+        for labels, total in totals.items():
+            cumulative, running = [], 0
+            for count in total[:-1]:
+                running += count
+                cumulative.append(running)
+            result[labels] = (cumulative, total[-1])
+        return result
+
+class Callback:
+    """A value read from ``function`` when the metrics are collected: a number or ``{labels: number}``."""
+
+    def __init__(self, name, help_text, function, labels=(), kind="gauge"):
+        self.name = name
+        self.help = help_text
+        self.function = function
+        self.labels = tuple(labels)
+        self.kind = kind
+
+    def collect(self):
+        try:
+            value = self.function()
+        except Exception as e:
+            logger.error(f"Metric {self.name} could not be read: {str(e)}")
+            return {}
+        return value if isinstance(value, dict) else {(): value}
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _add(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, Callback):
+                if type(existing) is not type(metric) or existing.labels != metric.labels:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            # Callbacks are replaced, so the latest game host or cache is the one reported
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def callback(self, name, help_text, function, labels=(), kind="gauge"):
+        return self._add(Callback(name, help_text, function, labels, kind))
+
+    def unregister(self, name):
+        with self.lock:
+            self.metrics.pop(name, None)
+
+    def _sorted(self):
+        with self.lock:
+            return sorted(self.metrics.values(), key=lambda metric: metric.name)
+
+    def prometheus_text(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._sorted():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in sorted(metric.collect().items()):
+                names = dict(zip(metric.labels, labels))
+                if metric.kind == "histogram":
+                    cumulative, total = value
+                    bounds = [_format_number(bound) for bound in metric.buckets] + ["+Inf"]
+                    for bound, count in zip(bounds, cumulative):
+                        lines.append(f"{metric.name}_bucket{_format_labels({**names, 'le': bound})} {count}")
+                    lines.append(f"{metric.name}_sum{_format_labels(names)} {_format_number(total)}")
+                    lines.append(f"{metric.name}_count{_format_labels(names)} {cumulative[-1]}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(names)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Every metric as plain data for JSON: label values joined by commas, histograms as dicts."""
+        data = {}
+        for metric in self._sorted():
+            values = {}
+            for labels, value in metric.collect().items():
+                key = ",".join(str(label) for label in labels)
+                if metric.kind == "histogram":
+                    cumulative, total = value
+                    values[key] = {"buckets": dict(zip([str(bound) for bound in metric.buckets] + ["+Inf"],
+                                                       cumulative)),
+                                   "sum": total, "count": cumulative[-1]}
+                else:
+                    values[key] = value
+            data[metric.name] = values
+        return data
+
+def _format_labels(names):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in names.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+def _format_number(value):
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+# The registry every module records into
+REGISTRY = Registry()
+
+def ratio(numerator, denominator):
+    """A function for ``Registry.callback`` giving ``numerator() / denominator()``, NaN while it is 0."""
+    def read():
+        bottom = denominator()
+        return numerator() / bottom if bottom else float("nan")
+    return read
+
+def counter_total(counter):
+    """A function for ``ratio`` summing ``counter`` over all its labels."""
+    return lambda: sum(counter.collect().values())
+
+def start_http_server(port, address="127.0.0.1", registry=REGISTRY):
+    """Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` on a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = registry.prometheus_text().encode(), PROMETHEUS_CONTENT_TYPE
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(registry.snapshot()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Serving metrics on http://{address}:{server.server_address[1]}/metrics")
+    return server
+
+class JsonDumper:
+    """Write ``registry.snapshot()`` to ``path`` every ``interval`` seconds on a daemon thread, for headless runs."""
+
+    def __init__(self, path, interval=10.0, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics-json", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w") as handle:
+                json.dump({"time": time.time(), "metrics": self.registry.snapshot()}, handle, indent=2)
+                handle.write("\n")
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not write metrics to {self.path}: {str(e)}")
+
+    def stop(self):
+        """Stop dumping, after writing the final values."""
+        self.stopped.set()
+        self.thread.join()
+        self.dump()